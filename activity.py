@@ -0,0 +1,373 @@
+import heapq
+import json
+import mmap
+import operator
+import os
+import struct
+from array import array
+from collections import namedtuple
+from datetime import datetime
+
+
+# Daily activity tracked for every member
+ACTIVITY_METRICS = (
+    "messages",       # Messages sent
+    "awards",         # Tick reactions received from moderators
+    "penalties",      # Messages removed for foul language
+    "voice_seconds",  # Seconds spent in voice channels
+)
+
+SEGMENT_SIZE = 4096  # Member slots per segment file
+CELL = struct.Struct("=I")  # One running total, laid out like an array("I") item
+USER_ID = struct.Struct("=Q")  # One user ID in the slots file
+ROW_BYTES = SEGMENT_SIZE * len(ACTIVITY_METRICS) * CELL.size  # One day of one segment
+
+# Result of GuildActivity.summary; the member fields are None when no member is given
+ActivitySummary = namedtuple("ActivitySummary", [
+    "totals",           # Metric -> guild-wide total over the range
+    "active_members",   # Members who sent at least one message in the range
+    "movers",           # (user ID, messages in the range, change from the previous range of the same length)
+    "member_totals",    # Metric -> the member's total over the range
+    "current_streak",   # Consecutive days up to the range's last day on which the member sent a message
+    "longest_streak",   # Longest such run of days within the range
+])
+
+
+class GuildActivity:
+    """
+    Columnar daily activity of one guild's members, memory-mapped from disk.
+
+    Every member gets a slot the first time they are active. Slots are grouped into
+    segment files of SEGMENT_SIZE members, so a growing guild adds files instead of
+    rewriting them. Each segment holds one row per UTC day and, within a row, one
+    contiguous column per metric. Cells hold running totals since the first day, so
+    the total of any date range is the end day's column minus the column of the day
+    before it: two reads per segment no matter how long the range is. Only today's
+    row (and rarely yesterday's, for voice time crossing midnight) is ever written.
+    """
+
+    def __init__(self, directory, today):
+        """
+        Parameters:
+        - directory (str): Directory holding this guild's files; created if missing.
+        - today (int): The current UTC day number, used as the first day of a new guild.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        meta_path = os.path.join(directory, "activity.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            if meta["metrics"] != list(ACTIVITY_METRICS) or meta["segment_size"] != SEGMENT_SIZE:
+                raise ValueError(f"{directory} was written with a different activity layout")
+        else:
+            meta = {"first_day": today, "metrics": list(ACTIVITY_METRICS), "segment_size": SEGMENT_SIZE}
+            with open(meta_path, "w") as meta_file:
+                json.dump(meta, meta_file)
+        self.first_day = meta["first_day"]
+
+        # Slot i belongs to the i-th user ID in the slots file, which is only ever appended to
+        self.user_ids = array("Q")
+        slots_path = os.path.join(directory, "slots.bin")
+        if os.path.exists(slots_path):
+            with open(slots_path, "rb") as slots_file:
+                self.user_ids.frombytes(slots_file.read())
+        self._slots_file = open(slots_path, "ab")
+        self.slots = {user_id: slot for slot, user_id in enumerate(self.user_ids)}
+
+        self._segments = []  # (file, mmap) per segment
+        self.days = 1  # Number of day rows in every segment
+        for index in range(-(-len(self.user_ids) // SEGMENT_SIZE)):
+            self._open_segment(index)
+        self.days = max([len(mapped) // ROW_BYTES for _, mapped in self._segments] + [1])
+        for index in range(len(self._segments)):
+            self._extend(index)  # Segments left behind if the bot stopped while adding a day
+        self.ensure_day(today)
+
+    def _open_segment(self, index):
+        path = os.path.join(self.directory, f"segment-{index}.bin")
+        segment_file = open(path, "a+b")
+        if os.path.getsize(path) == 0:
+            # New segment: every earlier day is zero for members who did not have a slot yet
+            segment_file.truncate(self.days * ROW_BYTES)
+        self._segments.append((segment_file, mmap.mmap(segment_file.fileno(), 0)))
+
+    def _extend(self, index):
+        # Append copies of the segment's last row until it has `self.days` rows
+        segment_file, mapped = self._segments[index]
+        missing = self.days - len(mapped) // ROW_BYTES
+        if missing <= 0:
+            return
+        last_row = mapped[-ROW_BYTES:]
+        mapped.close()
+        segment_file.seek(0, os.SEEK_END)
+        segment_file.write(last_row * missing)
+        segment_file.flush()
+        self._segments[index] = (segment_file, mmap.mmap(segment_file.fileno(), 0))
+
+    def ensure_day(self, day):
+        """
+        Adds rows up to a day, carrying every running total forward.
+
+        Parameters:
+        - day (int): The UTC day number that must have a row.
+        """
+        days = day - self.first_day + 1
+        if days <= self.days:
+            return
+        self.days = days
+        for index in range(len(self._segments)):
+            self._extend(index)
+
+    def slot(self, user_id):
+        """
+        Returns a member's slot, assigning the next free one on first use.
+
+        Parameters:
+        - user_id (int): The member.
+
+        Returns:
+        - int: The member's slot.
+        """
+        slot = self.slots.get(user_id)
+        if slot is None:
+            slot = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.slots[user_id] = slot
+            self._slots_file.write(USER_ID.pack(user_id))
+            self._slots_file.flush()  # Written straight away so a slot is never handed out twice
+            if slot // SEGMENT_SIZE == len(self._segments):
+                self._open_segment(len(self._segments))
+        return slot
+
+    def _offset(self, row, metric_index, slot):
+        return ((row * len(ACTIVITY_METRICS) + metric_index) * SEGMENT_SIZE + slot % SEGMENT_SIZE) * CELL.size
+
+    def add(self, user_id, metric, amount, day):
+        """
+        Adds to a member's activity on a day.
+
+        Parameters:
+        - user_id (int): The member.
+        - metric (str): One of ACTIVITY_METRICS.
+        - amount (int): How much to add.
+        - day (int): The UTC day number the activity happened on. Days before the first are ignored.
+        """
+        self.ensure_day(day)
+        first_row = day - self.first_day
+        if first_row < 0:
+            return
+        slot = self.slot(user_id)
+        metric_index = ACTIVITY_METRICS.index(metric)
+        mapped = self._segments[slot // SEGMENT_SIZE][1]
+        # Running totals: the day itself and every later row include the new activity
+        for row in range(first_row, self.days):
+            offset = self._offset(row, metric_index, slot)
+            CELL.pack_into(mapped, offset, CELL.unpack_from(mapped, offset)[0] + amount)
+
+    def _row(self, day):
+        # Row holding running totals up to the end of a day, or None before the first day
+        row = min(day, self.first_day + self.days - 1) - self.first_day
+        return row if row >= 0 else None
+
+    def column(self, metric, day):
+        """
+        Reads every member's running total of a metric at the end of a day.
+
+        Parameters:
+        - metric (str): One of ACTIVITY_METRICS.
+        - day (int): The UTC day number.
+
+        Returns:
+        - array: Running totals indexed by slot.
+        """
+        totals = array("I")
+        row = self._row(day)
+        if row is None:
+            totals.frombytes(bytes(len(self.user_ids) * CELL.size))
+            return totals
+        metric_index = ACTIVITY_METRICS.index(metric)
+        for index, (_, mapped) in enumerate(self._segments):
+            start = self._offset(row, metric_index, index * SEGMENT_SIZE)
+            totals.frombytes(mapped[start:start + SEGMENT_SIZE * CELL.size])
+        del totals[len(self.user_ids):]
+        return totals
+
+    def range_totals(self, metric, start_day, end_day):
+        """
+        Returns every member's total of a metric over a date range.
+
+        Parameters:
+        - metric (str): One of ACTIVITY_METRICS.
+        - start_day (int): First UTC day number of the range.
+        - end_day (int): Last UTC day number of the range (inclusive).
+
+        Returns:
+        - list of int: Totals indexed by slot.
+        """
+        return list(map(operator.sub, self.column(metric, end_day), self.column(metric, start_day - 1)))
+
+    def range_sum(self, metric, start_day, end_day):
+        """
+        Returns the guild-wide total of a metric over a date range.
+
+        Parameters:
+        - metric (str): One of ACTIVITY_METRICS.
+        - start_day (int): First UTC day number of the range.
+        - end_day (int): Last UTC day number of the range (inclusive).
+
+        Returns:
+        - int: The total across all members.
+        """
+        return sum(self.column(metric, end_day)) - sum(self.column(metric, start_day - 1))
+
+    def daily(self, user_id, metric, start_day, end_day):
+        """
+        Returns a member's daily values of a metric over a date range.
+
+        Parameters:
+        - user_id (int): The member.
+        - metric (str): One of ACTIVITY_METRICS.
+        - start_day (int): First UTC day number of the range.
+        - end_day (int): Last UTC day number of the range (inclusive).
+
+        Returns:
+        - list of int: One value per day, oldest first.
+        """
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return [0] * (end_day - start_day + 1)
+        metric_index = ACTIVITY_METRICS.index(metric)
+        mapped = self._segments[slot // SEGMENT_SIZE][1]
+        totals = []
+        for day in range(start_day - 1, end_day + 1):
+            row = self._row(day)
+            totals.append(0 if row is None else CELL.unpack_from(mapped, self._offset(row, metric_index, slot))[0])
+        return [end - start for start, end in zip(totals, totals[1:])]
+
+    def summary(self, start_day, end_day, user_id=None, mover_count=5):
+        """
+        Computes guild-wide totals, top movers and optionally one member's totals and streaks over a date range.
+
+        Every guild-wide figure is computed from whole columns (two per metric, plus
+        one more for the previous range), so the cost depends on the number of
+        members but not on the length of the range.
+
+        Parameters:
+        - start_day (int): First UTC day number of the range.
+        - end_day (int): Last UTC day number of the range (inclusive).
+        - user_id (int): Optional. The member to include totals and streaks for.
+        - mover_count (int): Optional. How many top movers to return.
+
+        Returns:
+        - ActivitySummary: The computed statistics.
+        """
+        totals = {metric: self.range_sum(metric, start_day, end_day) for metric in ACTIVITY_METRICS}
+
+        # Top movers: the biggest increase in messages over the previous range of the same length
+        before = self.column("messages", start_day - 1)
+        current = list(map(operator.sub, self.column("messages", end_day), before))
+        previous = map(operator.sub, before, self.column("messages", 2 * start_day - end_day - 2))
+        changes = list(map(operator.sub, current, previous))
+        top_slots = heapq.nlargest(mover_count, range(len(changes)), key=changes.__getitem__)
+        movers = [(self.user_ids[slot], current[slot], changes[slot]) for slot in top_slots if changes[slot] > 0]
+        active_members = len(current) - current.count(0)
+
+        member_totals = current_streak = longest_streak = None
+        if user_id is not None:
+            member_totals = {metric: sum(self.daily(user_id, metric, start_day, end_day)) for metric in ACTIVITY_METRICS}
+            longest_streak = run = 0
+            for count in self.daily(user_id, "messages", start_day, end_day):
+                run = run + 1 if count else 0
+                longest_streak = max(longest_streak, run)
+            # The current streak may have started before the range
+            current_streak = 0
+            for count in reversed(self.daily(user_id, "messages", self.first_day, end_day)):
+                if not count:
+                    break
+                current_streak += 1
+
+        return ActivitySummary(totals, active_members, movers, member_totals, current_streak, longest_streak)
+
+    def flush(self):
+        """
+        Writes changed pages to disk.
+        """
+        for _, mapped in self._segments:
+            mapped.flush()
+
+    def close(self):
+        """
+        Flushes and closes every file.
+        """
+        for segment_file, mapped in self._segments:
+            mapped.flush()
+            mapped.close()
+            segment_file.close()
+        self._segments = []
+        self._slots_file.close()
+
+
+class ActivityStore:
+    """
+    Daily activity of every guild this process serves, one GuildActivity directory per guild.
+    """
+
+    def __init__(self, directory):
+        """
+        Parameters:
+        - directory (str): Directory holding one subdirectory per guild.
+        """
+        self.directory = directory
+        self._guilds = {}  # Guild ID -> GuildActivity
+
+    def guild(self, guild_id):
+        """
+        Returns a guild's activity, opening or creating its files on first use.
+
+        Parameters:
+        - guild_id (int): The guild.
+
+        Returns:
+        - GuildActivity: The guild's activity.
+        """
+        activity = self._guilds.get(guild_id)
+        if activity is None:
+            activity = GuildActivity(os.path.join(self.directory, str(guild_id)), datetime.utcnow().toordinal())
+            self._guilds[guild_id] = activity
+        return activity
+
+    def add(self, guild_id, user_id, metric, amount=1, day=None):
+        """
+        Adds to a member's activity.
+
+        Parameters:
+        - guild_id (int): The guild.
+        - user_id (int): The member.
+        - metric (str): One of ACTIVITY_METRICS.
+        - amount (int): Optional. How much to add.
+        - day (int): Optional. The UTC day number of the activity. Defaults to today.
+        """
+        self.guild(guild_id).add(user_id, metric, amount, datetime.utcnow().toordinal() if day is None else day)
+
+    def __len__(self):
+        return sum(len(activity.user_ids) for activity in self._guilds.values())
+
+    def flush(self):
+        """
+        Writes changed pages of every guild to disk.
+
+        Must be called from the thread that adds activity (the event loop): adding a guild
+        or a day changes the guilds and segments being flushed.
+        """
+        for activity in self._guilds.values():
+            activity.flush()
+
+    def close(self):
+        """
+        Flushes and closes every guild's files.
+        """
+        for activity in self._guilds.values():
+            activity.close()
+        self._guilds = {}
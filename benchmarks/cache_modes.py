@@ -0,0 +1,204 @@
+"""
+Measures memory use and time-to-ready of the default and lean cache modes on a large guild.
+
+Each mode runs in its own process. bot.py is loaded with LEAN_CACHE set accordingly,
+then synthetic gateway payloads are fed straight into discord.py's connection state
+(no network): a GUILD_CREATE for a large guild, the member chunks discord.py would
+request if it chunks guilds at startup, and then a stream of messages and reactions.
+Event dispatch is disabled so only the library's caching is measured.
+
+Reports the time to process everything received before the guild is ready, the RSS
+growth over the whole run, and how many members and messages ended up cached.
+
+Usage:
+    python benchmarks/cache_modes.py [--members 100000] [--messages 20000] [--members-intent]
+
+--members-intent models a deployment that enabled the privileged Server Members
+intent, under which discord.py's defaults download every member at startup.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import discord
+from discord.state import ChunkRequest
+
+from handlers import BOT_SETTINGS, GUILD_ID, load_bot
+
+BOT_USER_ID = 700_000_000_000_000_001
+FIRST_MEMBER_ID = 710_000_000_000_000_000
+FIRST_CHANNEL_ID = 720_000_000_000_000_000
+FIRST_ROLE_ID = 730_000_000_000_000_000
+FIRST_MESSAGE_ID = 740_000_000_000_000_000
+CHANNEL_COUNT = 300
+ROLE_COUNT = 150
+VOICE_MEMBER_COUNT = 200
+CHUNK_SIZE = 1000  # Members per GUILD_MEMBERS_CHUNK, as sent by Discord
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def user_payload(user_id):
+    return {"id": str(user_id), "username": f"user{user_id % 1000000}", "discriminator": "0",
+            "global_name": None, "avatar": None}
+
+
+def member_payload(user_id, with_user=True):
+    member = {"roles": [str(FIRST_ROLE_ID + user_id % 5)], "joined_at": "2024-01-01T00:00:00+00:00",
+              "deaf": False, "mute": False, "flags": 0}
+    if with_user:
+        member["user"] = user_payload(user_id)
+    return member
+
+
+def guild_payload(member_count):
+    text_channels = [
+        {"id": str(FIRST_CHANNEL_ID + i), "type": 0, "name": f"channel-{i}", "position": i,
+         "permission_overwrites": [], "nsfw": False, "parent_id": None, "topic": None}
+        for i in range(CHANNEL_COUNT)
+    ]
+    voice_channel_id = FIRST_CHANNEL_ID + CHANNEL_COUNT
+    voice_channel = {"id": str(voice_channel_id), "type": 2, "name": "voice", "position": CHANNEL_COUNT,
+                     "permission_overwrites": [], "nsfw": False, "parent_id": None, "bitrate": 64000, "user_limit": 0}
+    roles = [
+        {"id": str(FIRST_ROLE_ID + i), "name": f"role-{i}", "color": 0, "hoist": False, "position": i,
+         "permissions": "0", "managed": False, "mentionable": False, "flags": 0}
+        for i in range(ROLE_COUNT)
+    ] + [{"id": str(GUILD_ID), "name": "@everyone", "color": 0, "hoist": False, "position": 0,
+          "permissions": "0", "managed": False, "mentionable": False, "flags": 0}]
+    voice_member_ids = [FIRST_MEMBER_ID + i for i in range(VOICE_MEMBER_COUNT)]
+
+    # Large guilds only include the bot and members in voice channels; the rest arrive in chunks
+    return {
+        "id": str(GUILD_ID), "name": "Large Guild", "icon": None, "owner_id": str(FIRST_MEMBER_ID),
+        "roles": roles, "channels": text_channels + [voice_channel], "threads": [], "emojis": [], "stickers": [],
+        "features": [], "premium_tier": 0, "large": True, "member_count": member_count,
+        "members": [member_payload(BOT_USER_ID)] + [member_payload(user_id) for user_id in voice_member_ids],
+        "voice_states": [
+            {"user_id": str(user_id), "channel_id": str(voice_channel_id), "session_id": "x", "deaf": False,
+             "mute": False, "self_deaf": False, "self_mute": False, "self_video": False, "suppress": False}
+            for user_id in voice_member_ids
+        ],
+        "presences": [], "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+        "unavailable": False,
+    }
+
+
+def message_payload(index, member_count):
+    author_id = FIRST_MEMBER_ID + (index * 7919) % member_count
+    return {
+        "id": str(FIRST_MESSAGE_ID + index), "channel_id": str(FIRST_CHANNEL_ID + index % CHANNEL_COUNT),
+        "guild_id": str(GUILD_ID), "author": user_payload(author_id), "member": member_payload(author_id, False),
+        "content": "hello team, great work today " * 3, "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": [], "embeds": [], "pinned": False, "type": 0,
+    }
+
+
+def reaction_payload(index, member_count):
+    moderator_id = FIRST_MEMBER_ID + 1
+    return {
+        "user_id": str(moderator_id), "channel_id": str(FIRST_CHANNEL_ID + index % CHANNEL_COUNT),
+        "message_id": str(FIRST_MESSAGE_ID + index), "guild_id": str(GUILD_ID),
+        "emoji": {"id": None, "name": "✅"}, "member": member_payload(moderator_id),
+        "message_author_id": str(FIRST_MEMBER_ID + (index * 7919) % member_count),
+        "burst": False, "type": 0,
+    }
+
+
+async def measure(lean, member_count, message_count):
+    with tempfile.TemporaryDirectory() as directory:
+        bot_module = load_bot({
+            **BOT_SETTINGS,
+            "DATABASE_PATH": os.path.join(directory, "bench.db"),
+            "ACTIVITY_DIR": os.path.join(directory, "activity"),
+            "LOG_SINK_PATH": os.path.join(directory, "logs", "ep_bot.jsonl"),
+            "LEAN_CACHE": lean,
+        })
+    state = bot_module.bot._connection
+    state.dispatch = lambda *args, **kwargs: None  # Measure caching only, not the bot's handlers
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID))
+    state.clear()
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_USER_ID))
+
+    payload = guild_payload(member_count)
+    request = ChunkRequest(GUILD_ID, 0, asyncio.get_running_loop(), state._get_guild, cache=state.member_cache_flags.joined)
+    chunks = [
+        {"guild_id": str(GUILD_ID), "nonce": request.nonce, "members": [member_payload(FIRST_MEMBER_ID + i) for i in range(start, min(start + CHUNK_SIZE, member_count))],
+         "chunk_index": start // CHUNK_SIZE, "chunk_count": -(-member_count // CHUNK_SIZE)}
+        for start in range(0, member_count, CHUNK_SIZE)
+    ] if state._chunk_guilds else []
+    messages = [message_payload(i, member_count) for i in range(message_count)]
+    reactions = [reaction_payload(i, member_count) for i in range(0, message_count, 10)]
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    guild = state._add_guild_from_data(payload)
+    if chunks:
+        state._chunk_requests[request.nonce] = request  # What guild.chunk() registers before requesting members
+    for chunk in chunks:
+        state.parse_guild_members_chunk(chunk)
+    time_to_ready = time.perf_counter() - started
+
+    for message in messages:
+        state.parse_message_create(message)
+    for reaction in reactions:
+        state.parse_message_reaction_add(reaction)
+    rss_growth = rss_bytes() - rss_before
+
+    return {
+        "mode": "lean" if lean else "default",
+        "chunked": bool(state._chunk_guilds),
+        "time_to_ready_ms": time_to_ready * 1000,
+        "rss_growth_mb": rss_growth / 2 ** 20,
+        "cached_members": len(guild._members),
+        "cached_messages": len(state._messages or ()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--members", type=int, default=100000, help="Members in the guild")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages received after startup")
+    parser.add_argument("--members-intent", action="store_true", help="Enable the Server Members intent")
+    parser.add_argument("--mode", choices=("default", "lean"), help=argparse.SUPPRESS)  # Run one mode in this process
+    args = parser.parse_args()
+
+    if args.mode:
+        if args.members_intent:
+            default_intents = discord.Intents.default
+
+            def intents_with_members():
+                intents = default_intents()
+                intents.members = True
+                return intents
+
+            discord.Intents.default = intents_with_members
+        result = asyncio.run(measure(args.mode == "lean", args.members, args.messages))
+        print(json.dumps(result))
+        return
+
+    print(f"{'mode':<10}{'chunked':>9}{'ready ms':>11}{'RSS +MB':>10}{'members':>10}{'messages':>10}")
+    for mode in ("default", "lean"):
+        command = [sys.executable, __file__, "--mode", mode, "--members", str(args.members), "--messages", str(args.messages)]
+        if args.members_intent:
+            command.append("--members-intent")
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['mode']:<10}{str(result['chunked']):>9}{result['time_to_ready_ms']:>11.1f}"
+              f"{result['rss_growth_mb']:>10.1f}{result['cached_members']:>10}{result['cached_messages']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Lightweight stand-ins for the discord.py objects the bot's handlers touch.
+
+They carry only the attributes bot.py reads and record every outgoing call
+(sends, deletes, fetches) instead of talking to Discord, so handlers can be
+driven offline at full speed.
+"""
+import itertools
+
+_ids = itertools.count(900_000_000_000_000_000)
+
+
+def next_id():
+    return next(_ids)
+
+
+class Recorder:
+    """
+    Counts the API calls the handlers would have made.
+    """
+
+    def __init__(self):
+        self.sends = 0
+        self.embeds = 0
+        self.deletes = 0
+        self.fetches = 0
+
+    def reset(self):
+        self.sends = self.embeds = self.deletes = self.fetches = 0
+
+
+class FakeRole:
+    def __init__(self, role_id, name="role"):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.roles = []
+        self.channels = []
+        self.members = {}
+
+    @property
+    def text_channels(self):
+        return [channel for channel in self.channels if isinstance(channel, FakeTextChannel)]
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+
+class FakeMessage:
+    def __init__(self, channel, author=None, content="", embeds=None, recorder=None):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = embeds or []
+        self.jump_url = f"https://discord.com/channels/{channel.guild.id}/{channel.id}/{self.id}"
+        self._recorder = recorder
+
+    async def delete(self):
+        if self._recorder:
+            self._recorder.deletes += 1
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id, guild, recorder, name="channel"):
+        self.id = channel_id
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+        self._recorder = recorder
+
+    async def send(self, content=None, embed=None, embeds=None, **kwargs):
+        self._recorder.sends += 1
+        self._recorder.embeds += len(embeds or ([embed] if embed else []))
+        return FakeMessage(self, content=content or "", embeds=embeds or [embed], recorder=self._recorder)
+
+    async def fetch_message(self, message_id):
+        self._recorder.fetches += 1
+        message = FakeMessage(self, recorder=self._recorder)
+        message.id = message_id
+        return message
+
+
+class FakeVoiceChannel:
+    def __init__(self, channel_id, guild, name="voice"):
+        self.id = channel_id
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+
+
+class FakeMember:
+    def __init__(self, user_id, guild, roles=(), bot=False):
+        self.id = user_id
+        self.guild = guild
+        self.roles = list(roles)
+        self.bot = bot
+        self.name = f"user{user_id % 100000}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+
+
+class FakeVoiceState:
+    def __init__(self, channel=None):
+        self.channel = channel
+
+
+class FakeRawReaction:
+    def __init__(self, emoji, message, member):
+        self.emoji = emoji
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id
+        self.message_author_id = message.author.id
+        self.member = member
+        self.user_id = member.id
+
+
+class FakeContext:
+    def __init__(self, guild, author, channel, recorder):
+        self.guild = guild
+        self.author = author
+        self.channel = channel
+        self.message = FakeMessage(channel, author=author, content="!command", recorder=recorder)
+
+    async def send(self, *args, **kwargs):
+        return await self.channel.send(*args, **kwargs)
@@ -0,0 +1,333 @@
+"""
+Offline benchmark for the bot's event handlers and commands.
+
+Loads bot.py with fixture IDs filled in, replaces everything that would talk to
+Discord with the recording fakes from fakes.py, and drives `on_message`,
+`on_raw_reaction_add`, `on_voice_state_update`, `log_action` and `leaderboard` with
+synthetic workloads. Reports events/sec and p50/p99 handler latency for each
+guild size.
+
+Usage:
+    python benchmarks/handlers.py [--sizes 1000,10000,100000] [--events 2000]
+                                  [--json results.json]
+                                  [--baseline baseline.json] [--max-regression 0.25]
+
+With --baseline, the script exits with status 1 if any handler's events/sec fell by
+more than --max-regression compared to the baseline file (as written by --json), so
+it can be used as a regression gate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+import types
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fakes import (FakeContext, FakeGuild, FakeMember, FakeMessage, FakeRawReaction, FakeRole, FakeTextChannel,
+                   FakeVoiceChannel, FakeVoiceState, Recorder, next_id)
+
+GUILD_ID = 800_000_000_000_000_001
+LOG_CHANNEL_ID = 800_000_000_000_000_010
+CHAT_CHANNEL_ID = 800_000_000_000_000_011
+ENCOURAGEMENT_CHANNEL_ID = 800_000_000_000_000_012
+MODERATOR_ROLE_ID = 800_000_000_000_000_020
+ENCOURAGEMENT_ROLE_ID = 800_000_000_000_000_021
+VOICE_CHANNEL_COUNT = 10
+FOUL_WORD_COUNT = 2000
+FOUL_MESSAGE_SHARE = 0.02
+
+# Settings filled in when loading bot.py for a benchmark
+BOT_SETTINGS = {
+    "PRIMARY_LOG_CHANNEL_ID": LOG_CHANNEL_ID,
+    "ENCOURAGEMENT_SEND_CHANNEL_ID": ENCOURAGEMENT_CHANNEL_ID,
+    "CHECK_INTERVAL_MINUTES": 60,
+    "ENCOURAGEMENT_ROLE_ID": ENCOURAGEMENT_ROLE_ID,
+    "MODERATOR_ROLE_IDS": [MODERATOR_ROLE_ID],
+    "LOG_FLUSH_MAX_LATENCY_SECONDS": 0,
+}
+
+
+# ---------------------------------
+# Loading bot.py
+# ---------------------------------
+
+def load_bot(overrides):
+    """
+    Imports bot.py as a fresh module with some top-level settings replaced.
+
+    bot.py ships with blank IDs for the operator to fill in, so the benchmark supplies
+    its own fixture values for those (and for anything else in `overrides`).
+
+    Parameters:
+    - overrides (dict): Maps setting names to the Python values to use.
+
+    Returns:
+    - module: The loaded bot module.
+    """
+    with open(os.path.join(REPO_DIR, "bot.py")) as source_file:
+        source = source_file.read()
+    for name, value in overrides.items():
+        source, count = re.subn(rf"^{name} =[^#\n]*", f"{name} = {value!r}  ", source, count=1, flags=re.M)
+        if not count:
+            raise KeyError(f"Setting {name} not found in bot.py")
+    module = types.ModuleType("bot")
+    module.__file__ = os.path.join(REPO_DIR, "bot.py")
+    sys.modules["bot"] = module
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+# ---------------------------------
+# Fixture
+# ---------------------------------
+
+class Fixture:
+    """
+    A guild with `member_count` members wired into a freshly loaded bot module.
+    """
+
+    def __init__(self, member_count, database_path, seed=1):
+        self.rng = random.Random(seed)
+        self.recorder = Recorder()
+        self.bot = load_bot({
+            **BOT_SETTINGS,
+            "DATABASE_PATH": database_path,
+            "ACTIVITY_DIR": os.path.join(os.path.dirname(database_path), "activity"),
+            "LOG_SINK_PATH": os.path.join(os.path.dirname(database_path), "logs", "ep_bot.jsonl"),
+        })
+
+        self.guild = FakeGuild(GUILD_ID)
+        self.moderator_role = FakeRole(MODERATOR_ROLE_ID, "Moderator")
+        self.guild.roles = [self.moderator_role, FakeRole(ENCOURAGEMENT_ROLE_ID, "Encouragement")]
+        self.channels = {}
+        self.log_channel = self._add_channel(FakeTextChannel(LOG_CHANNEL_ID, self.guild, self.recorder, "logs"))
+        self.chat_channel = self._add_channel(FakeTextChannel(CHAT_CHANNEL_ID, self.guild, self.recorder, "chat"))
+        self._add_channel(FakeTextChannel(ENCOURAGEMENT_CHANNEL_ID, self.guild, self.recorder, "encouragement"))
+        self.voice_channels = [
+            self._add_channel(FakeVoiceChannel(next_id(), self.guild, f"voice-{i}")) for i in range(VOICE_CHANNEL_COUNT)
+        ]
+
+        self.members = [FakeMember(next_id(), self.guild) for _ in range(member_count)]
+        self.guild.members = {member.id: member for member in self.members}
+        self.moderator = FakeMember(next_id(), self.guild, roles=[self.moderator_role])
+        self.voice_location = {}  # Member ID -> voice channel the fixture put them in
+
+        # Replace everything that would reach Discord
+        bot_client = self.bot.bot
+        bot_client.get_channel = self.channels.get
+        bot_client.fetch_user = self._fetch_user
+        bot_client.process_commands = self._process_commands
+
+    def _add_channel(self, channel):
+        self.channels[channel.id] = channel
+        self.guild.channels.append(channel)
+        return channel
+
+    async def _fetch_user(self, user_id):
+        self.recorder.fetches += 1
+        return self.guild.members.get(user_id) or FakeMember(user_id, self.guild)
+
+    async def _process_commands(self, message):
+        return None
+
+    async def start(self):
+        # Open the store and start background workers exactly as the bot does at startup
+        await self.bot.setup_hook()
+        words = ["".join(self.rng.choices(string.ascii_lowercase, k=self.rng.randint(5, 10)))
+                 for _ in range(FOUL_WORD_COUNT)]
+        self.bot.set_foul_language_words(words)
+        self.foul_words = words
+
+        # Give every member some points so the leaderboard is fully populated
+        states = {(GUILD_ID, member.id): self.bot.MemberState(points=self.rng.randint(0, 1000) / 2)
+                  for member in self.members}
+        self.bot.member_states.load(states.items())
+        self.bot.get_leaderboard_index(GUILD_ID).rebuild({user_id: state.points for (_, user_id), state in states.items()})
+
+    async def stop(self):
+        self.bot.flush_points_store.cancel()
+        self.bot.encouragement_scheduler.stop()
+        await self.bot.reply_queue.close()
+        await self.bot.moderation_queue.close()
+        await self.bot.log_fetch_queue.close()
+        await self.bot.log_dispatcher.close()
+        self.bot.store.close()
+
+    def random_member(self):
+        return self.members[self.rng.randrange(len(self.members))]
+
+    def random_text(self):
+        words = self.rng.choices(["hello", "team", "great", "work", "today", "thanks", "meeting", "deal"], k=10)
+        if self.rng.random() < FOUL_MESSAGE_SHARE:
+            words[self.rng.randrange(len(words))] = self.rng.choice(self.foul_words)
+        return " ".join(words)
+
+    # Workloads: each returns a coroutine performing one event
+
+    def message_event(self):
+        message = FakeMessage(self.chat_channel, author=self.random_member(), content=self.random_text(),
+                              recorder=self.recorder)
+        return self.bot.on_message(message)
+
+    def reaction_event(self):
+        message = FakeMessage(self.chat_channel, author=self.random_member(), content=self.random_text(),
+                              recorder=self.recorder)
+        return self.bot.on_raw_reaction_add(FakeRawReaction("✅", message, self.moderator))
+
+    def voice_event(self):
+        member = self.random_member()
+        current = self.voice_location.get(member.id)
+        if current is None:
+            target = self.rng.choice(self.voice_channels)
+        elif self.rng.random() < 0.5:
+            target = self.rng.choice([channel for channel in self.voice_channels if channel is not current])
+        else:
+            target = None
+        if target is None:
+            self.voice_location.pop(member.id, None)
+        else:
+            self.voice_location[member.id] = target
+        return self.bot.on_voice_state_update(member, FakeVoiceState(current), FakeVoiceState(target))
+
+    def log_event(self):
+        return self.bot.log_action(
+            guild_id=GUILD_ID,
+            log_type="default",
+            title="Benchmark Log",
+            description="A log entry sent by the benchmark.",
+            fields=[("User", self.random_member().mention)]
+        )
+
+    def leaderboard_event(self):
+        context = FakeContext(self.guild, self.random_member(), self.chat_channel, self.recorder)
+        return self.bot.leaderboard.callback(context)
+
+
+WORKLOADS = {
+    "on_message": Fixture.message_event,
+    "on_raw_reaction_add": Fixture.reaction_event,
+    "on_voice_state_update": Fixture.voice_event,
+    "log_action": Fixture.log_event,
+    "leaderboard": Fixture.leaderboard_event,
+}
+
+
+# ---------------------------------
+# Measurement
+# ---------------------------------
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def drain(fixture):
+    # Let background side effects and logs finish so they count towards the elapsed time
+    await fixture.bot.reply_queue.drain()
+    await fixture.bot.moderation_queue.drain()
+    await fixture.bot.log_fetch_queue.drain()
+    await fixture.bot.log_dispatcher.flush()
+
+
+async def run_workload(fixture, make_event, events, warmup):
+    for _ in range(warmup):
+        await make_event(fixture)
+    await drain(fixture)
+    fixture.recorder.reset()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(events):
+        event = make_event(fixture)
+        event_started = time.perf_counter()
+        await event
+        latencies.append(time.perf_counter() - event_started)
+    await drain(fixture)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "events_per_sec": events / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "api_sends": fixture.recorder.sends,
+        "api_fetches": fixture.recorder.fetches,
+    }
+
+
+async def run_size(member_count, events, handlers):
+    with tempfile.TemporaryDirectory() as directory:
+        fixture = Fixture(member_count, os.path.join(directory, "bench.db"))
+        await fixture.start()
+        try:
+            results = {}
+            for name in handlers:
+                results[name] = await run_workload(fixture, WORKLOADS[name], events, warmup=max(10, events // 20))
+            return results
+        finally:
+            await fixture.stop()
+
+
+def compare(results, baseline, max_regression):
+    failures = []
+    for size, handlers in baseline.items():
+        for name, expected in handlers.items():
+            current = results.get(size, {}).get(name)
+            if current is None:
+                continue
+            floor = expected["events_per_sec"] * (1 - max_regression)
+            if current["events_per_sec"] < floor:
+                failures.append(
+                    f"{name} @ {size} members: {current['events_per_sec']:.0f} events/sec "
+                    f"(baseline {expected['events_per_sec']:.0f}, floor {floor:.0f})"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated guild member counts")
+    parser.add_argument("--events", type=int, default=2000, help="Events per handler per size")
+    parser.add_argument("--handlers", default=",".join(WORKLOADS), help="Comma-separated handlers to run")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Fail if results regress against this results file")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed events/sec drop (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    handlers = [name.strip() for name in args.handlers.split(",")]
+    results = {}
+    print(f"{'handler':<24}{'members':>9}{'events/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'sends':>8}{'fetches':>9}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        size_results = asyncio.run(run_size(size, args.events, handlers))
+        results[str(size)] = size_results
+        for name, result in size_results.items():
+            print(f"{name:<24}{size:>9}{result['events_per_sec']:>12.0f}{result['p50_ms']:>10.3f}"
+                  f"{result['p99_ms']:>10.3f}{result['api_sends']:>8}{result['api_fetches']:>9}")
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            failures = compare(results, json.load(baseline_file), args.max_regression)
+        if failures:
+            print("\nRegressions:")
+            for failure in failures:
+                print(f"- {failure}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
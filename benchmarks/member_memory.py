@@ -0,0 +1,90 @@
+"""
+Memory benchmark for per-member state.
+
+Compares the bytes used per member by the old layout (four separate dicts with nested
+dicts, as used before member records existed) against one `MemberState` record per
+member.
+
+Usage:
+    python benchmarks/member_memory.py [member_count]
+"""
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_dispatcher import LogRecord
+from storage import MemberState
+
+LOG_CHANNEL_ID = 1_000_000_000_000_000_001
+VC_CHANNEL_IDS = [1_000_000_000_000_000_100 + i for i in range(20)]
+VOICE_SHARE = 0.05  # Fraction of members in a voice channel at the time of measurement
+
+
+def make_members(count):
+    # Deterministic synthetic members: (user ID, points, message count, in voice?)
+    rng = random.Random(42)
+    return [
+        (100_000_000_000_000_000 + i, rng.randint(0, 500) / 2, rng.randint(1, 40), rng.random() < VOICE_SHARE)
+        for i in range(count)
+    ]
+
+
+def log_record(message_id):
+    return LogRecord(LOG_CHANNEL_ID, message_id, f"https://discord.com/channels/1/{LOG_CHANNEL_ID}/{message_id}")
+
+
+def build_dict_layout(members):
+    user_points, user_message_counts, user_vc_entry_time, user_vc_logs = {}, {}, {}, {}
+    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+    for user_id, points, count, in_voice in members:
+        user_points[user_id] = points
+        user_message_counts[user_id] = {'date': today, 'count': count}
+        if in_voice:
+            user_vc_entry_time[user_id] = {'entry_time': now - timedelta(seconds=count), 'vc_channel_id': VC_CHANNEL_IDS[count % 20]}
+            user_vc_logs[user_id] = {'join': log_record(user_id + 1), 'total_time': 0}
+    return user_points, user_message_counts, user_vc_entry_time, user_vc_logs
+
+
+def build_record_layout(members):
+    member_states = {}
+    today = datetime.utcnow().toordinal()
+    now = datetime.utcnow().timestamp()
+    for user_id, points, count, in_voice in members:
+        state = MemberState(points=points, message_day=today, message_count=count)
+        if in_voice:
+            state.vc_channel_id = VC_CHANNEL_IDS[count % 20]
+            state.vc_entry_time = now - count
+            state.vc_join_log = log_record(user_id + 1)
+        member_states[user_id] = state
+    return member_states
+
+
+def measure(builder, members):
+    # Bytes allocated by the structure, excluding the shared input list
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = builder(members)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    members = make_members(count)
+    dict_bytes = measure(build_dict_layout, members)
+    record_bytes = measure(build_record_layout, members)
+    print(f"Members: {count} ({VOICE_SHARE:.0%} in voice)")
+    print(f"Separate dicts:  {dict_bytes / count:8.1f} bytes/member ({dict_bytes / 2**20:.1f} MiB)")
+    print(f"MemberState:     {record_bytes / count:8.1f} bytes/member ({record_bytes / 2**20:.1f} MiB)")
+    print(f"Reduction:       {1 - record_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
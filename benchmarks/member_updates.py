@@ -0,0 +1,90 @@
+"""
+Benchmarks per-member locks against no locking and one global lock at increasing concurrency.
+
+Each simulated event reads a member's state, waits between 0 and twice --latency seconds
+(like a voice handler waiting for its log message) and writes the state back. Events are
+spread over --members members, with the given number in flight at a time. For every mode
+the script reports events/sec, lost updates (writes that overwrote another event's
+change) and events applied out of arrival order for their member.
+
+Usage:
+    python benchmarks/member_updates.py [--members 1000] [--events 20000]
+                                      [--concurrency 1,10,100,1000,10000] [--latency 0.001]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from member_locks import MemberLocks
+
+GLOBAL_LOCK_EVENTS = 1000  # One event at a time, so fewer events are enough to measure it
+
+
+async def run(mode, member_count, event_count, concurrency, latency, seed=0):
+    """
+    Runs the events in one mode; returns (events/sec, lost updates, out-of-order events).
+    """
+    random_source = random.Random(seed)
+    counts = dict.fromkeys(range(member_count), 0)
+    last_applied = dict.fromkeys(range(member_count), -1)
+    out_of_order = 0
+    member_locks = MemberLocks()
+    global_lock = asyncio.Lock()
+    limit = asyncio.Semaphore(concurrency)
+
+    def lock_for(member):
+        if mode == "member locks":
+            return member_locks.hold(member)
+        if mode == "global lock":
+            return global_lock
+        return contextlib.nullcontext()
+
+    async def event(member, sequence, wait):
+        nonlocal out_of_order
+        try:
+            async with lock_for(member):
+                count = counts[member]
+                await asyncio.sleep(wait)
+                counts[member] = count + 1
+                if sequence < last_applied[member]:
+                    out_of_order += 1
+                last_applied[member] = max(last_applied[member], sequence)
+        finally:
+            limit.release()
+
+    started = time.perf_counter()
+    tasks = []
+    for sequence in range(event_count):
+        await limit.acquire()
+        member = random_source.randrange(member_count)
+        tasks.append(asyncio.create_task(event(member, sequence, random_source.uniform(0, 2 * latency))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return event_count / elapsed, event_count - sum(counts.values()), out_of_order
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--members", type=int, default=1000, help="Members the events are spread over")
+    parser.add_argument("--events", type=int, default=20000, help="Events per run")
+    parser.add_argument("--concurrency", default="1,10,100,1000,10000", help="Comma-separated events in flight")
+    parser.add_argument("--latency", type=float, default=0.001, help="Average seconds each event waits mid-update")
+    args = parser.parse_args()
+
+    print(f"{args.members} members, {args.latency * 1000:g} ms average wait inside each update")
+    print(f"{'mode':<14}{'in flight':>10}{'events/s':>12}{'lost':>8}{'reordered':>11}")
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        for mode in ("no lock", "global lock", "member locks"):
+            event_count = min(args.events, GLOBAL_LOCK_EVENTS) if mode == "global lock" else args.events
+            rate, lost, reordered = asyncio.run(run(mode, args.members, event_count, concurrency, args.latency))
+            print(f"{mode:<14}{concurrency:>10}{rate:>12.0f}{lost:>8}{reordered:>11}")
+
+
+if __name__ == "__main__":
+    main()
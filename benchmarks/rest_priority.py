@@ -0,0 +1,129 @@
+"""
+Benchmarks how long a command reply waits for Discord's rate limits while logs flood the same channel.
+
+Replaces the network with a simulated Discord: each route allows --limit requests per
+--window seconds and every request takes --latency seconds, and requests on a route
+are sent in arrival order like discord.py does. A burst of log embeds is queued on a
+channel, then command replies arrive on the same channel while the logs drain. The
+replies' wait is reported with requests sent first come, first served and with them
+going through the bot's RestScheduler.
+
+Usage:
+    python benchmarks/rest_priority.py [--logs 100] [--replies 10] [--limit 5] [--window 5]
+                                       [--latency 0.05] [--speedup 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.http import Route
+
+from rest_scheduler import INTERACTIVE, LOGS, RestScheduler, rest_priority
+
+CHANNEL_ID = 800_000_000_000_000_010
+
+
+class SimulatedBucket:
+    """
+    The parts of discord.py's Ratelimit the scheduler reads, filled in as Discord would report them.
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.remaining = limit
+        self.outgoing = 0
+        self.window = window
+        self.expires = None
+        self.dirty = True
+        self.lock = asyncio.Lock()  # discord.py sends a route's requests one after another in arrival order
+
+    def is_expired(self):
+        return self.expires is not None and asyncio.get_running_loop().time() >= self.expires
+
+
+class SimulatedHTTP:
+    """
+    Stands in for discord.http.HTTPClient: per-route limits, a fixed latency and no network.
+    """
+
+    def __init__(self, limit, window, latency):
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self._buckets = {}
+        self._bucket_hashes = {}
+
+    async def request(self, route, **kwargs):
+        loop = asyncio.get_running_loop()
+        key = f"{route.key}:{route.major_parameters}"
+        bucket = self._buckets.setdefault(key, SimulatedBucket(self.limit, self.window))
+        async with bucket.lock:
+            if bucket.is_expired():
+                bucket.remaining, bucket.expires = bucket.limit, None
+            if bucket.remaining <= 0:
+                await asyncio.sleep(bucket.expires - loop.time())
+                bucket.remaining, bucket.expires = bucket.limit, None
+            bucket.outgoing += 1
+            await asyncio.sleep(self.latency)
+            bucket.outgoing -= 1
+            bucket.remaining -= 1
+            if bucket.expires is None:
+                bucket.expires = loop.time() + bucket.window
+
+
+async def run(args, scheduled):
+    """
+    Queues the log burst and the replies; returns each reply's wait in simulated seconds.
+    """
+    scale = 1 / args.speedup
+    http = SimulatedHTTP(args.limit, args.window * scale, args.latency * scale)
+    scheduler = None
+    if scheduled:
+        scheduler = RestScheduler(global_rate=45 * args.speedup)
+        scheduler.install(http)
+        scheduler.start()
+    route = Route("POST", "/channels/{channel_id}/messages", channel_id=CHANNEL_ID)
+
+    async def send(priority):
+        with rest_priority(priority):
+            started = time.perf_counter()
+            await http.request(route)
+            return (time.perf_counter() - started) / scale
+
+    logs = [asyncio.create_task(send(LOGS)) for _ in range(args.logs)]
+    replies = []
+    for _ in range(args.replies):
+        await asyncio.sleep(args.window * scale / 2)
+        replies.append(asyncio.create_task(send(INTERACTIVE)))
+    waits = await asyncio.gather(*replies)
+    await asyncio.gather(*logs)
+    if scheduler is not None:
+        await scheduler.close()
+    return waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logs", type=int, default=100, help="Log embeds queued before the replies")
+    parser.add_argument("--replies", type=int, default=10, help="Command replies sent while the logs drain")
+    parser.add_argument("--limit", type=int, default=5, help="Requests a route allows per window")
+    parser.add_argument("--window", type=float, default=5, help="Seconds in a rate-limit window")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each request takes")
+    parser.add_argument("--speedup", type=float, default=50, help="How much faster than real time to simulate")
+    args = parser.parse_args()
+
+    print(f"{args.logs} logs then {args.replies} replies on one channel, "
+          f"{args.limit} requests per {args.window:g}s (simulated seconds)")
+    print(f"{'mode':<24}{'reply p50 s':>12}{'reply max s':>12}")
+    for name, scheduled in (("first come, first served", False), ("priority scheduler", True)):
+        waits = asyncio.run(run(args, scheduled))
+        print(f"{name:<24}{statistics.median(waits):>12.1f}{max(waits):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmarks the !stats activity queries on a synthetic year of daily activity.
+
+Writes a guild's activity files in the bot's on-disk layout (one running-total row per
+day for every member), reopens them the way the bot does and times
+GuildActivity.summary over several date ranges, with and without a member.
+
+Usage:
+    python benchmarks/stats.py [--members 100000] [--days 365] [--repeat 20]
+"""
+import argparse
+import operator
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from activity import ACTIVITY_METRICS, SEGMENT_SIZE, GuildActivity
+
+DELTA_VARIANTS = 8  # Distinct random days per segment, mixed to build the history quickly
+
+
+def generate(directory, member_count, day_count, today, seed=0):
+    """
+    Writes `day_count` days of random activity for `member_count` members ending today.
+    """
+    random_source = random.Random(seed)
+    first_day = today - day_count + 1
+    GuildActivity(directory, first_day).close()  # Writes the layout metadata
+
+    with open(os.path.join(directory, "slots.bin"), "wb") as slots_file:
+        slots_file.write(array("Q", range(1, member_count + 1)).tobytes())
+
+    for index in range(-(-member_count // SEGMENT_SIZE)):
+        cells = SEGMENT_SIZE * len(ACTIVITY_METRICS)
+        limits = {"messages": 12, "awards": 1, "penalties": 1, "voice_seconds": 3600}
+        variants = []
+        for _ in range(DELTA_VARIANTS):
+            delta = array("I")
+            for metric in ACTIVITY_METRICS:
+                high = limits[metric]
+                delta.extend(random_source.randint(0, high) if random_source.random() < 0.3 else 0
+                             for _ in range(SEGMENT_SIZE))
+            variants.append(delta)
+        row = array("I", bytes(cells * 4))
+        with open(os.path.join(directory, f"segment-{index}.bin"), "wb") as segment_file:
+            for _ in range(day_count):
+                row = array("I", map(operator.add, row, random_source.choice(variants)))
+                segment_file.write(row.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--members", type=int, default=100000, help="Members with activity")
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    args = parser.parse_args()
+
+    today = datetime.utcnow().toordinal()
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        generate(directory, args.members, args.days, today)
+        print(f"Generated {args.members} members x {args.days} days in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        activity = GuildActivity(directory, today)
+        print(f"Opened in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        queries = {
+            "last 7 days": (today - 6, today, None),
+            "last 30 days": (today - 29, today, None),
+            "whole year": (today - args.days + 1, today, None),
+            "last 30 days + member": (today - 29, today, args.members // 2),
+            "whole year + member": (today - args.days + 1, today, args.members // 2),
+        }
+        print(f"{'query':<26}{'p50 ms':>10}{'max ms':>10}")
+        for name, (start_day, end_day, user_id) in queries.items():
+            durations = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                activity.summary(start_day, end_day, user_id)
+                durations.append((time.perf_counter() - started) * 1000)
+            print(f"{name:<26}{statistics.median(durations):>10.1f}{max(durations):>10.1f}")
+        activity.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,32 @@
 import discord
 from discord.ext import commands, tasks
 from discord.ext.commands import MissingAnyRole
-from datetime import datetime, timedelta
+from datetime import datetime, time as time_of_day, timedelta, timezone
+import asyncio
+import csv
+import io
+import math
+import re
+import time
+from typing import Optional
+
+from activity import ActivityStore
+from channel_picker import ChannelOptionCache, LOG_TYPE_OPTIONS
+from encouragement_scheduler import EncouragementScheduler
+from foul_matcher import FoulWordMatcher
+from leaderboard_index import LeaderboardIndex
+from live_leaderboard import LiveLeaderboards
+from member_locks import MemberLocks
+from guild_config import GuildConfig, LOG_CHANNEL_SETTINGS
+from log_dispatcher import LogDispatcher, batch_embeds
+from log_sinks import DIGEST, JsonlLogSink, LogDigests, LogRule
+from metrics import Metrics
+from name_cache import NameCache
+from rest_scheduler import ENCOURAGEMENT, LOGS, MODERATION, RestScheduler, rest_priority
+from seen_set import SeenSet
+from side_effects import BLOCK, DROP_OLDEST, SideEffectQueue
+from storage import MemberState, PointsStore
+from voice_time import VOICE_TIME_PERIODS, WINDOW_DAYS, VoiceTimeRollups, period_start, split_by_day
 
 # Bot configuration
 # Set up the bot's intents to listen to various events
@@ -11,13 +36,68 @@ intents.message_content = True   # Access message content
 intents.reactions = True         # Listen to reactions
 intents.voice_states = True      # Track voice state changes
 
+# Cache settings
+LEAN_CACHE = True  # Keep only what the bot's features need in memory (see "Memory Use" in the README)
+
+if LEAN_CACHE:
+    # Events for features the bot does not use are neither received nor cached
+    intents.typing = False
+    intents.dm_reactions = False
+    intents.invites = False
+    intents.webhooks = False
+    intents.integrations = False
+    intents.emojis_and_stickers = False
+    intents.guild_scheduled_events = False
+    intents.auto_moderation = False
+    intents.polls = False
+
+    # Members outside voice channels are not cached; names and members are fetched lazily when needed
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
+    cache_options = dict(
+        max_messages=None,                      # Reactions are handled from raw events, so no message cache is needed
+        member_cache_flags=member_cache_flags,
+        chunk_guilds_at_startup=False,          # Never download full member lists on startup
+    )
+else:
+    cache_options = {}  # discord.py defaults
+
+
+class EPBot(commands.AutoShardedBot):
+    """
+    The bot client, extended to finish queued side effects, logs and log digests, stop the live
+    leaderboards, REST scheduler and metrics server and close the activity files before disconnecting.
+
+    Runs as an auto-sharded client so a single process (or several processes, each
+    given its own SHARD_IDS) can serve many guilds.
+    """
+
+    async def close(self):
+        await reply_queue.close()
+        await moderation_queue.close()
+        await log_fetch_queue.close()
+        for digest in log_digests.due():  # Send the digests still open, so no summary is lost
+            await send_log_digest(*digest)
+        await log_dispatcher.close()
+        log_sink.flush()
+        live_leaderboards.stop()
+        await rest_scheduler.close()
+        await metrics.close()
+        activity.close()
+        await super().close()
+
+
+# Sharding settings (leave as None to let Discord pick the shard count and run every shard here)
+SHARD_COUNT = None  # Total number of shards across all bot processes
+SHARD_IDS = None    # Shards run by this process, e.g. [0, 1]; requires SHARD_COUNT
+
 # Create bot instance with command prefix and intents
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = EPBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **cache_options)
 
 # Bot token (keep this confidential)
 BOT_TOKEN = ""
 
-# Default channel IDs for logging
+# Default channel IDs for logging (each guild can override these with !logsetup)
 PRIMARY_LOG_CHANNEL_ID =   # Main channel for general logs
 POINTS_LOG_CHANNEL_ID = PRIMARY_LOG_CHANNEL_ID  # Channel for logging points (Not in use)
 REACT_LOG_CHANNEL_ID = PRIMARY_LOG_CHANNEL_ID  # Channel for reaction logs
@@ -26,21 +106,179 @@ LEADERBOARD_LOG_CHANNEL_ID = PRIMARY_LOG_CHANNEL_ID  # Channel for leaderboard u
 VC_LOG_CHANNEL_ID = PRIMARY_LOG_CHANNEL_ID  # Channel for voice chat logs
 ENCOURAGEMENT_LOG_CHANNEL_ID = PRIMARY_LOG_CHANNEL_ID  # Channel for encouragement logs
 ENCOURAGEMENT_SEND_CHANNEL_ID =   # Channel for sending encouragement messages
+LOG_FLUSH_MAX_LATENCY_SECONDS = 2  # Longest a log embed waits to be batched with others
+
+# Background queue that batches log embeds per channel
+log_dispatcher = LogDispatcher(max_latency=LOG_FLUSH_MAX_LATENCY_SECONDS)
+
+# Local log settings: every log is written to a local JSONL file, and LOG_DISCORD_RULES decide which also go to Discord
+LOG_SINK_PATH = "logs/ep_bot.jsonl"    # Local structured log, one JSON object per line
+LOG_SINK_MAX_BYTES = 10 * 1024 * 1024  # Size at which the local log is rotated
+LOG_SINK_BACKUPS = 5                   # Rotated local log files kept
+LOG_DISCORD_RULES = {                  # Log type -> LogRule; types not listed are all sent to Discord
+    "default": LogRule.above("info"),     # Startups and daily resets, but not !points or !history lookups
+    "leaderboard": LogRule.digest(3600),  # One hourly summary of leaderboard, rank, voice time and stats lookups
+}
+LOG_DIGEST_CHECK_SECONDS = 60          # How often finished digests are sent
+log_sink = JsonlLogSink(LOG_SINK_PATH, max_bytes=LOG_SINK_MAX_BYTES, backups=LOG_SINK_BACKUPS)
+log_digests = LogDigests()
 
 
 # List of moderator role IDs (for command access)
 MODERATOR_ROLE_IDS = []
 
+# Per-guild settings, created from the defaults above the first time a guild is seen
+guild_configs = {}  # Guild ID -> GuildConfig
+
+# Persistent storage settings
+DATABASE_PATH = "ep_bot.db"        # SQLite database holding points and activity state
+STORE_FLUSH_INTERVAL_SECONDS = 5   # How often pending changes are written to disk
+
+LEDGER_SNAPSHOT_INTERVAL_SECONDS = 3600  # How often points balances are snapshotted so startup replays little
+LEDGER_RETENTION_DAYS = 365        # How long points history is kept after a snapshot covers it (None keeps it forever)
+ACTIVITY_DIR = "activity"          # Directory holding each guild's memory-mapped daily activity for !stats
+
+# Durable store; member_states below is its in-memory hot cache
+store = PointsStore(
+    DATABASE_PATH,
+    snapshot_interval=LEDGER_SNAPSHOT_INTERVAL_SECONDS,
+    ledger_retention=LEDGER_RETENTION_DAYS * 86400 if LEDGER_RETENTION_DAYS else None,
+    voice_days_loaded=WINDOW_DAYS
+)
+store_write_lock = asyncio.Lock()  # Held while a batch is collected and written, so batches land in order
+activity = ActivityStore(ACTIVITY_DIR)  # Daily messages, awards, penalties and voice time per member
+
+# How each kind of points change is described by !history
+HISTORY_REASON_LABELS = {
+    "message": "Sent 10 messages in a day",
+    "reaction": "Tick reaction from a moderator",
+    "foul_language": "Foul language",
+    "add_command": "Added by command",
+    "remove_command": "Removed by command",
+}
+
 # Voice channel monitoring settings
-user_vc_entry_time = {}  # Tracks when users join voice channels
-user_vc_logs = {}        # Logs related to voice channel activities
-CHECK_INTERVAL_MINUTES =   # Interval for checking voice channel activities
+CHECK_INTERVAL_MINUTES =   # Time a voice channel must be occupied before an encouragement ping
+ENCOURAGEMENT_COOLDOWN_MINUTES = CHECK_INTERVAL_MINUTES  # Minimum time between pings for the same voice channel
 ENCOURAGEMENT_ROLE_ID =   # Role to ping for encouragement messages
 
-# In-memory storage for bot data
-user_points = {}          # Points for users
-user_message_counts = {} # Daily message counts for users
+# Tracks voice channel occupancy and wakes up only when a channel is due for a ping
+encouragement_scheduler = EncouragementScheduler(
+    threshold_seconds=CHECK_INTERVAL_MINUTES * 60,
+    cooldown_seconds=ENCOURAGEMENT_COOLDOWN_MINUTES * 60,
+    on_due=lambda vc_channel_id: send_vc_encouragement(vc_channel_id)
+)
+
+# In-memory storage for bot data (persisted by the store)
+member_states = store.members  # (Guild ID, user ID) -> MemberState: points, today's message count and voice session
+member_locks = MemberLocks()  # Serializes updates to a member's state that wait on Discord part-way through
 foul_language_words = []  # Words to detect and handle
+foul_language_matcher = FoulWordMatcher(foul_language_words)  # Compiled matcher, rebuilt when the words change
+leaderboard_indexes = {}  # Guild ID -> LeaderboardIndex of members ranked by points
+voice_rollups = VoiceTimeRollups(store.voice_days, store.voice_totals)  # Voice time per member, channel and day
+
+# Live leaderboard settings
+LIVE_LEADERBOARD_SIZE = 10                   # Members shown on each guild's pinned leaderboard
+LIVE_LEADERBOARD_EDIT_INTERVAL_SECONDS = 60  # Minimum time between two edits of a guild's pinned leaderboard
+live_leaderboard_messages = store.live_leaderboards  # (Guild ID,) -> (channel ID, message ID) of the pinned leaderboard
+live_leaderboards = LiveLeaderboards(
+    size=LIVE_LEADERBOARD_SIZE,
+    min_interval=LIVE_LEADERBOARD_EDIT_INTERVAL_SECONDS,
+    top_of=lambda guild_id: get_leaderboard_index(guild_id).top(LIVE_LEADERBOARD_SIZE),
+    publish=lambda guild_id, entries: publish_live_leaderboard(guild_id, entries)
+)
+
+# Bulk points command settings
+BULK_POINTS_MAX_MEMBERS = 1000          # Most members one !addpoints or !removepoints can change
+BULK_POINTS_MAX_CSV_BYTES = 1024 * 1024  # Largest CSV attachment accepted by !addpoints and !removepoints
+BULK_POINTS_LISTED_MEMBERS = 10         # Members listed individually in the summary reply
+
+# Activity stats settings
+STATS_DEFAULT_DAYS = 7  # Days covered by !stats when no range is given
+STATS_MAX_DAYS = 366    # Longest range !stats computes, after trimming it to the days with recorded activity
+
+# Voice time settings
+VOICE_TIME_DEFAULT_PERIOD = "all"  # Period shown by !vctime and !vcleaderboard when none is given
+
+# Display name cache settings
+NAME_CACHE_SIZE = 10000          # Maximum number of display names to keep
+NAME_CACHE_TTL_SECONDS = 600     # How long a cached display name stays valid; without the Server Members
+                                 # intent no member or user update events arrive, so this is the only refresh
+name_cache = NameCache(max_size=NAME_CACHE_SIZE, ttl_seconds=NAME_CACHE_TTL_SECONDS)
+
+# Tick reaction de-duplication settings
+REACTION_DEDUP_SIZE = 100000             # Maximum number of (message, moderator) awards remembered
+REACTION_DEDUP_WINDOW_SECONDS = 604800   # How long a moderator cannot award the same message again (7 days)
+rewarded_reactions = SeenSet(max_size=REACTION_DEDUP_SIZE, ttl_seconds=REACTION_DEDUP_WINDOW_SECONDS)
+
+# Text channel options for the !logsetup picker, cached per guild until its channels change
+channel_options = ChannelOptionCache()
+
+# Metrics settings (set METRICS_PORT and/or METRICS_FILE to expose them)
+METRICS_HOST = "127.0.0.1"           # Interface the metrics endpoint listens on
+METRICS_PORT = None                  # Port serving Prometheus metrics over HTTP, e.g. 9108
+METRICS_FILE = None                  # File to write Prometheus metrics to, e.g. for node_exporter
+METRICS_FILE_INTERVAL_SECONDS = 15   # How often METRICS_FILE is rewritten
+
+# Handler, command and REST metrics; gauges are only read when metrics are rendered
+metrics = Metrics()
+metrics.instrument_http(bot.http)
+metrics.gauge("log_queue_depth", "Log embeds waiting to be sent.", log_dispatcher.pending_count)
+metrics.gauge("encouragement_deadlines", "Encouragement deadlines waiting on the heap.",
+              encouragement_scheduler.pending_count)
+metrics.gauge("store_pending_writes", "Member records and voice time buckets changed since the last flush to disk.",
+              lambda: len(member_states.dirty) + len(store.voice_days.dirty) + len(store.voice_totals.dirty))
+metrics.gauge(
+    "state_entries", "Entries held in each in-memory state store.",
+    lambda: {
+        ("member_states",): len(member_states),
+        ("leaderboard_indexes",): sum(len(index) for index in leaderboard_indexes.values()),
+        ("name_cache",): len(name_cache),
+        ("guild_configs",): len(guild_configs),
+        ("channel_options",): len(channel_options),
+        ("rewarded_reactions",): len(rewarded_reactions),
+        ("member_locks",): len(member_locks),
+        ("live_leaderboards",): len(live_leaderboards),
+        ("voice_time",): len(voice_rollups),
+        ("activity_slots",): len(activity),
+    },
+    label_names=("state",)
+)
+
+# Background queues for handler side effects, so handlers never wait on Discord
+SIDE_EFFECT_QUEUE_SIZE = 1000  # Maximum number of side effects waiting in each queue
+side_effects_dropped = metrics.counter("side_effects_dropped_total", "Side effects dropped because a queue was full.", ("queue",))
+reply_queue = SideEffectQueue(  # Points reply embeds; merged per channel, oldest dropped when overloaded
+    "replies", max_size=SIDE_EFFECT_QUEUE_SIZE, workers=4, when_full=DROP_OLDEST, on_drop=side_effects_dropped.inc
+)
+moderation_queue = SideEffectQueue(  # Message deletions; never dropped, handlers wait when it is full
+    "moderation", max_size=SIDE_EFFECT_QUEUE_SIZE, workers=2, when_full=BLOCK, on_drop=side_effects_dropped.inc
+)
+log_fetch_queue = SideEffectQueue(  # Fetches needed only to fill in a log entry; never dropped, run at log priority
+    "log_fetches", max_size=SIDE_EFFECT_QUEUE_SIZE, workers=2, when_full=BLOCK, on_drop=side_effects_dropped.inc
+)
+metrics.gauge(
+    "side_effect_queue_depth", "Side effects waiting in each queue.",
+    lambda: {(queue.name,): queue.pending_count() for queue in (reply_queue, moderation_queue, log_fetch_queue)},
+    label_names=("queue",)
+)
+
+# REST request priorities: replies first, then moderation, encouragement pings and logs
+REST_GLOBAL_RATE = 45  # Requests per second across all routes, kept under Discord's global limit of 50
+REST_SHED_AFTER_SECONDS = {  # Longest a request of a class may wait for capacity before it is dropped
+    ENCOURAGEMENT: 120,  # A late encouragement ping is no longer useful
+    LOGS: None,          # Log embeds are deferred but never dropped
+}
+log_events = metrics.counter("log_events_total", "Log events by type and where they were sent.", ("log_type", "destination"))
+metrics.gauge("log_sink_pending", "Log events waiting to be written to the local log.", log_sink.pending_count)
+rest_requests_shed = metrics.counter("rest_requests_shed_total", "REST requests dropped after waiting too long.", ("priority",))
+rest_scheduler = RestScheduler(REST_GLOBAL_RATE, shed_after=REST_SHED_AFTER_SECONDS, on_shed=rest_requests_shed.inc)
+rest_scheduler.install(bot.http)  # Installed after the metrics wrapper, so REST timings exclude time spent waiting
+metrics.gauge(
+    "rest_requests_waiting", "REST requests waiting for rate-limit capacity in each priority class.",
+    lambda: {(name,): count for name, count in rest_scheduler.pending_counts().items()},
+    label_names=("priority",)
+)
 
 
 
@@ -57,20 +295,124 @@ foul_language_words = []  # Words to detect and handle
 # Helper Functions
 # ---------------------------------
 
+# Helper Function: Get a guild's configuration
+def get_guild_config(guild_id):
+    """
+    Retrieves the settings for a guild, resolving them from the defaults and its saved overrides if needed.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+
+    Returns:
+    - GuildConfig: The guild's settings.
+    """
+    config = guild_configs.get(guild_id)
+    if config is None:
+        version, overrides = store.guild_configs.get(guild_id, (0, {}))
+        defaults = dict(
+            primary_log_channel_id=PRIMARY_LOG_CHANNEL_ID,
+            points_log_channel_id=POINTS_LOG_CHANNEL_ID,
+            react_log_channel_id=REACT_LOG_CHANNEL_ID,
+            foul_log_channel_id=FOUL_LOG_CHANNEL_ID,
+            leaderboard_log_channel_id=LEADERBOARD_LOG_CHANNEL_ID,
+            vc_log_channel_id=VC_LOG_CHANNEL_ID,
+            encouragement_log_channel_id=ENCOURAGEMENT_LOG_CHANNEL_ID,
+            encouragement_send_channel_id=ENCOURAGEMENT_SEND_CHANNEL_ID,
+            encouragement_role_id=ENCOURAGEMENT_ROLE_ID,
+            moderator_role_ids=MODERATOR_ROLE_IDS,
+        )
+        config = GuildConfig(defaults, overrides, version)
+        guild_configs[guild_id] = config
+    return config
+
+
+# Helper Function: Replace a guild's configuration
+async def set_guild_config(guild_id, config):
+    """
+    Makes a new configuration current for a guild and saves it.
+
+    The new config replaces the old one in a single assignment, so handlers see
+    either the old routing or the new one, never a mix.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - config (GuildConfig): The new settings, usually from `GuildConfig.with_overrides`.
+    """
+    guild_configs[guild_id] = config
+    try:
+        await asyncio.to_thread(store.save_guild_config, guild_id, config.version, config.overrides)
+    except Exception as e:
+        print(f"Error: could not save configuration version {config.version} for guild {guild_id}: {e}")
+
+
+# Helper Function: Check whether this process serves a guild
+def owns_guild(guild_id):
+    """
+    Checks whether a guild belongs to one of the shards run by this process.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+
+    Returns:
+    - bool: True if this process handles the guild's events.
+    """
+    if SHARD_IDS is None:
+        return True
+    return (guild_id >> 22) % SHARD_COUNT in SHARD_IDS
+
+
+# Helper Function: Check whether a member is a moderator
+def is_moderator(member):
+    """
+    Checks whether a member has one of their guild's moderator roles.
+
+    Parameters:
+    - member (discord.Member): The member to check.
+
+    Returns:
+    - bool: True if the member has a moderator role.
+    """
+    guild = getattr(member, "guild", None)
+    if guild is None:
+        return False
+    moderator_role_ids = get_guild_config(guild.id).moderator_role_ids
+    return any(role.id in moderator_role_ids for role in member.roles)
+
+
+# Helper Function: Command check for moderator-only commands
+def moderator_only():
+    """
+    Creates a command check that only lets the invoking guild's moderators run the command.
+
+    Returns:
+    - Callable: A decorator to apply to a command.
+    """
+    async def predicate(ctx):
+        if not is_moderator(ctx.author):
+            raise MissingAnyRole(list(get_guild_config(ctx.guild.id).moderator_role_ids) if ctx.guild else [])
+        return True
+    return commands.check(predicate)
+
+
 # Helper Function: Get a log channel by its ID
-async def get_log_channel(channel_id):
+async def get_log_channel(guild_id, channel_id):
     """
     Retrieves a Discord channel object using its ID.
 
-    Fetches the channel from the bot's cache using its unique ID.
+    Fetches the channel from the bot's cache using its unique ID. The channel must belong
+    to the given guild so that one guild's logs can never end up in another guild.
 
     Parameters:
+    - guild_id (int): The ID of the guild the log belongs to.
     - channel_id (int): The ID of the channel to retrieve.
 
     Returns:
     - discord.TextChannel: The channel object if found; otherwise, None.
     """
-    return bot.get_channel(channel_id)
+    channel = bot.get_channel(channel_id) if channel_id else None
+    if channel is None or channel.guild.id != guild_id:
+        return None
+    return channel
 
 
 # Helper Function: Create an embed for logging with dynamic colors
@@ -102,73 +444,502 @@ async def create_log_embed(title, description, fields=[], color=discord.Color.de
 
 
 # Helper Function: Send a log message to the appropriate channel
-async def log_action(log_type, title, description, fields=[]):
+async def log_action(guild_id, log_type, title, description, fields=[], severity="info"):
     """
-    Sends a log message to the designated channel based on the log type.
+    Records a log event locally and, if its log type's rule allows, queues it for the designated channel.
 
-    Maps log types to channels and colors, creates an embed with title, description, and fields,
-    and sends it to the appropriate channel. Returns the message ID if successful.
+    Every event is written to the local log. The log type's rule in LOG_DISCORD_RULES then decides whether it
+    is also sent to Discord, only counted towards a periodic digest, or kept locally only. Events that are sent
+    are routed through the guild's precomputed routing table, turned into an embed with title, description,
+    and fields, and handed to the log dispatcher, which batches embeds per channel.
+    Returns immediately; callers that need a reference to the sent message can await the returned future.
 
     Parameters:
+    - guild_id (int): The ID of the guild the log belongs to.
     - log_type (str): The type of log (e.g., 'points', 'reaction', 'foul_language').
     - title (str): The title of the log message.
     - description (str): The description or details of the log message.
     - fields (list of tuples): Optional. List of tuples with field names and values for the embed.
+    - severity (str): Optional. One of "debug", "info", "warning" or "error".
 
     Returns:
-    - int: The message ID of the sent log message if successful; otherwise, None.
-    """
-    # Map log types to channel IDs
-    channel_mapping = {
-        "points": POINTS_LOG_CHANNEL_ID,
-        "reaction": REACT_LOG_CHANNEL_ID,
-        "foul_language": FOUL_LOG_CHANNEL_ID,
-        "leaderboard": LEADERBOARD_LOG_CHANNEL_ID,
-        "vc": VC_LOG_CHANNEL_ID,
-        "encouragement": ENCOURAGEMENT_LOG_CHANNEL_ID,
-        "default": PRIMARY_LOG_CHANNEL_ID
-    }
-
-    # Map log types to colors
-    color_mapping = {
-        "add_points": discord.Color.green(),    # Color for adding points logs
-        "remove_points": discord.Color.red(),   # Color for removing points logs
-        "reaction": discord.Color.fuchsia(),    # Color for reaction logs
-        "foul_language": discord.Color.red(),   # Color for foul language logs
-        "leaderboard": discord.Color.gold(),    # Color for leaderboard logs
-        "vc_join": discord.Color.green(),       # Color for voice channel join logs
-        "vc_leave": discord.Color.red(),        # Color for voice channel leave logs
-        "vc_switch": discord.Color.yellow(),    # Color for voice channel switch logs
-        "encouragement": discord.Color.purple(),# Color for encouragement logs
-        "default": discord.Color.default()      # Default color
-    }
-
-    # Get the log channel ID based on log type, default to primary log channel
-    log_channel_id = channel_mapping.get(log_type, PRIMARY_LOG_CHANNEL_ID)
-    log_channel = await get_log_channel(log_channel_id)  # Fetch the log channel based on ID
-    color = color_mapping.get(log_type, discord.Color.blue())  # Get the color based on log type, default to blue
+    - asyncio.Future: Resolves to a LogRecord (channel ID, message ID, jump URL) of the sent log message
+      if successful; otherwise (including when the event is not sent to Discord), None.
+    """
+    # Decide where the event goes, then keep it in the local log either way
+    now = time.time()
+    rule = LOG_DISCORD_RULES.get(log_type)
+    if rule is None:
+        destination = "discord"
+    elif rule.mode == DIGEST:
+        destination = "digest"
+    else:
+        destination = "discord" if rule.sends(severity) else "local"
+    log_sink.add({
+        "time": now, "guild_id": guild_id, "type": log_type, "severity": severity,
+        "title": title, "description": description, "fields": dict(fields), "destination": destination,
+    })
+    log_events.inc(log_type, destination)
+    if destination == "digest":
+        log_digests.add(guild_id, log_type, title, now, rule.interval)
+    if destination != "discord":
+        return resolved_log_future()
+
+    # Look up the channel and color for this log type in the guild's routing table
+    log_channel_id, color = get_guild_config(guild_id).route(log_type)
+    log_channel = await get_log_channel(guild_id, log_channel_id)  # Fetch the log channel based on ID
 
     if log_channel:
         # Create the embed with the given title, description, fields, and color
         embed = await create_log_embed(title, description, fields, color)
-        # Send the embed message to the log channel
-        message = await log_channel.send(embed=embed)
-        return message.id  # Return the message ID of the sent log message
+        # Queue the embed; the dispatcher sends it together with other pending logs for this channel
+        return log_dispatcher.enqueue(log_channel, embed)
+    else:
+        print(f"Log channel with ID {log_channel_id} not found in guild {guild_id}.")  # Log error if the channel is not found
+        return resolved_log_future()
+
+
+# Helper Function: A log future for a log that was not sent
+def resolved_log_future():
+    """
+    Returns:
+    - asyncio.Future: Already resolved to None, for callers of log_action that await the sent log.
+    """
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(None)
+    return future
+
+
+# Helper Function: Send a log digest
+async def send_log_digest(guild_id, log_type, first, last, titles):
+    """
+    Sends one embed summarising the events of a log type that were counted instead of sent.
+
+    Parameters:
+    - guild_id (int): The ID of the guild the events belong to.
+    - log_type (str): The log type of the events.
+    - first (float): Unix time of the first event.
+    - last (float): Unix time of the last event.
+    - titles (collections.Counter): Number of events per title.
+    """
+    log_channel_id, color = get_guild_config(guild_id).route(log_type)
+    log_channel = await get_log_channel(guild_id, log_channel_id)
+    if not log_channel:
+        print(f"Log channel with ID {log_channel_id} not found in guild {guild_id}.")
+        return
+    fields = [(title, f"{count}") for title, count in titles.most_common(24)]  # Embeds hold at most 25 fields
+    if len(titles) > len(fields):
+        fields.append(("Other", f"{sum(titles.values()) - sum(count for _, count in titles.most_common(24))}"))
+    embed = await create_log_embed(
+        title="Log Digest",
+        description=f"{sum(titles.values())} {log_type} logs from <t:{int(first)}:f> to <t:{int(last)}:f>.",
+        fields=fields,
+        color=color
+    )
+    log_dispatcher.enqueue(log_channel, embed)
+
+
+# Helper Function: Replace the foul language word list
+def set_foul_language_words(words):
+    """
+    Replaces the foul language word list and recompiles the matcher.
+
+    The matcher is built once per word list so that checking a message stays a single
+    pass over its content. Always change the list through this function.
+
+    Parameters:
+    - words (iterable of str): The new list of words to detect.
+    """
+    global foul_language_matcher
+    foul_language_words[:] = words
+    foul_language_matcher = FoulWordMatcher(foul_language_words)
+
+
+# Helper Function: Get the current UTC day number
+def get_utc_day():
+    """
+    Returns the current UTC day as an integer that increases by one every midnight UTC.
+
+    Returns:
+    - int: The proleptic Gregorian ordinal of today's UTC date.
+    """
+    return datetime.utcnow().toordinal()
+
+
+# Helper Function: Get a guild's leaderboard index
+def get_leaderboard_index(guild_id):
+    """
+    Retrieves the leaderboard index for a guild, creating an empty one if needed.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+
+    Returns:
+    - LeaderboardIndex: The guild's ranked index of members by points.
+    """
+    index = leaderboard_indexes.get(guild_id)
+    if index is None:
+        index = LeaderboardIndex()
+        leaderboard_indexes[guild_id] = index
+    return index
+
+
+# Helper Function: Get or create a member's state record
+def get_member_state(guild_id, user_id):
+    """
+    Retrieves the state record for a member of a guild, creating an empty one if needed.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - user_id (int): The ID of the member.
+
+    Returns:
+    - MemberState: The member's state record.
+    """
+    state = member_states.get((guild_id, user_id))
+    if state is None:
+        state = MemberState()
+        member_states[(guild_id, user_id)] = state
+    return state
+
+
+# Helper Function: Write a batch of state changes to the database
+async def write_store_batch(batch):
+    """
+    Writes a batch collected from the points store on a worker thread, keeping it for the next flush if the write fails.
+
+    The caller must hold `store_write_lock`, so batches are written in the order they were collected.
+
+    Parameters:
+    - batch (dict): The batch returned by `store.collect()`.
+
+    Returns:
+    - bool: True if the batch was written (or was empty).
+    """
+    if not batch:
+        return True
+    try:
+        await asyncio.to_thread(store.write, batch)
+    except Exception as e:
+        store.requeue(batch)  # e.g. "database is locked" while another shard process writes
+        print(f"Error: could not write pending changes to the database, will retry: {e}")
+        return False
+    return True
+
+
+# Helper Function: Get a user's points
+def get_user_points(guild_id, user_id):
+    """
+    Retrieves a user's total points in a guild without creating a state record.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - user_id (int): The ID of the user.
+
+    Returns:
+    - float: The user's total points, or 0 if they have none.
+    """
+    state = member_states.get((guild_id, user_id))
+    return state.points if state else 0
+
+
+# Helper Function: Change a user's points
+def add_user_points(guild_id, user_id, points, reason, actor_id=None):
+    """
+    Adds points to a user's total in a guild, records the change in the points ledger
+    and keeps the guild's leaderboard index in sync.
+
+    All points changes should go through this function so every change is audited,
+    the ranked index never needs to be rebuilt and live leaderboards see the change.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - user_id (int): The ID of the user whose points change.
+    - points (float): Number of points to add (negative to remove).
+    - reason (str): Why the points changed; one of the keys of HISTORY_REASON_LABELS.
+    - actor_id (int): Optional. The ID of the moderator who caused the change.
+
+    Returns:
+    - float: The user's new total points.
+    """
+    state = get_member_state(guild_id, user_id)
+    state.points += points
+    member_states.touch((guild_id, user_id))
+    store.record(guild_id, user_id, points, reason, actor_id)
+    get_leaderboard_index(guild_id).update(user_id, state.points)
+    live_leaderboards.points_changed(guild_id, user_id, state.points)
+    return state.points
+
+
+# Helper Function: Change many users' points at once
+def add_user_points_batch(guild_id, changes, reason, actor_id=None):
+    """
+    Applies points changes to many users of a guild as one batch.
+
+    Runs without yielding to the event loop, so no handler sees a partly applied
+    batch, and all its ledger entries are written by the same flush, in one transaction.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - changes (dict): Maps user IDs to the points to add (negative to remove).
+    - reason (str): Why the points changed; one of the keys of HISTORY_REASON_LABELS.
+    - actor_id (int): Optional. The ID of the moderator who caused the change.
+
+    Returns:
+    - dict: Maps each user ID to their new total points.
+    """
+    return {
+        user_id: add_user_points(guild_id, user_id, points, reason, actor_id)
+        for user_id, points in changes.items()
+    }
+
+
+# Helper Function: Get the members of a role
+async def get_role_members(guild, role):
+    """
+    Lists the members who have a role, requesting the member list from Discord if it is not cached.
+
+    Parameters:
+    - guild (discord.Guild): The guild of the role.
+    - role (discord.Role): The role.
+
+    Returns:
+    - list of discord.Member: The role's members other than bots, or None if the member list
+      cannot be requested because the Server Members intent is disabled.
+    """
+    if guild.chunked:
+        members = guild.members
+    elif bot.intents.members:
+        members = await guild.chunk(cache=False)  # One request; not cached so lean caching stays lean
     else:
-        print(f"Log channel with ID {log_channel_id} not found.")  # Log error if the channel is not found
         return None
+    return [member for member in members if not member.bot and member.get_role(role.id) is not None]
+
+
+# Helper Function: Read points changes from a CSV attachment
+def parse_points_csv(data, default_points=None):
+    """
+    Parses a CSV of user IDs and point amounts, as attached to !addpoints or !removepoints.
+
+    Each row is `user_id,points`; the points can be left out if a default is given.
+    A header row and blank rows are skipped. Points must be finite numbers. Points for
+    a user listed in several rows are added up.
+
+    Parameters:
+    - data (bytes): The contents of the attachment.
+    - default_points (float): Optional. Points for rows that do not give any.
+
+    Returns:
+    - tuple: (dict mapping user IDs to points, list of error messages for invalid rows)
+    """
+    changes, errors = {}, []
+    rows = csv.reader(io.StringIO(data.decode("utf-8-sig", errors="replace")))
+    for line_number, row in enumerate(rows, start=1):
+        row = [cell.strip() for cell in row if cell.strip()]
+        if not row or (line_number == 1 and not row[0].isdigit()):
+            continue
+        try:
+            user_id = int(row[0])
+            points = float(row[1]) if len(row) > 1 else default_points
+            if points is None or not math.isfinite(points):
+                raise ValueError
+        except ValueError:
+            errors.append(f"Line {line_number}: `{','.join(row)[:50]}`")
+            continue
+        changes[user_id] = changes.get(user_id, 0) + points
+    return changes, errors
+
+
+# Helper Function: Run !addpoints or !removepoints
+async def change_points_by_command(ctx, targets, points, sign):
+    """
+    Gives or takes points from every member, role member and CSV row of a points command as one batch.
+
+    Every target is resolved and validated before any points change, so a command
+    either applies in full or not at all. Members named more than once, directly or
+    through overlapping roles, get the points once; only amounts from CSV rows are added
+    up. One member gets the usual points embed; several get a single summary reply and
+    a single aggregated log entry.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - targets (list): Members and roles named in the command.
+    - points (float): Points per member, or None if only a CSV with amounts is attached.
+    - sign (int): 1 for !addpoints, -1 for !removepoints.
+    """
+    action = "Added" if sign > 0 else "Removed"
+    reason = "add_command" if sign > 0 else "remove_command"
+    changes, sources = {}, []
+    if targets and points is None:
+        await ctx.send("Give the number of points to change.")
+        return
+    if points is not None and not math.isfinite(points):
+        await ctx.send("The number of points must be a finite number.")
+        return
+
+    for target in targets:
+        if isinstance(target, discord.Role):
+            members = await get_role_members(ctx.guild, target)
+            if members is None:
+                await ctx.send("Changing points for a role requires the Server Members intent; mention the members instead.")
+                return
+            sources.append(f"{target.mention} ({len(members)} members)")
+        else:
+            members = [target]
+            sources.append(target.mention)
+        for member in members:
+            changes[member.id] = sign * points  # Once per member, however many mentions or roles include them
+
+    attachments = [attachment for attachment in ctx.message.attachments if attachment.filename.lower().endswith(".csv")]
+    for attachment in attachments:
+        if attachment.size > BULK_POINTS_MAX_CSV_BYTES:
+            await ctx.send(f"{attachment.filename} is too large (at most {BULK_POINTS_MAX_CSV_BYTES // 1024} KB).")
+            return
+        csv_changes, errors = parse_points_csv(await attachment.read(), points)
+        if errors:
+            await ctx.send(f"No points were changed. Invalid rows in {attachment.filename}:\n" + "\n".join(errors[:10]))
+            return
+        for user_id, amount in csv_changes.items():
+            changes[user_id] = changes.get(user_id, 0) + sign * amount
+        sources.append(f"{attachment.filename} ({len(csv_changes)} rows)")
+
+    if not changes:
+        await ctx.send("Mention members or a role, or attach a CSV of user IDs and points.")
+        return
+    if len(changes) > BULK_POINTS_MAX_MEMBERS:
+        await ctx.send(f"No points were changed: at most {BULK_POINTS_MAX_MEMBERS} members can be changed at once.")
+        return
+
+    totals = add_user_points_batch(ctx.guild.id, changes, reason, actor_id=ctx.author.id)
+
+    if len(changes) == 1:
+        (user_id, change), = changes.items()
+        await ctx.send(embed=create_user_points_embed(
+            ctx.guild.id, user_id, change, "added by command" if sign > 0 else "removed by command"))
+        await log_action(
+            guild_id=ctx.guild.id,
+            log_type="add_points" if sign > 0 else "remove_points",
+            title=f"{'Add' if sign > 0 else 'Remove'} Points Command",
+            description=f"Points {'added to' if sign > 0 else 'removed from'} a member.",
+            fields=[
+                ("Command used by", f"{ctx.author.mention}"),
+                ("Member affected", f"<@{user_id}>"),
+                ("Action", f"{action} {abs(change)} points"),
+            ]
+        )
+        return
+
+    net_change = sum(changes.values())
+    lines = [
+        f"<@{user_id}>: {'+' if change > 0 else ''}{change} (now {totals[user_id]})"
+        for user_id, change in list(changes.items())[:BULK_POINTS_LISTED_MEMBERS]
+    ]
+    if len(changes) > BULK_POINTS_LISTED_MEMBERS:
+        lines.append(f"...and {len(changes) - BULK_POINTS_LISTED_MEMBERS} more")
+    embed = discord.Embed(
+        title="Points Updated",
+        description=f"{action} points for {len(changes)} members (net {'+' if net_change > 0 else ''}{net_change}).",
+        color=discord.Color.green() if sign > 0 else discord.Color.red()
+    )
+    embed.add_field(name="Members", value="\n".join(lines), inline=False)
+    await ctx.send(embed=embed)
+
+    await log_action(
+        guild_id=ctx.guild.id,
+        log_type="add_points" if sign > 0 else "remove_points",
+        title=f"Bulk {'Add' if sign > 0 else 'Remove'} Points Command",
+        description=f"Points {'added to' if sign > 0 else 'removed from'} {len(changes)} members in one batch.",
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Targets", ", ".join(sources)[:1024]),
+            ("Action", f"{action} {abs(net_change)} points in total"),
+            ("Members affected", "\n".join(lines)[:1024]),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
+        ]
+    )
+
+
+# Helper Function: Record time spent in a voice channel
+def record_voice_time(guild_id, user_id, channel_id, start, end):
+    """
+    Adds a span a member spent in a voice channel to the voice time rollups and the daily activity.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - user_id (int): The ID of the member.
+    - channel_id (int): The ID of the voice channel.
+    - start (float): Unix time the member entered the channel.
+    - end (float): Unix time the member left the channel.
+    """
+    voice_rollups.add(guild_id, user_id, channel_id, start, end)
+    for day, seconds in split_by_day(start, end):
+        activity.add(guild_id, user_id, "voice_seconds", int(seconds), day=day)
+
+
+# Helper Function: Reconcile saved voice sessions with Discord's voice states
+def resume_voice_sessions():
+    """
+    Checks every saved voice session against the members' current voice states after connecting.
+
+    Members who left (or switched) voice while the bot was offline never produce a voice
+    state event for it, so their saved sessions are checked here instead of being trusted.
+
+    Actions:
+    - Resumes encouragement tracking for sessions whose member is still in the saved channel.
+    - Clears sessions whose member is no longer in that channel, without crediting the time
+      the bot was offline, and removes the member from the channel's occupancy.
+    - Leaves sessions of guilds that are not available yet, and of members with an update in progress.
+    """
+    for state_key, state in member_states.items():
+        if state.vc_channel_id is None or member_locks.locked(state_key):
+            continue
+        guild_id, user_id = state_key
+        guild = bot.get_guild(guild_id)
+        if guild is None:
+            continue
+        member = guild.get_member(user_id)
+        voice = member.voice if member is not None else None
+        if voice is not None and voice.channel is not None and voice.channel.id == state.vc_channel_id:
+            encouragement_scheduler.join(state.vc_channel_id, user_id, joined_at=state.vc_entry_time)
+        else:
+            encouragement_scheduler.leave(state.vc_channel_id, user_id)
+            state.clear_vc_session()
+            member_states.touch(state_key)
+
+
+# Helper Function: Build a link to a member's latest voice channel log
+def get_vc_log_link(state):
+    """
+    Builds a markdown link to the member's most recent join or transfer log.
+
+    Uses the jump URLs stored when the logs were sent, so no messages are fetched and
+    links keep working even if the voice log channel is changed mid-session.
+
+    Parameters:
+    - state (MemberState): The state record of the member whose session is being logged.
+
+    Returns:
+    - str: The markdown link, or None if no previous log is known.
+    """
+    if state.vc_transfer_log:
+        return f"[Jump to transfer log]({state.vc_transfer_log.jump_url})"
+    if state.vc_join_log:
+        return f"[Jump to join log]({state.vc_join_log.jump_url})"
+    return None
 
 
 # Helper Function: Create a user points embed
-def create_user_points_embed(user, points, reason):
+def create_user_points_embed(guild_id, user_id, points, reason):
     """
     Generates an embed to show changes in user points.
 
     Creates an embed showing points gained or lost, with reason and updated total points.
-    Uses green for gains and red for losses.
+    Uses green for gains and red for losses. Only needs IDs, so it works for members
+    that are not in the member cache.
 
     Parameters:
-    - user (discord.User): The user whose points have changed.
+    - guild_id (int): The ID of the guild the points belong to.
+    - user_id (int): The ID of the member whose points have changed.
     - points (int): Number of points gained (positive) or lost (negative).
     - reason (str): The reason for the points change.
 
@@ -177,13 +948,199 @@ def create_user_points_embed(user, points, reason):
     """
     embed = discord.Embed(
         title="Points Updated",                                      # Title of the embed
-        description=f"{user.mention} has {'gained' if points > 0 else 'lost'} {abs(points)} points for {reason}.",  # Description
+        description=f"<@{user_id}> has {'gained' if points > 0 else 'lost'} {abs(points)} points for {reason}.",  # Description
         color=discord.Color.green() if points > 0 else discord.Color.red()  # Color based on points change
     )
-    embed.add_field(name="Total Points", value=f"{user_points[user.id]}", inline=False)  # Show total points
+    embed.add_field(name="Total Points", value=f"{get_user_points(guild_id, user_id)}", inline=False)  # Show total points
+    return embed
+
+
+# Helper Function: Create a leaderboard embed
+async def create_leaderboard_embed(guild, top_users, live=False):
+    """
+    Generates an embed listing the highest ranked members and their points.
+
+    Parameters:
+    - guild (discord.Guild): The guild of the leaderboard.
+    - top_users (list of tuples): (rank, user_id, points) for each entry, as returned by LeaderboardIndex.top.
+    - live (bool): Optional. Whether the embed is a pinned leaderboard the bot keeps up to date.
+
+    Returns:
+    - discord.Embed: The leaderboard embed.
+    """
+    embed = discord.Embed(title="Leaderboard", color=discord.Color.gold())
+
+    # Resolve names from the member and name caches, fetching any misses concurrently
+    names = await name_cache.resolve(guild, [user_id for _, user_id, _ in top_users], bot.fetch_user)
+    for i, user_id, points in top_users:
+        embed.add_field(name=f"{i}. {names[user_id]}", value=f"{points} points", inline=False)
+
+    if live:
+        if not top_users:
+            embed.description = "No points data available."
+        embed.set_footer(text="Updates automatically")
+        embed.timestamp = datetime.now(timezone.utc)
+    return embed
+
+
+# Helper Function: Edit a guild's pinned leaderboard
+async def publish_live_leaderboard(guild_id, top_users):
+    """
+    Edits a guild's pinned leaderboard message to show new entries.
+
+    Called by the live leaderboards only when the top entries changed, and at most once
+    per LIVE_LEADERBOARD_EDIT_INTERVAL_SECONDS for each guild.
+
+    Parameters:
+    - guild_id (int): The ID of the guild.
+    - top_users (list of tuples): (rank, user_id, points) for each entry.
+
+    Returns:
+    - bool: False if the message or its channel no longer exists, True otherwise.
+    """
+    message_ref = live_leaderboard_messages.get((guild_id,))
+    guild = bot.get_guild(guild_id)
+    channel = guild.get_channel(message_ref[0]) if guild is not None and message_ref else None
+    if channel is None:
+        live_leaderboard_messages.pop((guild_id,), None)
+        return False
+    try:
+        await channel.get_partial_message(message_ref[1]).edit(
+            embed=await create_leaderboard_embed(guild, top_users, live=True))
+    except discord.NotFound:
+        print(f"Error: the pinned leaderboard of guild {guild_id} was deleted; it is no longer updated.")
+        live_leaderboard_messages.pop((guild_id,), None)
+        return False
+    return True
+
+
+# Helper Function: Reply with an embed in the background
+async def send_reply(channel, embed):
+    """
+    Queues an embed to be sent to a channel without waiting for Discord.
+
+    Replies queued for the same channel before the first one is sent go out together
+    in as few messages as possible.
+
+    Parameters:
+    - channel (discord.TextChannel): The channel to reply in.
+    - embed (discord.Embed): The embed to send.
+    """
+    async def send_embeds(embeds):
+        for batch in batch_embeds(embeds):
+            await channel.send(embeds=batch)
+
+    await reply_queue.submit_merged(channel.id, embed, send_embeds)
+
+
+# Helper Function: Log a points award from a tick reaction
+async def log_reaction_award(payload, channel, author_id):
+    """
+    Logs a tick reaction award, fetching the message only to include its content.
+
+    Parameters:
+    - payload (discord.RawReactionActionEvent): The reaction that awarded the points.
+    - channel (discord.abc.Messageable): The channel of the message, or None if it is not cached.
+    - author_id (int): The ID of the message author who was awarded.
+    """
+    content = "(message unavailable)"
+    if channel is not None:
+        try:
+            content = (await channel.fetch_message(payload.message_id)).content
+        except discord.HTTPException:
+            pass
+    jump_url = f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}"
+    await log_action(
+        guild_id=payload.guild_id,
+        log_type="reaction",
+        title="Points Awarded via Reaction",
+        description="Points awarded for a reaction on a message.",
+        fields=[
+            ("Message", f"{content}"),
+            ("Moderator", f"<@{payload.user_id}>"),
+            ("Author", f"<@{author_id}>"),
+            ("Action", "2 points awarded"),
+            ("Message Link", f"[Jump to message]({jump_url})"),
+        ]
+    )
+
+
+# Helper Function: Create the log setup embed
+def create_log_setup_embed(config):
+    """
+    Creates an embed listing where each type of log is sent.
+
+    Parameters:
+    - config (GuildConfig): The guild's settings.
+
+    Returns:
+    - discord.Embed: The embed showing the current log setup.
+    """
+    embed = discord.Embed(title="Current Log Setup", color=discord.Color.default())
+    for label, config_attribute in LOG_CHANNEL_SETTINGS.values():
+        embed.add_field(name=label, value=f"<#{getattr(config, config_attribute)}>", inline=False)
     return embed
 
 
+# Helper Function: Create the log setup controls
+def create_log_setup_view(guild, log_type=None, page=0):
+    """
+    Creates the dropdown menus and buttons shown by !logsetup.
+
+    Channel options come from the per-guild cache, so no channels are scanned per click.
+
+    Parameters:
+    - guild (discord.Guild): The guild being configured.
+    - log_type (str): Optional. The log channel setting being configured. If None, only the log type menu is shown.
+    - page (int): Optional. The page of channels to show in the channel menu.
+
+    Returns:
+    - discord.ui.View: The view holding the menus and buttons.
+    """
+    view = discord.ui.View()
+    if log_type is None:
+        # Dropdown menu for selecting the log type to configure
+        view.add_item(discord.ui.Select(
+            placeholder="Select a log type to configure...",
+            options=list(LOG_TYPE_OPTIONS),
+            custom_id="select_log_type"
+        ))
+    else:
+        # Dropdown menu for selecting the channel, one page at a time
+        pages = channel_options.pages(guild)
+        page = min(max(page, 0), len(pages) - 1)
+        placeholder = f"Select a channel for {log_type}..."
+        if len(pages) > 1:
+            placeholder += f" (page {page + 1}/{len(pages)})"
+        view.add_item(discord.ui.Select(placeholder=placeholder, options=list(pages[page]), custom_id=f"select_{log_type}"))
+
+        # Dropdown menu for changing the log type
+        view.add_item(discord.ui.Select(
+            placeholder="Change log type...",
+            options=list(LOG_TYPE_OPTIONS),
+            custom_id="change_log_type"
+        ))
+
+        # Buttons for paging through the channels
+        if len(pages) > 1:
+            view.add_item(discord.ui.Button(
+                label="Previous",
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"channel_page:{log_type}:{page - 1}",
+                disabled=page == 0
+            ))
+            view.add_item(discord.ui.Button(
+                label="Next",
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"channel_page:{log_type}:{page + 1}",
+                disabled=page == len(pages) - 1
+            ))
+
+    # "Done" button with green color
+    view.add_item(discord.ui.Button(label="Done", style=discord.ButtonStyle.success, custom_id="done_button"))
+    return view
+
+
 
 
 
@@ -196,32 +1153,99 @@ def create_user_points_embed(user, points, reason):
 # Events
 # ---------------------------------
 
+# Event: Bot setup (runs once, before connecting to Discord)
+@bot.event
+async def setup_hook():
+    """
+    Triggered once when the bot is starting up, before it connects to Discord.
+
+    Actions:
+    - Opens the database and loads the persisted state of this process's guilds in one bulk read.
+    - Resolves the saved log channel settings of those guilds.
+    - Builds each guild's leaderboard index from the loaded points.
+    - Builds the voice time rollups and voice leaderboards from the loaded daily buckets.
+    - Starts the background task that flushes pending changes to disk.
+    - Starts the log dispatcher and the side effect queues.
+    - Starts the encouragement scheduler; saved voice sessions are checked and resumed from on_ready.
+    - Starts exposing metrics over HTTP and/or to a file, if configured.
+    """
+    store.open(guild_filter=owns_guild)
+
+    # Resolve the routing table of every guild with saved settings
+    for guild_id in store.guild_configs:
+        get_guild_config(guild_id)
+
+    # Build each guild's leaderboard index from the loaded points
+    points_by_guild = {}
+    for (guild_id, user_id), state in member_states.items():
+        if state.points:
+            points_by_guild.setdefault(guild_id, {})[user_id] = state.points
+    for guild_id, points in points_by_guild.items():
+        get_leaderboard_index(guild_id).rebuild(points)
+    voice_rollups.rebuild(get_utc_day())
+    flush_points_store.start()
+    send_log_digests.start()
+
+    # Background senders make their REST requests at their own priority; command replies keep the highest
+    rest_scheduler.start()
+    with rest_priority(LOGS):
+        log_dispatcher.start()
+        log_fetch_queue.start()
+    reply_queue.start()
+    with rest_priority(MODERATION):
+        moderation_queue.start()
+
+    with rest_priority(ENCOURAGEMENT):
+        encouragement_scheduler.start()
+    with rest_priority(LOGS):  # Edits are background updates, sent after replies and moderation
+        live_leaderboards.start()
+
+    if METRICS_PORT:
+        await metrics.serve(METRICS_HOST, METRICS_PORT)
+    if METRICS_FILE:
+        write_metrics_file.start()
+
+
 # Event: Bot startup
 @bot.event
+@metrics.track_event
 async def on_ready():
     """
     Triggered when the bot is ready and connected to Discord.
 
     Actions:
-    - Starts background tasks for resetting daily messages and checking VC encouragement.
+    - Starts the background task for evicting stale daily message counts.
+    - Resumes the voice sessions that are still open and clears the ones that ended while the bot was offline.
+    - Refreshes the pinned leaderboards, since points may have changed while the bot was offline.
     - Logs the bot startup event.
     """
     # Start the background tasks
-    reset_daily_messages.start()
-    check_vc_encouragement.start()
+    if not evict_inactive_message_counts.is_running():
+        evict_inactive_message_counts.start()
 
-    # Log the bot startup event
-    await log_action(
-        log_type="default",
-        title="Bot Started",
-        description="The bot has started running."
-    )
+    # Check voice sessions saved before a restart (or a reconnect) against the real voice states
+    resume_voice_sessions()
+
+    # Resume the pinned leaderboards of guilds this process serves
+    for (guild_id,) in live_leaderboard_messages:
+        if guild_id not in live_leaderboards and bot.get_guild(guild_id) is not None:
+            live_leaderboards.track(guild_id)
+
+    # Log the bot startup event in every guild
+    for guild in bot.guilds:
+        await log_action(
+            guild_id=guild.id,
+            log_type="default",
+            title="Bot Started",
+            description="The bot has started running."
+        )
 
     print(f'Bot is ready. Logged in as {bot.user}')
 
 
 # Event: Message received
 @bot.event
+@metrics.track_event
 async def on_message(message):
     """
     Triggered when a new message is received in any channel.
@@ -230,31 +1254,38 @@ async def on_message(message):
     - Tracks and increments message count for users.
     - Awards points for sending 10 messages in a day.
     - Detects and handles foul language, deducting points and deleting messages if necessary.
+    - Queues replies and deletions in the background, so commands are processed without waiting on Discord.
     """
     # Ignore messages from bots
     if message.author.bot:
         return
 
-    user_id = message.author.id
-    today = datetime.utcnow().date()
+    # Points and message counts are kept per guild, so direct messages only run commands
+    if message.guild is None:
+        await bot.process_commands(message)
+        return
 
-    # Initialize or reset the user's message count for today
-    if user_id not in user_message_counts:
-        user_message_counts[user_id] = {'date': today, 'count': 0}
+    guild_id = message.guild.id
+    user_id = message.author.id
+    today = get_utc_day()
 
-    if user_message_counts[user_id]['date'] != today:
-        user_message_counts[user_id] = {'date': today, 'count': 0}
+    # Reset the user's message count lazily if it belongs to an earlier day
+    state = get_member_state(guild_id, user_id)
+    if state.message_day != today:
+        state.message_day = today
+        state.message_count = 0
 
     # Increment the user's message count
-    user_message_counts[user_id]['count'] += 1
+    state.message_count += 1
+    member_states.touch((guild_id, user_id))
+    activity.add(guild_id, user_id, "messages", day=today)
 
     # Award points if the user has sent 10 messages today
-    if user_message_counts[user_id]['count'] == 10:
-        if user_id not in user_points:
-            user_points[user_id] = 0
-        user_points[user_id] += 0.5
-        await message.channel.send(embed=create_user_points_embed(message.author, 0.5, "sending 10 messages today"))
+    if state.message_count == 10:
+        add_user_points(guild_id, user_id, 0.5, "message")
+        await send_reply(message.channel, create_user_points_embed(guild_id, user_id, 0.5, "sending 10 messages today"))
         await log_action(
+            guild_id=message.guild.id,
             log_type="points",
             title="Points Awarded",
             description="Points awarded for sending 10 messages today.",
@@ -264,23 +1295,25 @@ async def on_message(message):
             ]
         )
 
-    # Detect and handle foul language
-    if any(foul_word in message.content.lower() for foul_word in foul_language_words):
-        if user_id not in user_points:
-            user_points[user_id] = 0
-        user_points[user_id] -= 10
-        await message.delete()  # Delete the message with foul language
-        await message.channel.send(embed=create_user_points_embed(message.author, -10, "using foul language"))
+    # Detect and handle foul language in a single pass over the message
+    foul_matches = foul_language_matcher.find_all(message.content)
+    if foul_matches:
+        add_user_points(guild_id, user_id, -10, "foul_language")
+        activity.add(guild_id, user_id, "penalties", day=today)
+        await moderation_queue.submit(message.delete)  # Delete the message with foul language
+        await send_reply(message.channel, create_user_points_embed(guild_id, user_id, -10, "using foul language"))
         await log_action(
+            guild_id=message.guild.id,
             log_type="foul_language",
             title="Foul Language Detected",
             description="Foul language detected and points deducted.",
             fields=[
                 ("User", f"{message.author.mention}"),
-                ("Bad Word", f"{', '.join(foul_word for foul_word in foul_language_words if foul_word in message.content.lower())}"),
+                ("Bad Word", f"{', '.join(FoulWordMatcher.unique_words(foul_matches))}"),
                 ("Action", "10 points deducted and message deleted"),
                 ("Message Link", f"[Jump to message]({message.jump_url})"),
-            ]
+            ],
+            severity="warning"
         )
 
     # Process any other commands in the message
@@ -289,45 +1322,61 @@ async def on_message(message):
 
 # Event: Reaction added
 @bot.event
-async def on_reaction_add(reaction, user):
+@metrics.track_event
+async def on_raw_reaction_add(payload):
     """
-    Triggered when a reaction is added to a message.
+    Triggered when a reaction is added to any message, including messages that are not in the message cache.
+
+    Works from the IDs in the payload alone, so awards do not depend on the message
+    cache; the message is only fetched, in the background, for the log entry.
 
     Actions:
     - Checks if the reaction is a tick emoji and from a moderator.
-    - Awards 2 points to the message author for a tick reaction from a moderator.
+    - Ignores the reaction if this moderator already awarded this message recently
+      (e.g. by removing and re-adding the tick).
+    - Awards 2 points to the message author for a tick reaction from a moderator, and only
+      then records the award, so a reaction whose author could not be fetched can be retried.
+    - Queues the log entry, whose message fetch runs at log priority behind replies and moderation.
     """
-    # Ignore reactions from bots or non-tick emojis
-    if user.bot or reaction.emoji != '✅':
+    moderator = payload.member
+
+    # Ignore reactions from bots, non-tick emojis or outside of guilds
+    if payload.guild_id is None or moderator is None or moderator.bot or str(payload.emoji) != '✅':
         return
 
-    # Check if the user has a moderator role
-    if any(role.id in MODERATOR_ROLE_IDS for role in user.roles):
-        message_author = reaction.message.author
+    # Check if the user has one of the guild's moderator roles, and award each message once per moderator
+    reaction_key = (payload.message_id, moderator.id)
+    if not is_moderator(moderator) or reaction_key in rewarded_reactions:
+        return
 
-        # Award 2 points to the message author
-        if message_author.id not in user_points:
-            user_points[message_author.id] = 0
-        user_points[message_author.id] += 2
+    channel = bot.get_channel(payload.channel_id)
+    author_id = payload.message_author_id
+    if author_id is None:
+        # Older payloads do not carry the author, so fall back to fetching the message
+        if channel is None:
+            return
+        try:
+            author_id = (await channel.fetch_message(payload.message_id)).author.id
+        except discord.HTTPException as e:
+            print(f"Error: could not fetch message {payload.message_id} for a tick reaction: {e}")
+            return
+
+    # Award 2 points to the message author, unless the same reaction was awarded while fetching
+    if reaction_key in rewarded_reactions:
+        return
+    add_user_points(payload.guild_id, author_id, 2, "reaction", actor_id=moderator.id)
+    activity.add(payload.guild_id, author_id, "awards")
+    rewarded_reactions.add(reaction_key)
 
-        await reaction.message.channel.send(embed=create_user_points_embed(
-            message_author, 2, "receiving a tick reaction from a moderator"))
-        await log_action(
-            log_type="reaction",
-            title="Points Awarded via Reaction",
-            description="Points awarded for a reaction on a message.",
-            fields=[
-                ("Message", f"{reaction.message.content}"),
-                ("Moderator", f"{user.mention}"),
-                ("Author", f"{message_author.mention}"),
-                ("Action", "2 points awarded"),
-                ("Message Link", f"[Jump to message]({reaction.message.jump_url})"),
-            ]
-        )
+    if channel is not None:
+        await send_reply(channel, create_user_points_embed(
+            payload.guild_id, author_id, 2, "receiving a tick reaction from a moderator"))
+    await log_fetch_queue.submit(log_reaction_award, payload, channel, author_id)
 
 
 # Event: Voice state update
 @bot.event
+@metrics.track_event
 async def on_voice_state_update(member, before, after):
     """
     Triggered when a user changes their voice state (joins, switches, or leaves a voice channel).
@@ -336,113 +1385,163 @@ async def on_voice_state_update(member, before, after):
     - Logs voice channel joins and stores entry times.
     - Logs voice channel switches and calculates time spent in each channel.
     - Logs voice channel leaves, calculates total time spent, and clears stored logs.
+    - Adds the time spent in the channel that was left to the voice time rollups and daily activity.
+    - Keeps the encouragement scheduler's channel occupancy up to date.
+    - Holds the member's lock until its logs are sent, so a member's voice updates never interleave.
     """
-    # Handle voice channel join
-    if before.channel is None and after.channel is not None:
-        user_vc_entry_time[member.id] = {'entry_time': datetime.utcnow(), 'vc_channel_id': after.channel.id}
-        log_message_id = await log_action(
-            log_type="vc_join",
-            title="Voice Channel Join",
-            description=f"{member.mention} joined the voice channel {after.channel.mention}.",
-            fields=[
-                ("User", f"{member.mention}"),
-                ("Channel", f"{after.channel.mention}"),
-                ("Action", "Joined voice channel")
-            ]
-        )
-        if log_message_id:
-            user_vc_logs[member.id] = {'join': log_message_id, 'total_time': 0}  # Store join log message ID and initialize total time
-
-    # Handle voice channel switch
-    elif before.channel is not None and after.channel is not None and before.channel != after.channel:
-        entry_data = user_vc_entry_time.get(member.id, {})
-        entry_time = entry_data.get('entry_time')
-        if entry_time:
-            # Calculate time spent in the previous voice channel
-            time_spent = datetime.utcnow() - entry_time
-            time_spent_seconds = int(time_spent.total_seconds())
-            time_spent_str = str(timedelta(seconds=time_spent_seconds))
-
-            # Update entry time for the new channel
-            user_vc_entry_time[member.id] = {'entry_time': datetime.utcnow(), 'vc_channel_id': after.channel.id}
-
-            join_log_message_id = user_vc_logs.get(member.id, {}).get('join')
-            transfer_log_message_id = user_vc_logs.get(member.id, {}).get('transfer')
-
-            # Get the link to the previous log message if available
-            message_link = None
-            if transfer_log_message_id:
-                transfer_log_message = await bot.get_channel(VC_LOG_CHANNEL_ID).fetch_message(transfer_log_message_id)
-                message_link = f"[Jump to transfer log]({transfer_log_message.jump_url})"
-            elif join_log_message_id:
-                join_log_message = await bot.get_channel(VC_LOG_CHANNEL_ID).fetch_message(join_log_message_id)
-                message_link = f"[Jump to join log]({join_log_message.jump_url})"
-
-            # Log the voice channel switch
-            switch_log_message_id = await log_action(
-                log_type="vc_switch",
-                title="Voice Channel Switch",
-                description=f"{member.mention} switched from {before.channel.mention} to {after.channel.mention}.",
+    # Update voice channel occupancy for encouragement pings
+    if before.channel != after.channel:
+        if before.channel is not None:
+            encouragement_scheduler.leave(before.channel.id, member.id)
+        if after.channel is not None:
+            encouragement_scheduler.join(after.channel.id, member.id)
+
+    state_key = (member.guild.id, member.id)
+    now = time.time()  # Taken before waiting for the member's lock, so waiting does not skew the times
+
+    # Apply the member's voice updates one at a time, in order, including the waits for their logs
+    async with member_locks.hold(state_key):
+        # Handle voice channel join
+        if before.channel is None and after.channel is not None:
+            state = get_member_state(member.guild.id, member.id)
+            state.clear_vc_session()
+            state.vc_channel_id = after.channel.id
+            state.vc_entry_time = now
+            member_states.touch(state_key)
+            join_log = await log_action(
+                guild_id=member.guild.id,
+                log_type="vc_join",
+                title="Voice Channel Join",
+                description=f"{member.mention} joined the voice channel {after.channel.mention}.",
                 fields=[
                     ("User", f"{member.mention}"),
-                    ("From Channel", f"{before.channel.mention}"),
-                    ("To Channel", f"{after.channel.mention}"),
-                    ("Time Spent", f"{time_spent_str}"),
-                    ("Log Link", message_link),
+                    ("Channel", f"{after.channel.mention}"),
+                    ("Action", "Joined voice channel")
                 ]
             )
-            if switch_log_message_id:
-                user_vc_logs[member.id]['transfer'] = switch_log_message_id  # Store transfer log message ID
-                user_vc_logs[member.id]['total_time'] = user_vc_logs[member.id].get('total_time', 0) + time_spent_seconds
-
-    # Handle voice channel leave
-    elif before.channel is not None and after.channel is None:
-        entry_data = user_vc_entry_time.get(member.id, {})
-        entry_time = entry_data.get('entry_time')
-        if entry_time:
-            # Calculate time spent in the voice channel before leaving
-            time_spent = datetime.utcnow() - entry_time
-            time_spent_seconds = int(time_spent.total_seconds())
-            time_spent_str = str(timedelta(seconds=time_spent_seconds))
-
-            transfer_log_message_id = user_vc_logs.get(member.id, {}).get('transfer')
-            join_log_message_id = user_vc_logs.get(member.id, {}).get('join')
-
-            # Get the link to the previous log message if available
-            message_link = None
-            if transfer_log_message_id:
-                transfer_log_message = await bot.get_channel(VC_LOG_CHANNEL_ID).fetch_message(transfer_log_message_id)
-                message_link = f"[Jump to transfer log]({transfer_log_message.jump_url})"
-            elif join_log_message_id:
-                join_log_message = await bot.get_channel(VC_LOG_CHANNEL_ID).fetch_message(join_log_message_id)
-                message_link = f"[Jump to join log]({join_log_message.jump_url})"
-
-            # Calculate total time spent in voice channels
-            total_time_seconds = user_vc_logs.get(member.id, {}).get('total_time', 0) + time_spent_seconds
-            total_time_str = str(timedelta(seconds=total_time_seconds)) if total_time_seconds > 0 else "N/A"
-
-            # Log the voice channel leave
-            await log_action(
-                log_type="vc_leave",
-                title="Voice Channel Leave",
-                description=f"{member.mention} left the voice channel {before.channel.mention}.",
-                fields=[
-                    ("User", f"{member.mention}"),
-                    ("Channel", f"{before.channel.mention}"),
-                    ("Time Spent", f"{time_spent_str}"),
-                    ("Total Time Spent", f"{total_time_str}"),
-                    ("Log Link", message_link),
-                ]
-            )
-            # Clear the user's voice channel logs
-            if member.id in user_vc_logs:
-                del user_vc_logs[member.id]
-            if member.id in user_vc_entry_time:
-                del user_vc_entry_time[member.id]
+            join_log_record = await join_log  # Wait for the batched log to be sent to link later logs to it
+            if join_log_record:
+                state.vc_join_log = join_log_record  # Store join log record
+                member_states.touch(state_key)
+
+        # Handle voice channel switch
+        elif before.channel is not None and after.channel is not None and before.channel != after.channel:
+            state = member_states.get(state_key)
+            if state and state.vc_entry_time is not None:
+                # Calculate time spent in the previous voice channel and add it to the voice time rollups
+                time_spent_seconds = int(now - state.vc_entry_time)
+                time_spent_str = str(timedelta(seconds=time_spent_seconds))
+                record_voice_time(member.guild.id, member.id, before.channel.id, state.vc_entry_time, now)
+
+                # Update entry time for the new channel
+                state.vc_channel_id = after.channel.id
+                state.vc_entry_time = now
+                member_states.touch(state_key)
+
+                # Get the link to the previous log message if available
+                message_link = get_vc_log_link(state)
+
+                # Log the voice channel switch
+                switch_log = await log_action(
+                    guild_id=member.guild.id,
+                    log_type="vc_switch",
+                    title="Voice Channel Switch",
+                    description=f"{member.mention} switched from {before.channel.mention} to {after.channel.mention}.",
+                    fields=[
+                        ("User", f"{member.mention}"),
+                        ("From Channel", f"{before.channel.mention}"),
+                        ("To Channel", f"{after.channel.mention}"),
+                        ("Time Spent", f"{time_spent_str}"),
+                        ("Log Link", message_link),
+                    ]
+                )
+                switch_log_record = await switch_log
+                if switch_log_record:
+                    state.vc_transfer_log = switch_log_record  # Store transfer log record
+                    state.vc_total_time += time_spent_seconds
+                    member_states.touch(state_key)
+
+        # Handle voice channel leave
+        elif before.channel is not None and after.channel is None:
+            state = member_states.get(state_key)
+            if state and state.vc_entry_time is not None:
+                # Calculate time spent in the voice channel before leaving and add it to the voice time rollups
+                time_spent_seconds = int(now - state.vc_entry_time)
+                time_spent_str = str(timedelta(seconds=time_spent_seconds))
+                record_voice_time(member.guild.id, member.id, before.channel.id, state.vc_entry_time, now)
+
+                # Get the link to the previous log message if available
+                message_link = get_vc_log_link(state)
+
+                # Calculate total time spent in voice channels
+                total_time_seconds = state.vc_total_time + time_spent_seconds
+                total_time_str = str(timedelta(seconds=total_time_seconds)) if total_time_seconds > 0 else "N/A"
+
+                # Log the voice channel leave
+                await log_action(
+                    guild_id=member.guild.id,
+                    log_type="vc_leave",
+                    title="Voice Channel Leave",
+                    description=f"{member.mention} left the voice channel {before.channel.mention}.",
+                    fields=[
+                        ("User", f"{member.mention}"),
+                        ("Channel", f"{before.channel.mention}"),
+                        ("Time Spent", f"{time_spent_str}"),
+                        ("Total Time Spent", f"{total_time_str}"),
+                        ("Log Link", message_link),
+                    ]
+                )
+                # Clear the user's voice channel session
+                state.clear_vc_session()
+                member_states.touch(state_key)
+
+
+# Event: Member updated
+@bot.event
+@metrics.track_event
+async def on_member_update(before, after):
+    """
+    Triggered when a member's guild profile changes (e.g. their nickname).
+
+    Actions:
+    - Forgets the member's cached display name in that guild.
+    """
+    if before.display_name != after.display_name:
+        name_cache.invalidate(after.guild.id, after.id)
+
+
+# Event: Member removed
+@bot.event
+@metrics.track_event
+async def on_raw_member_remove(payload):
+    """
+    Triggered when a member leaves or is removed from a guild, even if they are not in the member cache.
+
+    Actions:
+    - Forgets the member's cached display name in that guild.
+    """
+    name_cache.invalidate(payload.guild_id, payload.user.id)
+
+
+# Event: User updated
+@bot.event
+@metrics.track_event
+async def on_user_update(before, after):
+    """
+    Triggered when a user's global profile changes (e.g. their username).
+
+    Actions:
+    - Forgets the user's cached display name in every guild shared with the bot.
+    """
+    if before.display_name != after.display_name:
+        name_cache.invalidate(None, after.id)
+        for guild in after.mutual_guilds:
+            name_cache.invalidate(guild.id, after.id)
 
 
 # Event: Interaction
 @bot.event
+@metrics.track_event
 async def on_interaction(interaction: discord.Interaction):
     """
     Handles interactions with the bot, such as dropdown menu selections and button clicks.
@@ -451,67 +1550,30 @@ async def on_interaction(interaction: discord.Interaction):
     - interaction: The interaction object containing information about the interaction.
 
     Actions:
-    - Processes the dropdown menu for selecting the log type.
-    - Processes the dropdown menu for selecting the channel.
-    - Processes the dropdown menu for changing the log type.
+    - Processes the dropdown menus for selecting or changing the log type.
+    - Processes the dropdown menu for selecting the channel, if the user is one of the guild's moderators.
+    - Processes the buttons for paging through the guild's channels.
     - Handles the "Done" button click to finalize the setup.
     """
-    # Create "Done" button with green color
-    done_button = discord.ui.Button(
-        label="Done",
-        style=discord.ButtonStyle.success, 
-        custom_id="done_button"
-    )
-
     if interaction.type == discord.InteractionType.component:
         custom_id = interaction.data.get("custom_id")
         values = interaction.data.get("values", [])
 
-        # Handle the dropdown menu for selecting the log type
-        if custom_id == "select_log_type":
-            selected_log_type = values[0]
-
-            # Create dropdown menu for channel selection
-            options = [discord.SelectOption(label="None", value="None")]
-            for channel in interaction.guild.channels:
-                if isinstance(channel, discord.TextChannel):  # Only include text channels
-                    options.append(discord.SelectOption(label=channel.name, value=str(channel.id)))
-
-            select_channel = discord.ui.Select(
-                placeholder=f"Select a channel for {selected_log_type}...", 
-                options=options, 
-                custom_id=f"select_{selected_log_type}"
-            )
-
-            # Re-create dropdown menu for changing log type
-            log_type_options = [
-                discord.SelectOption(label="Primary Log Channel", value="primary_log_channel"),
-                discord.SelectOption(label="Points Log Channel", value="points_log_channel"),
-                discord.SelectOption(label="Reaction Log Channel", value="reaction_log_channel"),
-                discord.SelectOption(label="Foul Language Log Channel", value="foul_log_channel"),
-                discord.SelectOption(label="Leaderboard Log Channel", value="leaderboard_log_channel"),
-                discord.SelectOption(label="Voice Log Channel", value="voice_log_channel"),
-                discord.SelectOption(label="Encouragement Log Channel", value="encouragement_log_channel")
-            ]
-
-            select_log_type = discord.ui.Select(
-                placeholder="Change log type...", 
-                options=log_type_options, 
-                custom_id="change_log_type"
-            )
-
-            # Create a view to hold both select menus and the "Done" button
-            view = discord.ui.View()
-            view.add_item(select_channel)
-            view.add_item(select_log_type)
-            view.add_item(done_button)
+        # Handle the dropdown menus for selecting or changing the log type
+        if custom_id in ("select_log_type", "change_log_type"):
+            selected_log_type = values[0]
 
-            # Edit the original message with the updated view
+            # Edit the original message with a channel picker for the chosen log type
             await interaction.response.edit_message(
                 content=f"Select a channel for the {selected_log_type} log channel or change the log type:", 
-                view=view
+                view=create_log_setup_view(interaction.guild, selected_log_type)
             )
 
+        # Handle the buttons for showing another page of channels
+        elif custom_id.startswith("channel_page:"):
+            _, log_type, page = custom_id.split(":")
+            await interaction.response.edit_message(view=create_log_setup_view(interaction.guild, log_type, int(page)))
+
         # Handle the dropdown menu for selecting the channel
         elif custom_id.startswith("select_"):
             log_type = custom_id[len("select_"):]
@@ -521,108 +1583,22 @@ async def on_interaction(interaction: discord.Interaction):
                 await interaction.response.send_message(f"No channel selected for {log_type}.", ephemeral=True)
                 return
 
-            # Update the appropriate log channel variable
-            global_vars = {
-                "primary_log_channel": "PRIMARY_LOG_CHANNEL_ID",
-                "points_log_channel": "POINTS_LOG_CHANNEL_ID",
-                "reaction_log_channel": "REACT_LOG_CHANNEL_ID",
-                "foul_log_channel": "FOUL_LOG_CHANNEL_ID",
-                "leaderboard_log_channel": "LEADERBOARD_LOG_CHANNEL_ID",
-                "voice_log_channel": "VC_LOG_CHANNEL_ID",
-                "encouragement_log_channel": "ENCOURAGEMENT_LOG_CHANNEL_ID"
-            }
-            log_channel_var = global_vars.get(log_type)
-            if log_channel_var:
-                globals()[log_channel_var] = int(selected_channel_id)
-
-            # Update the log setup embed
-            embed = discord.Embed(title="Current Log Setup", color=discord.Color.default())
-            embed.add_field(name="Primary Log Channel", value=f"<#{PRIMARY_LOG_CHANNEL_ID}>", inline=False)
-            embed.add_field(name="Points Log Channel", value=f"<#{POINTS_LOG_CHANNEL_ID}>", inline=False)
-            embed.add_field(name="Reaction Log Channel", value=f"<#{REACT_LOG_CHANNEL_ID}>", inline=False)
-            embed.add_field(name="Foul Language Log Channel", value=f"<#{FOUL_LOG_CHANNEL_ID}>", inline=False)
-            embed.add_field(name="Leaderboard Log Channel", value=f"<#{LEADERBOARD_LOG_CHANNEL_ID}>", inline=False)
-            embed.add_field(name="Voice Channel Log Channel", value=f"<#{VC_LOG_CHANNEL_ID}>", inline=False)
-            embed.add_field(name="Encouragement Log Channel", value=f"<#{ENCOURAGEMENT_LOG_CHANNEL_ID}>", inline=False)
-
-            # Re-create dropdown menus and "Done" button
-            log_type_options = [
-                discord.SelectOption(label="Primary Log Channel", value="primary_log_channel"),
-                discord.SelectOption(label="Points Log Channel", value="points_log_channel"),
-                discord.SelectOption(label="Reaction Log Channel", value="reaction_log_channel"),
-                discord.SelectOption(label="Foul Language Log Channel", value="foul_log_channel"),
-                discord.SelectOption(label="Leaderboard Log Channel", value="leaderboard_log_channel"),
-                discord.SelectOption(label="Voice Log Channel", value="voice_log_channel"),
-                discord.SelectOption(label="Encouragement Log Channel", value="encouragement_log_channel")
-            ]
-
-            select_log_type = discord.ui.Select(
-                placeholder="Change log type...", 
-                options=log_type_options, 
-                custom_id="change_log_type"
-            )
-
-            options = [discord.SelectOption(label="None", value="None")]
-            for channel in interaction.guild.channels:
-                if isinstance(channel, discord.TextChannel):  # Only include text channels
-                    options.append(discord.SelectOption(label=channel.name, value=str(channel.id)))
-
-            select_channel = discord.ui.Select(
-                placeholder=f"Select a channel...", 
-                options=options, 
-                custom_id=f"select_{log_type}"
-            )
+            # Only the guild's moderators may change where its logs are sent
+            if not is_moderator(interaction.user):
+                await interaction.response.send_message("You do not have the required role to use this command.", ephemeral=True)
+                return
 
-            view = discord.ui.View()
-            view.add_item(select_channel)
-            view.add_item(select_log_type)
-            view.add_item(done_button)
+            # Update the invoking guild's log channel setting and save the new version
+            config = get_guild_config(interaction.guild.id)
+            if log_type in LOG_CHANNEL_SETTINGS:
+                _, config_attribute = LOG_CHANNEL_SETTINGS[log_type]
+                config = config.with_overrides(**{config_attribute: int(selected_channel_id)})
+                await set_guild_config(interaction.guild.id, config)
 
             # Edit the original message with the updated embed and view
-            await interaction.response.edit_message(embed=embed, view=view)
-
-        # Handle the dropdown menu for changing the log type
-        elif custom_id == "change_log_type":
-            selected_log_type = values[0]
-
-            # Create dropdown menu for channel selection
-            options = [discord.SelectOption(label="None", value="None")]
-            for channel in interaction.guild.channels:
-                if isinstance(channel, discord.TextChannel):  # Only include text channels
-                    options.append(discord.SelectOption(label=channel.name, value=str(channel.id)))
-
-            select_channel = discord.ui.Select(
-                placeholder=f"Select a channel for {selected_log_type}...", 
-                options=options, 
-                custom_id=f"select_{selected_log_type}"
-            )
-
-            # Re-create dropdown menus and "Done" button
-            log_type_options = [
-                discord.SelectOption(label="Primary Log Channel", value="primary_log_channel"),
-                discord.SelectOption(label="Points Log Channel", value="points_log_channel"),
-                discord.SelectOption(label="Reaction Log Channel", value="reaction_log_channel"),
-                discord.SelectOption(label="Foul Language Log Channel", value="foul_log_channel"),
-                discord.SelectOption(label="Leaderboard Log Channel", value="leaderboard_log_channel"),
-                discord.SelectOption(label="Voice Log Channel", value="voice_log_channel"),
-                discord.SelectOption(label="Encouragement Log Channel", value="encouragement_log_channel")
-            ]
-
-            select_log_type = discord.ui.Select(
-                placeholder="Change log type...", 
-                options=log_type_options, 
-                custom_id="change_log_type"
-            )
-
-            view = discord.ui.View()
-            view.add_item(select_channel)
-            view.add_item(select_log_type)
-            view.add_item(done_button)
-
-            # Edit the original message with the updated view
             await interaction.response.edit_message(
-                content=f"Select a channel for the {selected_log_type} log channel or change the log type:", 
-                view=view
+                embed=create_log_setup_embed(config),
+                view=create_log_setup_view(interaction.guild, log_type)
             )
 
         # Handle the "Done" button
@@ -637,6 +1613,50 @@ async def on_interaction(interaction: discord.Interaction):
             )
 
 
+# Event: Channel created
+@bot.event
+@metrics.track_event
+async def on_guild_channel_create(channel):
+    """
+    Triggered when a channel is created in a guild.
+
+    Actions:
+    - Drops the guild's cached !logsetup channel options if the new channel is a text channel.
+    """
+    if isinstance(channel, discord.TextChannel):
+        channel_options.invalidate(channel.guild.id)
+
+
+# Event: Channel deleted
+@bot.event
+@metrics.track_event
+async def on_guild_channel_delete(channel):
+    """
+    Triggered when a channel is deleted from a guild.
+
+    Actions:
+    - Drops the guild's cached !logsetup channel options if the channel was a text channel.
+    """
+    if isinstance(channel, discord.TextChannel):
+        channel_options.invalidate(channel.guild.id)
+
+
+# Event: Channel updated
+@bot.event
+@metrics.track_event
+async def on_guild_channel_update(before, after):
+    """
+    Triggered when a channel in a guild is changed.
+
+    Actions:
+    - Drops the guild's cached !logsetup channel options if a text channel was renamed, moved or converted.
+    """
+    if not isinstance(before, discord.TextChannel) and not isinstance(after, discord.TextChannel):
+        return
+    if before.name != after.name or before.position != after.position or type(before) is not type(after):
+        channel_options.invalidate(after.guild.id)
+
+
 
 
 
@@ -649,38 +1669,58 @@ async def on_interaction(interaction: discord.Interaction):
 # Commands
 # ---------------------------------
 
+# Hook: Start timing a command
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+
+# Hook: Record a command's duration and outcome
+@bot.after_invoke
+async def record_command_metrics(ctx):
+    metrics.command_finished(ctx.command.qualified_name, time.perf_counter() - ctx.started_at, ctx.command_failed)
+
+
+# Converter: Member or role named in a points command
+class PointsTarget(commands.Converter):
+    """
+    Converts a points command argument to a member or a role.
+
+    Plain numbers are rejected straight away, without a member lookup, so the
+    greedy list of targets ends at the points amount.
+    """
+
+    async def convert(self, ctx, argument):
+        if re.fullmatch(r"[-+]?\d{1,14}(\.\d*)?", argument):
+            raise commands.BadArgument("Points amount, not a member or role.")
+        if re.fullmatch(r"<@&\d+>", argument):
+            return await commands.RoleConverter().convert(ctx, argument)
+        try:
+            return await commands.MemberConverter().convert(ctx, argument)
+        except commands.MemberNotFound:
+            return await commands.RoleConverter().convert(ctx, argument)
+
+
 # Command: Add Points
 @bot.command(name='addpoints')
-@commands.has_any_role(*MODERATOR_ROLE_IDS)
-async def add_points(ctx, member: discord.Member, points: float):
+@commands.guild_only()
+@moderator_only()
+async def add_points(ctx, targets: commands.Greedy[PointsTarget], points: Optional[float] = None):
     """
-    Adds points to a specified member.
+    Adds points to one or more members, every member of a role, or the members listed in an attached CSV.
 
     Parameters:
     - ctx: Context of the command invocation.
-    - member: The member to whom points will be added.
-    - points: The number of points to add.
+    - targets: The members and/or roles to whom points will be added.
+    - points: The number of points to add to each member. Optional if a CSV with amounts is attached.
 
     Actions:
-    - Adds the specified points to the member's total points.
-    - Sends a confirmation message with the updated points.
-    - Logs the action with details of the command usage.
+    - Adds the points to every targeted member's total in one batch.
+    - Sends a single confirmation message with the updated points.
+    - Logs the action once, with details of the command usage.
     """
     try:
-        if member.id not in user_points:
-            user_points[member.id] = 0
-        user_points[member.id] += points
-        await ctx.send(embed=create_user_points_embed(member, points, "added by command"))
-        await log_action(
-            log_type="add_points",
-            title="Add Points Command",
-            description="Points added to a member.",
-            fields=[
-                ("Command used by", f"{ctx.author.mention}"),
-                ("Member affected", f"{member.mention}"),
-                ("Action", f"Added {points} points"),
-            ]
-        )
+        await change_points_by_command(ctx, targets, points, 1)
     except MissingAnyRole:
         await ctx.send("You do not have the required role to use this command.")
         print(f"Error: {ctx.author} tried to use 'addpoints' without required roles.")
@@ -688,36 +1728,24 @@ async def add_points(ctx, member: discord.Member, points: float):
 
 # Command: Remove Points
 @bot.command(name='removepoints')
-@commands.has_any_role(*MODERATOR_ROLE_IDS)
-async def remove_points(ctx, member: discord.Member, points: float):
+@commands.guild_only()
+@moderator_only()
+async def remove_points(ctx, targets: commands.Greedy[PointsTarget], points: Optional[float] = None):
     """
-    Removes points from a specified member.
+    Removes points from one or more members, every member of a role, or the members listed in an attached CSV.
 
     Parameters:
     - ctx: Context of the command invocation.
-    - member: The member from whom points will be removed.
-    - points: The number of points to remove.
+    - targets: The members and/or roles from whom points will be removed.
+    - points: The number of points to remove from each member. Optional if a CSV with amounts is attached.
 
     Actions:
-    - Deducts the specified points from the member's total points.
-    - Sends a confirmation message with the updated points.
-    - Logs the action with details of the command usage.
+    - Deducts the points from every targeted member's total in one batch.
+    - Sends a single confirmation message with the updated points.
+    - Logs the action once, with details of the command usage.
     """
     try:
-        if member.id not in user_points:
-            user_points[member.id] = 0
-        user_points[member.id] -= points
-        await ctx.send(embed=create_user_points_embed(member, -points, "removed by command"))
-        await log_action(
-            log_type="remove_points",
-            title="Remove Points Command",
-            description="Points removed from a member.",
-            fields=[
-                ("Command used by", f"{ctx.author.mention}"),
-                ("Member affected", f"{member.mention}"),
-                ("Action", f"Removed {points} points"),
-            ]
-        )
+        await change_points_by_command(ctx, targets, points, -1)
     except MissingAnyRole:
         await ctx.send("You do not have the required role to use this command.")
         print(f"Error: {ctx.author} tried to use 'removepoints' without required roles.")
@@ -728,6 +1756,7 @@ async def remove_points(ctx, member: discord.Member, points: float):
 
 # Command: Check Points
 @bot.command(name='points')
+@commands.guild_only()
 async def check_points(ctx, member: discord.Member = None):
     """
     Checks and displays the points of a specified member or the command user.
@@ -742,7 +1771,7 @@ async def check_points(ctx, member: discord.Member = None):
     - Logs the action with details of the command usage and the points checked.
     """
     member = member or ctx.author
-    points = user_points.get(member.id, 0)
+    points = get_user_points(ctx.guild.id, member.id)
     embed = discord.Embed(
         title="Points Check",
         description=f"{member.mention} has {points} points.",
@@ -750,6 +1779,7 @@ async def check_points(ctx, member: discord.Member = None):
     )
     await ctx.send(embed=embed)
     await log_action(
+        guild_id=ctx.guild.id,
         log_type="default",
         title="Points Command",
         description="Points checked for a member.",
@@ -758,12 +1788,68 @@ async def check_points(ctx, member: discord.Member = None):
             ("Member checked", f"{member.mention}"),
             ("Points", f"{points}"),
             ("Message Link", f"[Jump to message]({ctx.message.jump_url})")
-        ]
+        ],
+        severity="debug"
+    )
+
+
+# Command: Points History
+@bot.command(name='history')
+@commands.guild_only()
+async def history(ctx, member: discord.Member = None):
+    """
+    Displays the most recent points changes of a specified member or the command user.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - member: The member whose history will be shown. Defaults to the command user if not specified.
+
+    Actions:
+    - Reads the member's latest entries from the points ledger's per-member index, together with
+      any entries still waiting to be written, without forcing a write.
+    - Sends an embed message listing them.
+    - Logs the action with details of the command usage.
+    """
+    member = member or ctx.author
+
+    # Entries not written yet, then the written ones read on a worker thread. Holding the write lock
+    # waits for a batch being written, so every entry is either still pending or in the database
+    async with store_write_lock:
+        entries = store.pending_history(ctx.guild.id, member.id, 10)
+        entries += await asyncio.to_thread(store.history, ctx.guild.id, member.id, 10 - len(entries))
+
+    lines = []
+    for entry in entries:
+        line = f"**{entry.delta:+g}** · {HISTORY_REASON_LABELS.get(entry.reason, entry.reason)} · <t:{int(entry.created_at)}:R>"
+        if entry.actor_id:
+            line += f" · by <@{entry.actor_id}>"
+        lines.append(line)
+
+    embed = discord.Embed(
+        title="Points History",
+        description=(f"Latest points changes for {member.mention}:\n\n" + "\n".join(lines)) if lines
+        else f"{member.mention} has no points history.",
+        color=discord.Color.blue()
+    )
+    embed.add_field(name="Total Points", value=f"{get_user_points(ctx.guild.id, member.id)}", inline=False)
+    await ctx.send(embed=embed)
+    await log_action(
+        guild_id=ctx.guild.id,
+        log_type="default",
+        title="History Command",
+        description="Points history checked for a member.",
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Member checked", f"{member.mention}"),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})")
+        ],
+        severity="debug"
     )
 
 
 # Command: Leaderboard
 @bot.command(name='leaderboard')
+@commands.guild_only()
 async def leaderboard(ctx):
     """
     Displays the leaderboard showing the top 10 members with the highest points.
@@ -772,30 +1858,340 @@ async def leaderboard(ctx):
     - ctx: Context of the command invocation.
 
     Actions:
-    - Retrieves and sorts members based on their points.
+    - Reads the top 10 members from the leaderboard index (no sorting needed).
+    - Resolves their names from the member and name caches, fetching any misses concurrently.
     - Constructs an embed message listing the top 10 members and their points.
     - Sends the leaderboard embed message.
     - Logs the action with details of the command usage.
     """
-    sorted_users = sorted(user_points.items(), key=lambda item: item[1], reverse=True)
-    if not sorted_users:
+    top_users = get_leaderboard_index(ctx.guild.id).top(10)
+    if not top_users:
         await ctx.send("No points data available.")
         return
 
-    embed = discord.Embed(title="Leaderboard", color=discord.Color.gold())
+    await ctx.send(embed=await create_leaderboard_embed(ctx.guild, top_users))
+    await log_action(
+        guild_id=ctx.guild.id,
+        log_type="leaderboard",
+        title="Leaderboard Command",
+        description="Leaderboard displayed.",
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
+        ]
+    )
+
+
+# Command: Live Leaderboard
+@bot.command(name='liveleaderboard')
+@commands.guild_only()
+@moderator_only()
+async def live_leaderboard(ctx, action: Optional[str] = None):
+    """
+    Posts a leaderboard in the current channel and pins it, or stops updating the pinned leaderboard.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - action: Optional. "off" to stop updating the guild's pinned leaderboard.
+
+    Actions:
+    - Sends a leaderboard embed of the top members and pins it.
+    - Keeps editing that message as the top members change, at most once per edit interval,
+      replacing any earlier pinned leaderboard of the guild.
+    - With "off", stops updating the pinned leaderboard and leaves the message as it is.
+    - Logs the action with details of the command usage.
+    """
+    if action not in (None, "off"):
+        await ctx.send("Use `!liveleaderboard` to pin a leaderboard here, or `!liveleaderboard off` to stop updating it.")
+        return
+
+    guild_id = ctx.guild.id
+    previous = live_leaderboard_messages.pop((guild_id,), None)
+    live_leaderboards.untrack(guild_id)
+    if action == "off":
+        await ctx.send("The pinned leaderboard is no longer updated." if previous else "There is no pinned leaderboard.")
+        description = "Pinned leaderboard stopped."
+    else:
+        top_users = get_leaderboard_index(guild_id).top(LIVE_LEADERBOARD_SIZE)
+        message = await ctx.send(embed=await create_leaderboard_embed(ctx.guild, top_users, live=True))
+        live_leaderboard_messages[(guild_id,)] = (ctx.channel.id, message.id)
+        live_leaderboards.track(guild_id, top_users)
+        try:
+            await message.pin()
+        except discord.HTTPException as e:
+            print(f"Error: could not pin the leaderboard in channel {ctx.channel.id}: {e}")
+            await ctx.send("The leaderboard could not be pinned, but it will still be kept up to date.")
+        if previous:
+            await ctx.send("The previous pinned leaderboard is no longer updated.")
+        description = "Pinned leaderboard posted."
+
+    await log_action(
+        guild_id=guild_id,
+        log_type="leaderboard",
+        title="Live Leaderboard Command",
+        description=description,
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
+        ]
+    )
+
+
+# Command: Rank
+@bot.command(name='rank')
+@commands.guild_only()
+async def rank(ctx, member: discord.Member = None):
+    """
+    Displays the leaderboard position of a specified member or the command user.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - member: The member whose rank will be shown. Defaults to the command user if not specified.
 
-    # Adding top 10 users to the embed
-    for i, (user_id, points) in enumerate(sorted_users[:10], start=1):
-        user = await bot.fetch_user(user_id)
-        embed.add_field(name=f"{i}. {user.name}", value=f"{points} points", inline=False)
+    Actions:
+    - Looks up the member's rank and neighbouring entries in the leaderboard index.
+    - Sends an embed showing the member's position and the members ranked around them.
+    - Logs the action with details of the command usage.
+    """
+    member = member or ctx.author
+    leaderboard_index = get_leaderboard_index(ctx.guild.id)
+    position = leaderboard_index.rank(member.id)
+    if position is None:
+        await ctx.send(f"{member.mention} is not on the leaderboard yet.")
+        return
+
+    embed = discord.Embed(
+        title="Rank",
+        description=f"{member.mention} is ranked #{position} of {len(leaderboard_index)}.",
+        color=discord.Color.gold()
+    )
+    # Show the member together with the two members above and below them
+    lines = []
+    for i, user_id, points in leaderboard_index.around(member.id, 2):
+        line = f"{i}. <@{user_id}> - {points} points"
+        lines.append(f"**{line}**" if user_id == member.id else line)  # Highlight the member's own row
+    embed.add_field(name="Nearby", value="\n".join(lines), inline=False)
 
     await ctx.send(embed=embed)
     await log_action(
+        guild_id=ctx.guild.id,
         log_type="leaderboard",
-        title="Leaderboard Command",
-        description="Leaderboard displayed.",
+        title="Rank Command",
+        description="Rank checked for a member.",
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Member checked", f"{member.mention}"),
+            ("Rank", f"{position}"),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
+        ]
+    )
+
+
+# Command: Voice Time
+@bot.command(name='vctime')
+@commands.guild_only()
+async def vctime(ctx, member: Optional[discord.Member] = None, period: str = VOICE_TIME_DEFAULT_PERIOD):
+    """
+    Displays how long a member has spent in voice channels over a period.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - member: The member whose voice time will be shown. Defaults to the command user if not specified.
+    - period: One of VOICE_TIME_PERIODS ('today', 'week', 'month' or 'all').
+
+    Actions:
+    - Reads the member's total, rank and time per channel from the precomputed voice time rollups.
+    - Adds the part of the member's current voice session that falls inside the period.
+    - Sends an embed with the member's voice time and logs the command usage.
+    """
+    member = member or ctx.author
+    period = period.lower()
+    if period not in VOICE_TIME_PERIODS:
+        await ctx.send(f"Unknown period. Use one of: {', '.join(VOICE_TIME_PERIODS)}.")
+        return
+
+    total_seconds = voice_rollups.total(ctx.guild.id, member.id, period)
+    per_channel = voice_rollups.channels(ctx.guild.id, member.id, period)
+
+    # The current session is only added to the rollups when it ends, so count it here
+    state = member_states.get((ctx.guild.id, member.id))
+    current_seconds = 0
+    if state and state.vc_entry_time is not None:
+        started = max(state.vc_entry_time, period_start(period, get_utc_day()))
+        current_seconds = max(0, time.time() - started)
+    total_seconds += current_seconds
+
+    embed = discord.Embed(
+        title="Voice Time",
+        description=f"{member.mention} spent {timedelta(seconds=int(total_seconds))} in voice channels ({period}).",
+        color=discord.Color.green()
+    )
+    position = voice_rollups.leaderboard(ctx.guild.id, period).rank(member.id)
+    if position is not None:
+        embed.add_field(name="Rank", value=f"#{position}", inline=False)
+    if per_channel:
+        lines = [f"<#{channel_id}> - {timedelta(seconds=int(seconds))}" for channel_id, seconds in per_channel[:5]]
+        embed.add_field(name="Top Channels", value="\n".join(lines), inline=False)
+    if current_seconds:
+        embed.add_field(name="Current Session", value=f"{timedelta(seconds=int(current_seconds))} in <#{state.vc_channel_id}>", inline=False)
+
+    await ctx.send(embed=embed)
+    await log_action(
+        guild_id=ctx.guild.id,
+        log_type="leaderboard",
+        title="Voice Time Command",
+        description="Voice time checked for a member.",
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Member checked", f"{member.mention}"),
+            ("Period", period),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
+        ]
+    )
+
+
+# Command: Voice Leaderboard
+@bot.command(name='vcleaderboard')
+@commands.guild_only()
+async def vcleaderboard(ctx, period: str = VOICE_TIME_DEFAULT_PERIOD):
+    """
+    Displays the top 10 members by time spent in voice channels over a period.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - period: One of VOICE_TIME_PERIODS ('today', 'week', 'month' or 'all').
+
+    Actions:
+    - Reads the top 10 members from the period's voice leaderboard index (no sorting needed).
+    - Resolves their names from the member and name caches, fetching any misses concurrently.
+    - Sends the voice leaderboard embed and logs the command usage.
+    """
+    period = period.lower()
+    if period not in VOICE_TIME_PERIODS:
+        await ctx.send(f"Unknown period. Use one of: {', '.join(VOICE_TIME_PERIODS)}.")
+        return
+
+    top_users = voice_rollups.leaderboard(ctx.guild.id, period).top(10)
+    if not top_users:
+        await ctx.send("No voice time data available.")
+        return
+
+    embed = discord.Embed(title=f"Voice Leaderboard ({period})", color=discord.Color.gold())
+    names = await name_cache.resolve(ctx.guild, [user_id for _, user_id, _ in top_users], bot.fetch_user)
+    for i, user_id, seconds in top_users:
+        embed.add_field(name=f"{i}. {names[user_id]}", value=f"{timedelta(seconds=int(seconds))}", inline=False)
+
+    await ctx.send(embed=embed)
+    await log_action(
+        guild_id=ctx.guild.id,
+        log_type="leaderboard",
+        title="Voice Leaderboard Command",
+        description=f"Voice leaderboard displayed ({period}).",
+        fields=[
+            ("Command used by", f"{ctx.author.mention}"),
+            ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
+        ]
+    )
+
+
+# Command: Activity Stats
+@bot.command(name='stats')
+@commands.guild_only()
+async def stats(ctx, member: Optional[discord.Member] = None, start: str = None, end: str = None):
+    """
+    Displays activity statistics of the server and a member over a date range.
+
+    Parameters:
+    - ctx: Context of the command invocation.
+    - member: The member whose statistics will be shown. Defaults to the command user if not specified.
+    - start: Optional. Number of days up to today (e.g. '30'), or the first day of the range as YYYY-MM-DD.
+      Defaults to the last STATS_DEFAULT_DAYS days.
+    - end: Optional. The last day of the range as YYYY-MM-DD. Defaults to today.
+
+    Actions:
+    - Trims the range to the days activity has been recorded for, and refuses ranges longer
+      than STATS_MAX_DAYS days.
+    - Computes server totals, active members and top movers from whole columns of the
+      activity files, plus the member's totals and message streaks.
+    - Sends an embed with the statistics and logs the command usage.
+    """
+    member = member or ctx.author
+    today = get_utc_day()
+    try:
+        if start is None:
+            start_day, end_day = today - STATS_DEFAULT_DAYS + 1, today
+        elif start.isdigit():
+            start_day, end_day = today - int(start) + 1, today
+        else:
+            start_day = datetime.strptime(start, '%Y-%m-%d').toordinal()
+            end_day = datetime.strptime(end, '%Y-%m-%d').toordinal() if end else today
+    except ValueError:
+        await ctx.send("Use a number of days or dates like `!stats [@user] 2024-01-01 2024-01-31`.")
+        return
+    if end_day < start_day:
+        start_day, end_day = end_day, start_day
+    if start_day < 1:
+        await ctx.send("That range starts before the earliest date that can be shown.")
+        return
+
+    # Only days with recorded activity can have any, so trim the range to them before checking its length
+    guild_activity = activity.guild(ctx.guild.id)
+    start_day, end_day = max(start_day, guild_activity.first_day), min(end_day, today)
+    if end_day < start_day:
+        await ctx.send("No activity has been recorded in that range.")
+        return
+    if end_day - start_day + 1 > STATS_MAX_DAYS:
+        await ctx.send(f"Choose a range of at most {STATS_MAX_DAYS} days.")
+        return
+
+    started = time.perf_counter()
+    summary = guild_activity.summary(start_day, end_day, member.id)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    embed = discord.Embed(
+        title="Activity Stats",
+        description=f"{datetime.fromordinal(start_day):%Y-%m-%d} to {datetime.fromordinal(end_day):%Y-%m-%d}",
+        color=discord.Color.blue()
+    )
+    totals = summary.totals
+    embed.add_field(
+        name="Server",
+        value=(
+            f"Messages: {totals['messages']}\n"
+            f"Tick awards: {totals['awards']}\n"
+            f"Foul language penalties: {totals['penalties']}\n"
+            f"Voice time: {timedelta(seconds=totals['voice_seconds'])}\n"
+            f"Active members: {summary.active_members}"
+        ),
+        inline=False
+    )
+    if summary.movers:
+        lines = [f"<@{user_id}> - {messages} messages (+{change})" for user_id, messages, change in summary.movers]
+        embed.add_field(name="Top Movers", value="\n".join(lines), inline=False)
+    member_totals = summary.member_totals
+    embed.add_field(
+        name=member.display_name,
+        value=(
+            f"Messages: {member_totals['messages']}\n"
+            f"Tick awards: {member_totals['awards']}\n"
+            f"Foul language penalties: {member_totals['penalties']}\n"
+            f"Voice time: {timedelta(seconds=member_totals['voice_seconds'])}\n"
+            f"Current streak: {summary.current_streak} days\n"
+            f"Longest streak: {summary.longest_streak} days"
+        ),
+        inline=False
+    )
+    embed.set_footer(text=f"Computed in {elapsed_ms:.0f} ms")
+
+    await ctx.send(embed=embed)
+    await log_action(
+        guild_id=ctx.guild.id,
+        log_type="leaderboard",
+        title="Stats Command",
+        description="Activity stats displayed.",
         fields=[
             ("Command used by", f"{ctx.author.mention}"),
+            ("Member checked", f"{member.mention}"),
             ("Message Link", f"[Jump to message]({ctx.message.jump_url})"),
         ]
     )
@@ -803,7 +2199,8 @@ async def leaderboard(ctx):
 
 # Command: Log Setup
 @bot.command(name='logsetup')
-@commands.has_any_role(*MODERATOR_ROLE_IDS)
+@commands.guild_only()
+@moderator_only()
 async def logsetup(ctx):
     """
     Displays the current log setup of the server and allows setting up channels.
@@ -817,122 +2214,155 @@ async def logsetup(ctx):
     - Adds a "Done" button for finalizing the setup.
     - Sends the embed message with the interactive view attached.
     """
-    embed = discord.Embed(title="Current Log Setup", color=discord.Color.default())
+    # Send the current configuration with a dropdown menu for choosing a log type and a "Done" button
+    embed = create_log_setup_embed(get_guild_config(ctx.guild.id))
+    message = await ctx.send(embed=embed, view=create_log_setup_view(ctx.guild))
+    logsetup_message_id = message.id  # Store the message ID for reference if needed
 
-    # Add log channel details to the embed
-    embed.add_field(name="Primary Log Channel", value=f"<#{PRIMARY_LOG_CHANNEL_ID}>", inline=False)
-    embed.add_field(name="Points Log Channel", value=f"<#{POINTS_LOG_CHANNEL_ID}>", inline=False)
-    embed.add_field(name="Reaction Log Channel", value=f"<#{REACT_LOG_CHANNEL_ID}>", inline=False)
-    embed.add_field(name="Foul Language Log Channel", value=f"<#{FOUL_LOG_CHANNEL_ID}>", inline=False)
-    embed.add_field(name="Leaderboard Log Channel", value=f"<#{LEADERBOARD_LOG_CHANNEL_ID}>", inline=False)
-    embed.add_field(name="Voice Channel Log Channel", value=f"<#{VC_LOG_CHANNEL_ID}>", inline=False)
-    embed.add_field(name="Encouragement Log Channel", value=f"<#{ENCOURAGEMENT_LOG_CHANNEL_ID}>", inline=False)
-
-    # Define options for the log type dropdown menu
-    log_type_options = [
-        discord.SelectOption(label="Primary Log Channel", value="primary_log_channel"),
-        discord.SelectOption(label="Points Log Channel", value="points_log_channel"),
-        discord.SelectOption(label="Reaction Log Channel", value="reaction_log_channel"),
-        discord.SelectOption(label="Foul Language Log Channel", value="foul_log_channel"),
-        discord.SelectOption(label="Leaderboard Log Channel", value="leaderboard_log_channel"),
-        discord.SelectOption(label="Voice Log Channel", value="voice_log_channel"),
-        discord.SelectOption(label="Encouragement Log Channel", value="encouragement_log_channel")
-    ]
 
-    # Create dropdown menu for selecting log type
-    select_log_type = discord.ui.Select(
-        placeholder="Select a log type to configure...",
-        options=log_type_options,
-        custom_id="select_log_type"
-    )
 
-    # Create "Done" button with green color
-    done_button = discord.ui.Button(
-        label="Done",
-        style=discord.ButtonStyle.success,
-        custom_id="done_button"
-    )
 
-    # Create a view to hold the select menu and button
-    view = discord.ui.View()
-    view.add_item(select_log_type)
-    view.add_item(done_button)
 
-    # Send the initial message with the view attached
-    message = await ctx.send(embed=embed, view=view)
-    logsetup_message_id = message.id  # Store the message ID for reference if needed
 
 
 
 
 
+# ---------------------------------
+# Tasks
+# ---------------------------------
 
+# Task: Flush pending state changes to disk
+@tasks.loop(seconds=STORE_FLUSH_INTERVAL_SECONDS)
+async def flush_points_store():
+    """
+    Periodically writes all changed points and activity state to the database.
 
+    Actions:
+    - Collects the dirty entries and new ledger entries on the event loop so the snapshot is consistent.
+    - Adds a snapshot of every balance (and compacts the ledger) once per snapshot interval.
+    - Writes them in a single transaction on a worker thread so the loop is not blocked.
+    - Writes the changed pages of the activity files to disk on the event loop, since adding a day
+      replaces a segment's mapping and must not happen during the flush.
+    - Appends the buffered local log events to the log file, also on a worker thread.
+    - Keeps anything that failed to be written for the next run, so one failure neither loses
+      changes nor stops the task.
+    """
+    async with store_write_lock:
+        await write_store_batch(store.collect())
+    try:
+        activity.flush()
+    except Exception as e:
+        print(f"Error: could not flush the activity files: {e}")
+    events = log_sink.collect()
+    try:
+        await asyncio.to_thread(log_sink.write, events)
+    except Exception as e:
+        log_sink.requeue(events)
+        print(f"Error: could not write {len(events)} event(s) to the local log: {e}")
 
 
+# Task: Send finished log digests
+@tasks.loop(seconds=LOG_DIGEST_CHECK_SECONDS)
+async def send_log_digests():
+    """
+    Periodically sends a summary embed for every log digest whose interval is over.
 
-# ---------------------------------
-# Tasks
-# ---------------------------------
+    Actions:
+    - Closes the digests of log types ruled by LogRule.digest once their interval has passed.
+    - Queues one embed per guild and log type, listing how many events of each kind it covers.
+    """
+    for digest in log_digests.due(time.time()):
+        await send_log_digest(*digest)
+
+
+# Task: Write metrics to a file
+@tasks.loop(seconds=METRICS_FILE_INTERVAL_SECONDS)
+async def write_metrics_file():
+    """
+    Periodically writes the current metrics to METRICS_FILE for collectors that read files.
+    """
+    try:
+        metrics.write(METRICS_FILE)
+    except OSError as e:
+        print(f"Error: could not write metrics to {METRICS_FILE}: {e}")
 
-# Task: Reset daily message counts
-@tasks.loop(hours=24)
-async def reset_daily_messages():
+
+# Task: Evict stale daily message counts
+@tasks.loop(time=time_of_day(hour=0, minute=5, tzinfo=timezone.utc))
+async def evict_inactive_message_counts():
     """
-    Periodically resets daily message counts for all users.
+    Drops member records that only held a message count from a previous day, shortly after midnight UTC.
+
+    Counts reset lazily in `on_message` the first time a user speaks on a new day, so
+    this pass only frees memory held by users who have not spoken today and have no
+    points or voice session to keep.
 
     Actions:
-    - Resets the message count and date for each user to the current date.
-    - Logs the daily reset event.
+    - Removes empty member records whose message count is from before the current UTC day.
+    - Moves the rolling voice time periods on to the new day.
+    - Logs the daily reset event in every guild.
     """
-    # Reset the count and date for each user
-    for user_id in user_message_counts:
-        user_message_counts[user_id] = {'date': datetime.utcnow().date(), 'count': 0}
+    today = get_utc_day()
+    voice_rollups.roll_over(today)
+    stale_keys = [
+        key for key, state in member_states.items()
+        if state.message_day != today and state.is_empty() and not member_locks.locked(key)
+    ]
+    evicted_per_guild = {}
+    for guild_id, user_id in stale_keys:
+        del member_states[(guild_id, user_id)]
+        evicted_per_guild[guild_id] = evicted_per_guild.get(guild_id, 0) + 1
 
     # Log the daily reset event
-    await log_action(log_type="default", title="Daily Reset", description="Daily message counts reset.")
+    for guild in bot.guilds:
+        await log_action(
+            guild_id=guild.id,
+            log_type="default",
+            title="Daily Reset",
+            description=f"Daily message counts reset. {evicted_per_guild.get(guild.id, 0)} inactive users evicted."
+        )
 
 
 # Task: Send encouragement messages for voice channel participation
-@tasks.loop(minutes=CHECK_INTERVAL_MINUTES)
-async def check_vc_encouragement():
+async def send_vc_encouragement(vc_channel_id):
     """
-    Periodically checks users' voice channel entry times and sends encouragement messages.
+    Sends an encouragement message for a voice channel that has been occupied long enough.
+
+    Called by the encouragement scheduler only when a channel reaches its deadline, so
+    each channel gets at most one ping per cooldown period regardless of how many
+    members are in it.
+
+    Parameters:
+    - vc_channel_id (int): The ID of the voice channel to encourage others to join.
 
     Actions:
-    - Checks the time spent by users in voice channels.
-    - Sends an encouragement message if the user has been in the voice channel for a specified duration.
+    - Sends an encouragement message pinging the encouragement role.
     - Logs the encouragement message event.
     """
-    # Check each user's voice channel entry time and send encouragement if needed
-    for user_id, data in list(user_vc_entry_time.items()):
-        entry_time = data['entry_time']
-        vc_channel_id = data['vc_channel_id']
-        current_time = datetime.utcnow()
-        time_spent = current_time - entry_time
+    vc_channel = bot.get_channel(vc_channel_id)
+    if vc_channel:
+        config = get_guild_config(vc_channel.guild.id)
+        encouragement_role = discord.utils.get(vc_channel.guild.roles, id=config.encouragement_role_id)
+        if encouragement_role:
+            encouragement_channel = await get_log_channel(vc_channel.guild.id, config.encouragement_send_channel_id)
+            if encouragement_channel:
+                encouragement_message = f"Hey {encouragement_role.mention}, join the voice channel {vc_channel.mention} for some fun!"
+                sent_message = await encouragement_channel.send(encouragement_message)
 
-        # Send encouragement message if time spent exceeds the threshold
-        if time_spent >= timedelta(minutes=CHECK_INTERVAL_MINUTES):
-            vc_channel = bot.get_channel(vc_channel_id)
-            if vc_channel:
-                encouragement_role = discord.utils.get(vc_channel.guild.roles, id=ENCOURAGEMENT_ROLE_ID)
-                if encouragement_role:
-                    encouragement_channel = bot.get_channel(ENCOURAGEMENT_SEND_CHANNEL_ID)
-                    if encouragement_channel:
-                        encouragement_message = f"Hey {encouragement_role.mention}, join the voice channel {vc_channel.mention} for some fun!"
-                        sent_message = await encouragement_channel.send(encouragement_message)
+                # Log the encouragement message event
+                await log_action(
+                    guild_id=vc_channel.guild.id,
+                    log_type="encouragement",
+                    title="Encouragement Message Sent",
+                    description=f"Encouragement message sent to {encouragement_channel.mention}.",
+                    fields=[
+                        ("Voice Channel", f"{vc_channel.mention}"),
+                        ("Role", f"{encouragement_role.mention}"),
+                        ("Message Link", f"[Jump to message]({sent_message.jump_url})")
+                    ]
+                )
 
-                        # Log the encouragement message event
-                        await log_action(
-                            log_type="encouragement",
-                            title="Encouragement Message Sent",
-                            description=f"Encouragement message sent to {encouragement_channel.mention}.",
-                            fields=[
-                                ("Voice Channel", f"{vc_channel.mention}"),
-                                ("Role", f"{encouragement_role.mention}"),
-                                ("Message Link", f"[Jump to message]({sent_message.jump_url})")
-                            ]
-                        )
 
 
 
@@ -942,6 +2372,9 @@ async def check_vc_encouragement():
 
 
 
+# Run the bot (skipped when bot.py is imported, e.g. by the benchmarks)
+if __name__ == "__main__":
+    bot.run(BOT_TOKEN)
 
-# Run the bot
-bot.run(BOT_TOKEN)
+    # Write any changes made since the last flush before exiting
+    store.close()
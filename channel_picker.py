@@ -0,0 +1,61 @@
+import discord
+
+from guild_config import LOG_CHANNEL_SETTINGS
+
+
+# Discord allows at most 25 options per select menu; one is always the "None" option
+CHANNELS_PER_PAGE = 24
+
+# Options for choosing which log channel to configure; identical for every guild
+LOG_TYPE_OPTIONS = tuple(
+    discord.SelectOption(label=label, value=value) for value, (label, _) in LOG_CHANNEL_SETTINGS.items()
+)
+
+
+class ChannelOptionCache:
+    """
+    Per-guild select options for the !logsetup channel picker, split into pages.
+
+    Each guild's text channels are turned into options once and reused for every
+    click until a channel is created, deleted, renamed or moved, at which point the
+    guild's entry is invalidated and rebuilt on next use. Pages keep every channel
+    selectable even when a guild has more text channels than fit in one select menu.
+    """
+
+    def __init__(self):
+        self._pages = {}  # Guild ID -> tuple of pages, each a tuple of SelectOptions
+
+    def pages(self, guild):
+        """
+        Returns the guild's channel options, building them if they are not cached.
+
+        Parameters:
+        - guild (discord.Guild): The guild whose text channels are listed.
+
+        Returns:
+        - tuple: Pages of SelectOptions, each starting with the "None" option. Always at least one page.
+        """
+        pages = self._pages.get(guild.id)
+        if pages is None:
+            channel_options = [
+                discord.SelectOption(label=channel.name, value=str(channel.id)) for channel in guild.text_channels
+            ]
+            none_option = discord.SelectOption(label="None", value="None")
+            pages = tuple(
+                (none_option, *channel_options[start:start + CHANNELS_PER_PAGE])
+                for start in range(0, max(len(channel_options), 1), CHANNELS_PER_PAGE)
+            )
+            self._pages[guild.id] = pages
+        return pages
+
+    def invalidate(self, guild_id):
+        """
+        Forgets a guild's cached options so they are rebuilt on next use.
+
+        Parameters:
+        - guild_id (int): The guild whose channels changed.
+        """
+        self._pages.pop(guild_id, None)
+
+    def __len__(self):
+        return len(self._pages)
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class EncouragementScheduler:
+    """
+    Deadline-driven scheduler for voice channel encouragement pings.
+
+    Tracks who is in each voice channel from voice state events. When a channel
+    becomes occupied, a deadline is pushed onto a heap; a single background task
+    sleeps until the earliest deadline and only then does any work. A channel is
+    pinged once it has been occupied for `threshold_seconds`, and at most once per
+    `cooldown_seconds` after that. Deadlines for channels that emptied in the
+    meantime are discarded lazily, so idle periods cost nothing.
+    """
+
+    def __init__(self, threshold_seconds, cooldown_seconds, on_due):
+        """
+        Parameters:
+        - threshold_seconds (float): How long a channel must be occupied before the first ping.
+        - cooldown_seconds (float): Minimum time between pings for the same channel.
+        - on_due (coroutine function): Called with the channel ID when a ping is due.
+        """
+        self.threshold_seconds = threshold_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.on_due = on_due
+        self._occupants = {}    # Channel ID -> set of member IDs currently in it
+        self._generation = {}   # Channel ID -> ID of its current occupancy period
+        self._last_ping = {}    # Channel ID -> time of the last ping
+        self._deadlines = []    # Heap of (due time, channel ID, occupancy period ID)
+        self._periods = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """
+        Starts the background task. Must be called from a running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """
+        Stops the background task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def join(self, channel_id, member_id, joined_at=None):
+        """
+        Records a member entering a voice channel.
+
+        Parameters:
+        - channel_id (int): The voice channel joined.
+        - member_id (int): The member who joined.
+        - joined_at (float): Optional. Unix time the member joined. Defaults to now.
+        """
+        joined_at = time.time() if joined_at is None else joined_at
+        occupants = self._occupants.get(channel_id)
+        if occupants:
+            occupants.add(member_id)
+            return
+
+        # The channel just became occupied: start a new occupancy period
+        self._occupants[channel_id] = {member_id}
+        period = next(self._periods)
+        self._generation[channel_id] = period
+        due = joined_at + self.threshold_seconds
+        last_ping = self._last_ping.get(channel_id)
+        if last_ping is not None:
+            due = max(due, last_ping + self.cooldown_seconds)
+        self._schedule(due, channel_id, period)
+
+    def leave(self, channel_id, member_id):
+        """
+        Records a member leaving a voice channel.
+
+        Parameters:
+        - channel_id (int): The voice channel left.
+        - member_id (int): The member who left.
+        """
+        occupants = self._occupants.get(channel_id)
+        if not occupants:
+            return
+        occupants.discard(member_id)
+        if not occupants:
+            # Any pending deadline for this period is now stale and will be skipped
+            del self._occupants[channel_id]
+            del self._generation[channel_id]
+
+    def occupancy(self, channel_id):
+        """
+        Returns:
+        - int: Number of tracked members in the channel.
+        """
+        return len(self._occupants.get(channel_id, ()))
+
+    def pending_count(self):
+        """
+        Returns:
+        - int: Number of deadlines on the heap, including stale ones not yet discarded.
+        """
+        return len(self._deadlines)
+
+    def _schedule(self, due, channel_id, period):
+        heapq.heappush(self._deadlines, (due, channel_id, period))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._deadlines:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._deadlines[0][0] - time.time()
+            if delay > 0:
+                # Sleep until the earliest deadline, or until an earlier one is added
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, channel_id, period = heapq.heappop(self._deadlines)
+            if self._generation.get(channel_id) != period:
+                continue  # The channel emptied since this deadline was set
+
+            now = time.time()
+            self._last_ping[channel_id] = now
+            self._schedule(now + self.cooldown_seconds, channel_id, period)
+            self._forget_old_pings(now)
+            try:
+                await self.on_due(channel_id)
+            except Exception as e:
+                print(f"Error: encouragement for channel {channel_id} failed: {e}")
+
+    def _forget_old_pings(self, now):
+        # Pings older than the cooldown no longer affect scheduling for empty channels
+        for channel_id, pinged_at in list(self._last_ping.items()):
+            if channel_id not in self._occupants and pinged_at + self.cooldown_seconds <= now:
+                del self._last_ping[channel_id]
@@ -0,0 +1,92 @@
+from collections import deque
+
+
+class FoulWordMatcher:
+    """
+    Aho-Corasick automaton for finding every foul word in a message in one pass.
+
+    The automaton is compiled once from the word list. Matching walks the lower-cased
+    message a single time, so the cost is linear in the message length no matter how
+    many words are in the list, and every hit is reported with its position.
+    """
+
+    def __init__(self, words):
+        """
+        Builds the automaton for the given words.
+
+        Parameters:
+        - words (iterable of str): The foul words to detect. Matching is case-insensitive.
+        """
+        self.words = []        # Unique, lower-cased words in their original order
+        self._goto = [{}]      # Per-node transitions: character -> node index
+        self._fail = [0]       # Per-node failure link
+        self._output = [()]    # Per-node indices of words that end here (including via suffix links)
+
+        for word in words:
+            word = word.lower()
+            if word and word not in self.words:
+                self._insert(word, len(self.words))
+                self.words.append(word)
+        self._link()
+
+    def _insert(self, word, word_index):
+        node = 0
+        for char in word:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        self._output[node] = (word_index,)
+
+    def _link(self):
+        # Breadth-first pass computing failure links and merging suffix outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail if fail != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def find_all(self, text):
+        """
+        Finds every occurrence of every foul word in the text.
+
+        Parameters:
+        - text (str): The text to scan.
+
+        Returns:
+        - list of tuples: (start index, word) for each match, in the order they end in the text.
+        """
+        matches = []
+        goto, fail, output, words = self._goto, self._fail, self._output, self.words
+        node = 0
+        for position, char in enumerate(text.lower()):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for word_index in output[node]:
+                word = words[word_index]
+                matches.append((position - len(word) + 1, word))
+        return matches
+
+    @staticmethod
+    def unique_words(matches):
+        """
+        Lists each matched word once, in order of first appearance.
+
+        Parameters:
+        - matches (list of tuples): The result of `find_all`.
+
+        Returns:
+        - list of str: The distinct words that were matched.
+        """
+        return list(dict.fromkeys(word for _, word in matches))
@@ -0,0 +1,124 @@
+import discord
+
+
+# Log channel settings shown by !logsetup: option value -> (label, GuildConfig attribute)
+LOG_CHANNEL_SETTINGS = {
+    "primary_log_channel": ("Primary Log Channel", "primary_log_channel_id"),
+    "points_log_channel": ("Points Log Channel", "points_log_channel_id"),
+    "reaction_log_channel": ("Reaction Log Channel", "react_log_channel_id"),
+    "foul_log_channel": ("Foul Language Log Channel", "foul_log_channel_id"),
+    "leaderboard_log_channel": ("Leaderboard Log Channel", "leaderboard_log_channel_id"),
+    "voice_log_channel": ("Voice Log Channel", "vc_log_channel_id"),
+    "encouragement_log_channel": ("Encouragement Log Channel", "encouragement_log_channel_id"),
+}
+
+# Log types passed to log_action -> GuildConfig attribute of the channel they go to
+LOG_TYPE_CHANNELS = {
+    "points": "points_log_channel_id",
+    "reaction": "react_log_channel_id",
+    "foul_language": "foul_log_channel_id",
+    "leaderboard": "leaderboard_log_channel_id",
+    "vc": "vc_log_channel_id",
+    "encouragement": "encouragement_log_channel_id",
+    "default": "primary_log_channel_id",
+}
+
+# Log types passed to log_action -> embed color
+LOG_TYPE_COLORS = {
+    "add_points": discord.Color.green(),    # Color for adding points logs
+    "remove_points": discord.Color.red(),   # Color for removing points logs
+    "reaction": discord.Color.fuchsia(),    # Color for reaction logs
+    "foul_language": discord.Color.red(),   # Color for foul language logs
+    "leaderboard": discord.Color.gold(),    # Color for leaderboard logs
+    "vc_join": discord.Color.green(),       # Color for voice channel join logs
+    "vc_leave": discord.Color.red(),        # Color for voice channel leave logs
+    "vc_switch": discord.Color.yellow(),    # Color for voice channel switch logs
+    "encouragement": discord.Color.purple(),# Color for encouragement logs
+    "default": discord.Color.default()      # Default color
+}
+UNKNOWN_LOG_TYPE_COLOR = discord.Color.blue()
+
+
+class GuildConfig:
+    """
+    Settings for one guild: where its logs go, who its moderators are and whom to ping.
+
+    Every guild starts from the bot-wide defaults in bot.py plus any log channels it
+    changed with !logsetup (its overrides). Instances are immutable: a change produces
+    a new config with the next version number, which replaces the old one in a single
+    assignment, so readers never see a half-applied change. Each config resolves its
+    log routing once, so routing a log is a single dictionary lookup.
+    """
+
+    __slots__ = (
+        "primary_log_channel_id",
+        "points_log_channel_id",
+        "react_log_channel_id",
+        "foul_log_channel_id",
+        "leaderboard_log_channel_id",
+        "vc_log_channel_id",
+        "encouragement_log_channel_id",
+        "encouragement_send_channel_id",
+        "encouragement_role_id",
+        "moderator_role_ids",
+        "version",      # Increases by one with every change made through !logsetup
+        "overrides",    # Settings changed through !logsetup, which are persisted
+        "routes",       # Log type -> (channel ID, embed color)
+        "_defaults",
+        "_fallback_route",
+    )
+
+    SETTINGS = __slots__[:10]
+
+    def __init__(self, defaults, overrides=None, version=0):
+        """
+        Parameters:
+        - defaults (dict): Bot-wide values for any of the attributes in `SETTINGS`.
+          Log channels that are not given default to the primary log channel.
+        - overrides (dict): Optional. Guild-specific values that take precedence over the defaults.
+        - version (int): Optional. Version number of the overrides.
+        """
+        settings = {**defaults, **(overrides or {})}
+        primary = settings.get("primary_log_channel_id")
+        set_slot = super().__setattr__
+        for name in self.SETTINGS:
+            set_slot(name, settings.get(name, primary if name.endswith("log_channel_id") else None))
+        set_slot("moderator_role_ids", frozenset(self.moderator_role_ids or ()))
+        set_slot("version", version)
+        set_slot("overrides", dict(overrides or {}))
+        set_slot("_defaults", defaults)
+
+        # Resolve every known log type to its channel and color up front
+        routes = {}
+        for log_type in LOG_TYPE_CHANNELS.keys() | LOG_TYPE_COLORS.keys():
+            channel_id = getattr(self, LOG_TYPE_CHANNELS.get(log_type, "primary_log_channel_id"))
+            routes[log_type] = (channel_id, LOG_TYPE_COLORS.get(log_type, UNKNOWN_LOG_TYPE_COLOR))
+        set_slot("routes", routes)
+        set_slot("_fallback_route", (self.primary_log_channel_id, UNKNOWN_LOG_TYPE_COLOR))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GuildConfig is immutable; use with_overrides to change it")
+
+    def with_overrides(self, **changes):
+        """
+        Returns a new config with some settings changed and the version increased.
+
+        Parameters:
+        - changes: New values for any of the attributes in `SETTINGS`.
+
+        Returns:
+        - GuildConfig: The updated config.
+        """
+        return GuildConfig(self._defaults, {**self.overrides, **changes}, self.version + 1)
+
+    def route(self, log_type):
+        """
+        Returns where a log type is sent and its embed color, defaulting to the primary log channel.
+
+        Parameters:
+        - log_type (str): The type of log (e.g., 'points', 'reaction', 'foul_language').
+
+        Returns:
+        - tuple: (channel ID or None if no channel is configured, discord.Color)
+        """
+        return self.routes.get(log_type, self._fallback_route)
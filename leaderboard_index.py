@@ -0,0 +1,197 @@
+import random
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels):
+        self.key = key                  # (-points, user_id), so higher points sort first
+        self.next = [None] * levels     # Next node at each level
+        self.width = [1] * levels       # Number of positions skipped by each link
+
+
+class LeaderboardIndex:
+    """
+    Ranked index of users by points, kept up to date on every points change.
+
+    Backed by an indexable skip list, so updating a user's points, finding a user's
+    rank and reading the entry at a given rank all take O(log n) time. Reading the
+    top N is a walk along the bottom level and never sorts. Users with equal points
+    are ordered by user ID, so ties always come out the same way. Users with 0 points
+    are not ranked, so the index holds the same users after a restart as before it.
+    """
+
+    MAX_LEVELS = 24  # Enough for ~16 million users
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVELS)
+        self._keys = {}  # User ID -> current key in the skip list
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rebuild(self, points_by_user):
+        """
+        Replaces the index contents with the given points.
+
+        Parameters:
+        - points_by_user (dict): Maps user IDs to points.
+        """
+        self._head = _Node(None, self.MAX_LEVELS)
+        self._keys = {}
+        for user_id, points in points_by_user.items():
+            self.update(user_id, points)
+
+    def update(self, user_id, points):
+        """
+        Sets a user's points, moving them to their new position, or removing them once they have 0 points.
+
+        Parameters:
+        - user_id (int): The user whose points changed.
+        - points (float): The user's new total points.
+        """
+        if not points:
+            self.discard(user_id)
+            return
+        old_key = self._keys.get(user_id)
+        new_key = (-points, user_id)
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            self._remove(old_key)
+        self._insert(new_key)
+        self._keys[user_id] = new_key
+
+    def discard(self, user_id):
+        """
+        Removes a user from the index if present.
+
+        Parameters:
+        - user_id (int): The user to remove.
+        """
+        old_key = self._keys.pop(user_id, None)
+        if old_key is not None:
+            self._remove(old_key)
+
+    def rank(self, user_id):
+        """
+        Returns a user's 1-based position on the leaderboard.
+
+        Parameters:
+        - user_id (int): The user to look up.
+
+        Returns:
+        - int: The user's rank, or None if the user has no points entry.
+        """
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        node, position = self._head, 0
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position + 1
+
+    def _node_at(self, rank):
+        # Find the node at a 1-based rank by following link widths
+        node, remaining = self._head, rank
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def entries(self, start_rank, count):
+        """
+        Reads consecutive leaderboard entries starting at a rank.
+
+        Parameters:
+        - start_rank (int): The 1-based rank of the first entry.
+        - count (int): The maximum number of entries to return.
+
+        Returns:
+        - list of tuples: (rank, user_id, points) for each entry.
+        """
+        if start_rank < 1 or start_rank > len(self):
+            return []
+        node = self._node_at(start_rank)
+        result = []
+        rank = start_rank
+        while node is not None and len(result) < count:
+            result.append((rank, node.key[1], -node.key[0]))
+            node = node.next[0]
+            rank += 1
+        return result
+
+    def top(self, count):
+        """
+        Returns the highest ranked users.
+
+        Parameters:
+        - count (int): How many entries to return.
+
+        Returns:
+        - list of tuples: (rank, user_id, points) for each entry.
+        """
+        return self.entries(1, count)
+
+    def around(self, user_id, radius):
+        """
+        Returns a user's entry together with their neighbours on the leaderboard.
+
+        Parameters:
+        - user_id (int): The user at the centre.
+        - radius (int): How many entries to include above and below the user.
+
+        Returns:
+        - list of tuples: (rank, user_id, points) for each entry, or an empty list if the user is not ranked.
+        """
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start_rank = max(1, rank - radius)
+        return self.entries(start_rank, rank - start_rank + radius + 1)
+
+    def _insert(self, key):
+        chain = [None] * self.MAX_LEVELS
+        steps_at_level = [0] * self.MAX_LEVELS
+        node = self._head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        # Pick a random height with a geometric distribution
+        height = 1
+        while height < self.MAX_LEVELS and random.random() < 0.5:
+            height += 1
+
+        new_node = _Node(key, height)
+        steps = 0
+        for level in range(height):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(height, self.MAX_LEVELS):
+            chain[level].width[level] += 1
+
+    def _remove(self, key):
+        chain = [None] * self.MAX_LEVELS
+        node = self._head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self.MAX_LEVELS):
+            chain[level].width[level] -= 1
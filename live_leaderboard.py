@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class LiveLeaderboards:
+    """
+    Keeps one pinned leaderboard message per guild up to date, editing it only when its top entries change.
+
+    Every points change is reported to `points_changed`. The guild's last rendered
+    entries are kept, so a change to a member who is not shown and whose points are
+    still below the last shown entry returns straight away. Any other change marks the
+    guild's message for an edit. Edits wait until at least `min_interval` seconds after
+    the guild's previous edit, so a burst of changes becomes one edit. When an edit is
+    due, the current top entries are compared with the last rendered ones and the
+    message is only edited if they differ.
+    """
+
+    def __init__(self, size, min_interval, top_of, publish):
+        """
+        Parameters:
+        - size (int): Number of entries shown on each leaderboard.
+        - min_interval (float): Minimum seconds between two edits of the same guild's message.
+        - top_of (callable): Returns a guild's current top entries as (rank, user ID, points) tuples.
+        - publish (coroutine function): Called with the guild ID and the entries to show. Returns False
+          if the message no longer exists, which stops tracking the guild.
+        """
+        self.size = size
+        self.min_interval = min_interval
+        self.top_of = top_of
+        self.publish = publish
+        self._rendered = {}    # Guild ID -> entries last shown, or None until first rendered
+        self._shown = {}       # Guild ID -> {user ID: points} of the members last shown
+        self._cutoff = {}      # Guild ID -> lowest points shown, or None while fewer than `size` are shown
+        self._edited_at = {}   # Guild ID -> monotonic time of the last edit
+        self._due = []         # Heap of (monotonic time an edit may happen, guild ID, version)
+        self._pending = {}     # Guild ID -> version of its current edit on the heap
+        self._versions = itertools.count()  # Versions of scheduled edits; older heap entries for a guild are skipped
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._shown)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._shown
+
+    def start(self):
+        """
+        Starts the background task. Must be called from a running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """
+        Stops the background task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def track(self, guild_id, entries=None):
+        """
+        Starts keeping a guild's leaderboard message up to date.
+
+        Parameters:
+        - guild_id (int): The guild.
+        - entries (list): Optional. The entries the message was just rendered with. If not given
+          (e.g. after a restart), the message is refreshed as soon as possible.
+        """
+        self._remember(guild_id, entries)
+        if entries is None:
+            self._schedule(guild_id, time.monotonic())
+        else:
+            self._edited_at[guild_id] = time.monotonic()
+
+    def untrack(self, guild_id):
+        """
+        Stops keeping a guild's leaderboard message up to date.
+
+        Parameters:
+        - guild_id (int): The guild.
+        """
+        self._rendered.pop(guild_id, None)
+        self._shown.pop(guild_id, None)
+        self._cutoff.pop(guild_id, None)
+        self._edited_at.pop(guild_id, None)
+        self._pending.pop(guild_id, None)  # Its heap entries are now stale and skipped when popped
+
+    def points_changed(self, guild_id, user_id, points):
+        """
+        Records a points change, scheduling an edit only if it may change what the guild's message shows.
+
+        Parameters:
+        - guild_id (int): The guild of the member.
+        - user_id (int): The member whose points changed.
+        - points (float): The member's new total points.
+        """
+        shown = self._shown.get(guild_id)
+        if shown is None or guild_id in self._pending:
+            return
+        cutoff = self._cutoff[guild_id]
+        if user_id not in shown and cutoff is not None and points < cutoff:
+            return  # Still below everyone shown
+        self._schedule(guild_id, self._edited_at.get(guild_id, 0) + self.min_interval)
+
+    def pending_count(self):
+        """
+        Returns:
+        - int: Number of guilds waiting for an edit.
+        """
+        return len(self._pending)
+
+    def _remember(self, guild_id, entries):
+        self._rendered[guild_id] = entries
+        self._shown[guild_id] = {user_id: points for _, user_id, points in entries or ()}
+        full = entries is not None and len(entries) >= self.size
+        self._cutoff[guild_id] = entries[-1][2] if full else None
+
+    def _schedule(self, guild_id, due):
+        version = next(self._versions)
+        self._pending[guild_id] = version
+        heapq.heappush(self._due, (due, guild_id, version))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._due:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._due[0][0] - time.monotonic()
+            if delay > 0:
+                # Sleep until the earliest edit may happen, or until an earlier one is scheduled
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, guild_id, version = heapq.heappop(self._due)
+            if self._pending.get(guild_id) != version:
+                continue  # The guild stopped being tracked, or the edit was rescheduled since
+            del self._pending[guild_id]
+
+            entries = self.top_of(guild_id)
+            if entries == self._rendered.get(guild_id):
+                continue  # The change did not reach what is shown
+            self._edited_at[guild_id] = time.monotonic()
+            try:
+                published = await self.publish(guild_id, entries)
+            except Exception as e:
+                print(f"Error: could not update the live leaderboard of guild {guild_id}: {e}")
+                self._schedule(guild_id, self._edited_at[guild_id] + self.min_interval)
+                continue
+            if not published:
+                self.untrack(guild_id)
+            elif guild_id in self._shown:
+                self._remember(guild_id, entries)
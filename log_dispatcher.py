@@ -0,0 +1,134 @@
+import asyncio
+from collections import namedtuple
+
+
+# Discord limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS_PER_MESSAGE = 6000
+
+
+# Lightweight reference to a sent log message, enough to link to it without fetching it
+LogRecord = namedtuple("LogRecord", ["channel_id", "message_id", "jump_url"])
+
+
+def batch_embeds(items, embed_of=lambda item: item):
+    """
+    Splits items into batches that each fit in one message, respecting both the embed count and character limits.
+
+    Parameters:
+    - items (list): Embeds, or items carrying an embed.
+    - embed_of (callable): Optional. Returns the embed of an item.
+
+    Yields:
+    - list: The items for one message.
+    """
+    batch, size = [], 0
+    for item in items:
+        embed_size = len(embed_of(item))
+        if batch and (len(batch) >= MAX_EMBEDS_PER_MESSAGE or size + embed_size > MAX_EMBED_CHARACTERS_PER_MESSAGE):
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += embed_size
+    if batch:
+        yield batch
+
+
+class LogDispatcher:
+    """
+    Background queue that coalesces log embeds into as few messages as possible.
+
+    `enqueue` returns immediately with a future. Pending embeds are grouped per
+    destination channel and sent together, up to Discord's limit of ten embeds per
+    message, either once a channel has a full batch or once the oldest pending embed
+    has waited `max_latency` seconds. Each future resolves to a `LogRecord` for the
+    message that carried its embed, or None if sending failed.
+    """
+
+    def __init__(self, max_latency=2.0):
+        """
+        Parameters:
+        - max_latency (float): Longest time in seconds an embed may wait before being sent.
+        """
+        self.max_latency = max_latency
+        self._pending = {}            # Channel ID -> (channel, list of (embed, future))
+        self._wakeup = asyncio.Event()  # Set when the queue goes from empty to non-empty
+        self._full = asyncio.Event()    # Set when some channel has a full batch waiting
+        self._task = None
+        self._closed = False
+
+    def start(self):
+        """
+        Starts the background sender task. Must be called from a running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, channel, embed):
+        """
+        Queues an embed to be sent to a channel.
+
+        Parameters:
+        - channel (discord.abc.Messageable): The destination channel.
+        - embed (discord.Embed): The embed to send.
+
+        Returns:
+        - asyncio.Future: Resolves to a LogRecord for the message containing the embed, or None.
+        """
+        future = asyncio.get_running_loop().create_future()
+        _, entries = self._pending.setdefault(channel.id, (channel, []))
+        entries.append((embed, future))
+        self._wakeup.set()
+        if len(entries) >= MAX_EMBEDS_PER_MESSAGE:
+            self._full.set()
+        return future
+
+    def pending_count(self):
+        """
+        Returns:
+        - int: Number of embeds waiting to be sent.
+        """
+        return sum(len(entries) for _, entries in self._pending.values())
+
+    async def _run(self):
+        while not self._closed:
+            await self._wakeup.wait()
+            # Give more embeds a chance to join the batch, unless one is already full
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.max_latency)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        """
+        Sends everything that is currently pending, one request per batch.
+        """
+        self._wakeup.clear()
+        self._full.clear()
+        pending, self._pending = self._pending, {}
+        await asyncio.gather(*(self._send_channel(channel, entries) for channel, entries in pending.values()))
+
+    async def _send_channel(self, channel, entries):
+        for batch in batch_embeds(entries, embed_of=lambda entry: entry[0]):
+            try:
+                message = await channel.send(embeds=[embed for embed, _ in batch])
+                record = LogRecord(channel.id, message.id, message.jump_url)
+            except Exception as e:
+                print(f"Error: failed to send {len(batch)} log embed(s) to channel {channel.id}: {e}")
+                record = None
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(record)
+
+    async def close(self):
+        """
+        Stops the background task once it has sent anything still pending.
+        """
+        self._closed = True
+        self._wakeup.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
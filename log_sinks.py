@@ -0,0 +1,239 @@
+import json
+import os
+import random
+import threading
+from collections import Counter
+
+
+# Log severities, least to most severe
+SEVERITIES = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+# How a log rule decides whether an event is sent to Discord
+SEND_ALL = "all"        # Every event
+SEND_NONE = "none"      # No event; it is only kept locally
+SAMPLE = "sample"       # A random fraction of events
+ABOVE = "above"         # Events at or above a severity
+DIGEST = "digest"       # One summary per guild and interval instead of the events
+
+
+class LogRule:
+    """
+    Decides which events of a log type are also sent to Discord.
+
+    Every event is written to the local log sink regardless of its rule, so a rule
+    only controls what costs API calls. Create rules with the class methods, e.g.
+    `LogRule.sample(0.1)` or `LogRule.digest(3600)`.
+    """
+
+    __slots__ = ("mode", "rate", "min_severity", "interval")
+
+    def __init__(self, mode=SEND_ALL, rate=1.0, min_severity="debug", interval=None):
+        """
+        Parameters:
+        - mode (str): One of SEND_ALL, SEND_NONE, SAMPLE, ABOVE or DIGEST.
+        - rate (float): Optional. Fraction of events sent, for SAMPLE.
+        - min_severity (str): Optional. Lowest severity sent, for ABOVE.
+        - interval (float): Optional. Seconds covered by each summary, for DIGEST.
+        """
+        if min_severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity: {min_severity}")
+        self.mode = mode
+        self.rate = rate
+        self.min_severity = min_severity
+        self.interval = interval
+
+    @classmethod
+    def all(cls):
+        return cls(SEND_ALL)
+
+    @classmethod
+    def none(cls):
+        return cls(SEND_NONE)
+
+    @classmethod
+    def sample(cls, rate):
+        return cls(SAMPLE, rate=rate)
+
+    @classmethod
+    def above(cls, severity):
+        return cls(ABOVE, min_severity=severity)
+
+    @classmethod
+    def digest(cls, interval):
+        return cls(DIGEST, interval=interval)
+
+    def sends(self, severity):
+        """
+        Decides whether a single event is sent to Discord. Not used for DIGEST rules.
+
+        Parameters:
+        - severity (str): The event's severity.
+
+        Returns:
+        - bool: True if the event should be sent.
+        """
+        if self.mode == SEND_ALL:
+            return True
+        if self.mode == SAMPLE:
+            return random.random() < self.rate
+        if self.mode == ABOVE:
+            return SEVERITIES[severity] >= SEVERITIES[self.min_severity]
+        return False
+
+
+class JsonlLogSink:
+    """
+    Local structured log: every log event as one JSON object per line, in size-rotated files.
+
+    Adding an event only appends it to an in-memory buffer. Like the points store, the
+    buffer is drained on the event loop with `collect`, and the events are encoded and
+    written from a worker thread with `write`, so the event loop never encodes JSON.
+    When the file would grow past `max_bytes` it is renamed to `<path>.1` (shifting
+    older files up) and a new file is started; only `backups` old files are kept.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5):
+        """
+        Parameters:
+        - path (str): The current log file. Its directory is created if needed.
+        - max_bytes (int): Optional. Size at which the file is rotated.
+        - backups (int): Optional. Number of rotated files kept.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = []  # Events not yet written
+        self._lock = threading.Lock()  # Serialises writes coming from worker threads
+
+    def add(self, event):
+        """
+        Queues an event to be written.
+
+        Parameters:
+        - event (dict): JSON-serialisable event. It must not be changed after it is added.
+        """
+        self._buffer.append(event)
+
+    def pending_count(self):
+        """
+        Returns:
+        - int: Number of events waiting to be written.
+        """
+        return len(self._buffer)
+
+    def collect(self):
+        """
+        Drains the buffered events. Must be called from the thread that adds events (the event loop).
+
+        Returns:
+        - list of dict: The events to pass to `write`.
+        """
+        events, self._buffer = self._buffer, []
+        return events
+
+    def requeue(self, events):
+        """
+        Puts events whose write failed back in front of the buffer, so the next write retries them.
+
+        Parameters:
+        - events (list of dict): Events returned by `collect`.
+        """
+        self._buffer = events + self._buffer
+
+    def write(self, events):
+        """
+        Appends events to the log file, one JSON line each, rotating the file when it grows too large.
+
+        Parameters:
+        - events (list of dict): Events returned by `collect`.
+        """
+        if not events:
+            return
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            chunk = []
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            for event in events:
+                line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+                line_size = len(line.encode("utf-8"))
+                if size and size + line_size > self.max_bytes:
+                    self._append(chunk)
+                    self._rotate()
+                    chunk, size = [], 0
+                chunk.append(line)
+                size += line_size
+            self._append(chunk)
+
+    def _append(self, lines):
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.writelines(lines)
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def flush(self):
+        """
+        Collects and writes all buffered events synchronously.
+        """
+        self.write(self.collect())
+
+
+class LogDigests:
+    """
+    Counts events of digest-ruled log types per guild until their interval is over.
+
+    Each (guild, log type) pair has an open digest from its first event until
+    `interval` seconds later. Only counts are kept (events per title), so a digest
+    costs the same memory however many events it covers.
+    """
+
+    def __init__(self):
+        self._open = {}  # (Guild ID, log type) -> [due time, first time, last time, Counter of titles]
+
+    def __len__(self):
+        return len(self._open)
+
+    def add(self, guild_id, log_type, title, now, interval):
+        """
+        Counts an event towards its guild's digest for the log type.
+
+        Parameters:
+        - guild_id (int): The guild of the event.
+        - log_type (str): The event's log type.
+        - title (str): The event's title, e.g. "Points Command".
+        - now (float): Unix time of the event.
+        - interval (float): Seconds a new digest stays open.
+        """
+        digest = self._open.get((guild_id, log_type))
+        if digest is None:
+            digest = [now + interval, now, now, Counter()]
+            self._open[(guild_id, log_type)] = digest
+        digest[2] = now
+        digest[3][title] += 1
+
+    def due(self, now=None):
+        """
+        Closes and returns the digests whose interval is over (all of them if `now` is None).
+
+        Parameters:
+        - now (float): Optional. Current Unix time.
+
+        Returns:
+        - list of tuples: (guild ID, log type, first time, last time, Counter of titles) for each digest.
+        """
+        closed = []
+        for key, (due_at, first, last, titles) in list(self._open.items()):
+            if now is None or due_at <= now:
+                del self._open[key]
+                closed.append((*key, first, last, titles))
+        return closed
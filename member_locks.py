@@ -0,0 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class MemberLocks:
+    """
+    One lock per member, so updates to a member's state that wait on Discord apply strictly in order.
+
+    A handler that reads a member's state, awaits something (e.g. the log message it
+    links to) and then writes the state again holds the member's lock for the whole
+    update, so a second event for the same member waits for the first to finish instead
+    of interleaving with it. Locks are FIFO, so a member's updates apply in the order
+    their events arrived. Events for other members take other locks and are never held
+    up. A lock exists only while it is held or waited on, so memory stays proportional
+    to the members being updated right now, not to the size of the guild.
+
+    State changes that do not await anything, like `add_user_points`, are already
+    atomic on the event loop and do not need a lock.
+    """
+
+    def __init__(self):
+        self._locks = {}  # Member key -> [lock, number of holders and waiters]
+
+    @asynccontextmanager
+    async def hold(self, key):
+        """
+        Waits for, and holds for the duration of the block, the lock of one member.
+
+        Parameters:
+        - key (tuple): The member's (guild ID, user ID).
+        """
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = [asyncio.Lock(), 0]
+            self._locks[key] = entry
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def locked(self, key):
+        """
+        Parameters:
+        - key (tuple): The member's (guild ID, user ID).
+
+        Returns:
+        - bool: True if an update to the member is in progress.
+        """
+        return key in self._locks
+
+    def __len__(self):
+        return len(self._locks)
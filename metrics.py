@@ -0,0 +1,297 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from bisect import bisect_left
+
+
+# Histogram bucket upper bounds in seconds, from fast in-memory handlers up to rate-limited REST calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route of the REST request currently being made, so rate-limit warnings can be attributed to it
+_current_route = contextvars.ContextVar("current_route", default="unknown")
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count, one series per combination of label values.
+    """
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}  # Tuple of label values -> count
+
+    def inc(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    A distribution of observed durations, one series per combination of label values.
+
+    Observing costs one bisect over a handful of bounds and three additions; the
+    cumulative bucket counts Prometheus expects are only computed when rendering.
+    """
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # Tuple of label values -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        bucket_names = self.label_names + ("le",)
+        for label_values, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_names, label_values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    A value read from the bot's state only when metrics are rendered, so it costs nothing otherwise.
+    """
+
+    def __init__(self, name, help_text, label_names, read):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.read = read  # Returns a number, or a dict of label value tuples -> number
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.read()
+        except Exception as e:
+            print(f"Error: could not read metric {self.name}: {e}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class _RateLimitCounter(logging.Handler):
+    # discord.py handles 429s internally and only reports them as log warnings
+    def __init__(self, counter):
+        super().__init__(level=logging.WARNING)
+        self.counter = counter
+
+    def emit(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited"):
+            self.counter.inc(_current_route.get())
+
+
+class Metrics:
+    """
+    In-process instrumentation for event handlers, commands and REST calls.
+
+    Recording is a few dictionary operations per event. Everything is rendered in
+    the Prometheus text exposition format only when scraped over HTTP or written to
+    a file, so the bot pays almost nothing when no one is looking.
+    """
+
+    def __init__(self, prefix="ep_bot"):
+        """
+        Parameters:
+        - prefix (str): Prepended to every metric name.
+        """
+        self.prefix = prefix
+        self._metrics = []
+        self._server = None
+        self.events = self.counter("events_total", "Events handled, by handler and outcome.", ("handler", "outcome"))
+        self.event_seconds = self.histogram("event_duration_seconds", "Time spent in each event handler.", ("handler",))
+        self.commands = self.counter("commands_total", "Commands invoked, by command and outcome.", ("command", "outcome"))
+        self.command_seconds = self.histogram("command_duration_seconds", "Time spent running each command.", ("command",))
+        self.rest_requests = self.counter("rest_requests_total", "Discord REST requests, by route and status.", ("route", "status"))
+        self.rest_seconds = self.histogram("rest_request_duration_seconds", "Discord REST request time including retries.", ("route",))
+        self.rest_rate_limits = self.counter("rest_rate_limits_total", "429 responses received from Discord, by route.", ("route",))
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(f"{self.prefix}_{name}", help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(f"{self.prefix}_{name}", help_text, label_names, buckets))
+
+    def gauge(self, name, help_text, read, label_names=()):
+        """
+        Registers a gauge that is read from the bot's state at render time.
+
+        Parameters:
+        - name (str): Metric name, without the prefix.
+        - help_text (str): Description shown to Prometheus.
+        - read (callable): Returns a number, or a dict mapping label value tuples to numbers.
+        - label_names (tuple): Optional. Names of the labels when `read` returns a dict.
+        """
+        return self._register(Gauge(f"{self.prefix}_{name}", help_text, label_names, read))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def track_event(self, handler):
+        """
+        Decorator that counts and times an event handler.
+
+        Apply it below `@bot.event` so the registered coroutine keeps the handler's name.
+        """
+        name = handler.__name__
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await handler(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                self.event_seconds.observe(time.perf_counter() - started, name)
+                self.events.inc(name, outcome)
+
+        return wrapper
+
+    def command_finished(self, command, seconds, failed):
+        """
+        Records one command invocation.
+
+        Parameters:
+        - command (str): The command's qualified name.
+        - seconds (float): How long the command ran.
+        - failed (bool): Whether the command raised an error.
+        """
+        self.command_seconds.observe(seconds, command)
+        self.commands.inc(command, "error" if failed else "ok")
+
+    def instrument_http(self, http):
+        """
+        Wraps a discord.py HTTP client so every REST request is counted and timed per route.
+
+        Routes are labelled by their template (e.g. `POST /channels/{channel_id}/messages`),
+        so the number of series stays small no matter how many channels the bot uses.
+
+        Parameters:
+        - http (discord.http.HTTPClient): The client's HTTP client (`bot.http`).
+        """
+        request = http.request
+
+        @functools.wraps(request)
+        async def instrumented_request(route, **kwargs):
+            key = route.key
+            token = _current_route.set(key)
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = await request(route, **kwargs)
+                status = "ok"
+                return result
+            except Exception as e:
+                status = str(getattr(e, "status", "error"))
+                raise
+            finally:
+                self.rest_seconds.observe(time.perf_counter() - started, key)
+                self.rest_requests.inc(key, status)
+                _current_route.reset(token)
+
+        http.request = instrumented_request
+        logging.getLogger("discord.http").addHandler(_RateLimitCounter(self.rest_rate_limits))
+
+    def render(self):
+        """
+        Returns:
+        - str: Every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes the rendered metrics to a file, replacing it atomically (e.g. for node_exporter's textfile collector).
+
+        Parameters:
+        - path (str): Destination file.
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(temporary_path, path)
+
+    async def serve(self, host, port):
+        """
+        Starts a minimal HTTP server answering every request with the rendered metrics.
+
+        Parameters:
+        - host (str): Interface to listen on, e.g. "127.0.0.1".
+        - port (int): Port to listen on.
+        """
+        self._server = await asyncio.start_server(self._handle_scrape, host, port)
+
+    async def _handle_scrape(self, reader, writer):
+        try:
+            # Read and ignore the request line and headers
+            while (await reader.readline()).strip():
+                pass
+            body = self.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except Exception as e:
+            print(f"Error: metrics scrape failed: {e}")
+        finally:
+            writer.close()
+
+    async def close(self):
+        """
+        Stops the HTTP server, if running.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
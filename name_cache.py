@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class NameCache:
+    """
+    Least-recently-used cache of user display names with a time-to-live.
+
+    Names are resolved from the guild member cache first, then from this cache, and
+    only the remaining misses are fetched from the Discord API, all at once. Names of
+    cached members are kept per guild, since they include the member's nickname there.
+    Fetched users carry only their global name, so those are kept once per user (under
+    the guild ID None) and shown in every guild. Member and user events invalidate
+    entries, but they are only delivered with the Server Members intent; without it,
+    entries are refreshed only when their time-to-live runs out.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=3600):
+        """
+        Parameters:
+        - max_size (int): Maximum number of names to keep.
+        - ttl_seconds (float): How long a cached name stays valid.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (Guild ID or None, user ID) -> (name, expiry time)
+
+    def get(self, guild_id, user_id):
+        """
+        Returns a cached name if it has not expired.
+
+        Parameters:
+        - guild_id (int): The guild the name is shown in, or None outside of guilds.
+        - user_id (int): The user to look up.
+
+        Returns:
+        - str: The cached name, or None if missing or expired.
+        """
+        key = (guild_id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return name
+
+    def set(self, guild_id, user_id, name):
+        """
+        Stores a name, evicting the least recently used entry if the cache is full.
+
+        Parameters:
+        - guild_id (int): The guild the name is shown in, or None outside of guilds.
+        - user_id (int): The user the name belongs to.
+        - name (str): The name to cache.
+        """
+        key = (guild_id, user_id)
+        self._entries[key] = (name, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, guild_id, user_id):
+        """
+        Removes a user's cached name in one guild.
+
+        Parameters:
+        - guild_id (int): The guild the name is shown in, or None outside of guilds.
+        - user_id (int): The user to forget.
+        """
+        self._entries.pop((guild_id, user_id), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def resolve(self, guild, user_ids, fetch_user):
+        """
+        Resolves display names for several users with as few API calls as possible.
+
+        Parameters:
+        - guild (discord.Guild): The guild whose member cache is checked first, or None.
+        - user_ids (iterable of int): The users to resolve.
+        - fetch_user (coroutine function): Fetches a user from the API by ID.
+
+        Returns:
+        - dict: Maps each user ID to its display name.
+        """
+        names = {}
+        missing = []
+        guild_id = guild.id if guild else None
+        for user_id in user_ids:
+            member = guild.get_member(user_id) if guild else None
+            if member is not None:
+                names[user_id] = member.display_name
+                self.set(guild_id, user_id, member.display_name)
+                continue
+            name = self.get(guild_id, user_id) if guild_id is not None else None
+            if name is None:
+                name = self.get(None, user_id)
+            if name is not None:
+                names[user_id] = name
+            else:
+                missing.append(user_id)
+
+        # Fetch whatever is left concurrently instead of one request at a time; users have no nickname, so
+        # their global names are cached for every guild
+        results = await asyncio.gather(*(fetch_user(user_id) for user_id in missing), return_exceptions=True)
+        for user_id, user in zip(missing, results):
+            if isinstance(user, Exception):
+                print(f"Error: could not fetch user {user_id}: {user}")
+                names[user_id] = f"Unknown User ({user_id})"
+            else:
+                names[user_id] = user.display_name
+                self.set(None, user_id, user.display_name)
+        return names
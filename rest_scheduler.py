@@ -0,0 +1,245 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+from contextlib import contextmanager
+
+import discord
+
+
+# Priority classes of outgoing REST requests, most urgent first
+INTERACTIVE = 0    # Replies to users: command responses and points embeds
+MODERATION = 1     # Deleting messages with foul language
+ENCOURAGEMENT = 2  # Voice channel encouragement pings
+LOGS = 3           # Log embeds
+PRIORITY_NAMES = ("interactive", "moderation", "encouragement", "logs")
+
+# Priority of requests made from the current task; tasks inherit it from the code that created them
+_current_priority = contextvars.ContextVar("rest_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def rest_priority(priority):
+    """
+    Gives every REST request made inside the block, and in tasks created inside it, a priority class.
+
+    Parameters:
+    - priority (int): One of INTERACTIVE, MODERATION, ENCOURAGEMENT or LOGS.
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class RequestShed(discord.DiscordException):
+    """
+    Raised instead of sending a request that waited longer than its priority class allows.
+    """
+
+
+class RestScheduler:
+    """
+    Admits outgoing Discord REST requests in priority order instead of first come, first served.
+
+    discord.py queues requests per rate-limit bucket in arrival order, so a backlog of
+    log embeds delays a user's reply to the same channel, and every request shares the
+    global request budget. This scheduler sits in front of the HTTP client. A request
+    goes straight through while its route has capacity left (as tracked by discord.py
+    from Discord's X-RateLimit headers) and a global token bucket has a token.
+    Otherwise it waits, and waiting requests are admitted most urgent class first. Lower
+    classes are therefore deferred while higher ones are waiting, and a class with a
+    shed limit has requests that waited longer than that fail with RequestShed instead
+    of being sent late.
+    """
+
+    def __init__(self, global_rate=45, shed_after=None, on_shed=None):
+        """
+        Parameters:
+        - global_rate (float): Optional. Requests per second allowed across all routes (Discord allows 50).
+        - shed_after (dict): Optional. Priority class -> seconds a request may wait before it is shed.
+          Classes that are not listed wait as long as needed.
+        - on_shed (callable): Optional. Called with the priority class name whenever a request is shed.
+        """
+        self.global_rate = global_rate
+        self.shed_after = shed_after or {}
+        self.on_shed = on_shed
+        self._http = None
+        self._tokens = float(global_rate)  # Global token bucket, one second of burst
+        self._refilled_at = None
+        self._in_flight = {}  # Bucket key -> requests admitted and not yet finished
+        self._waiting = []    # Heap of [priority, sequence, bucket key, future, time queued]
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def install(self, http):
+        """
+        Wraps a discord.py HTTP client so all of its requests go through the scheduler.
+
+        Parameters:
+        - http (discord.http.HTTPClient): The client's HTTP client (`bot.http`).
+        """
+        self._http = http
+        request = http.request
+
+        @functools.wraps(request)
+        async def scheduled_request(route, **kwargs):
+            key = self._bucket_key(route)
+            await self.acquire(key, _current_priority.get())
+            try:
+                return await request(route, **kwargs)
+            finally:
+                self.release(key)
+
+        http.request = scheduled_request
+
+    def start(self):
+        """
+        Starts the task that admits waiting requests. Must be called from a running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def _bucket_key(self, route):
+        # Same key discord.py files the route's rate limit under
+        bucket_hash = getattr(self._http, "_bucket_hashes", {}).get(route.key)
+        return f"{bucket_hash or route.key}:{route.major_parameters}"
+
+    def _route_capacity(self, key, now):
+        # Returns (requests the route can take now, loop time it can take more or None if unknown)
+        bucket = getattr(self._http, "_buckets", {}).get(key)
+        in_flight = self._in_flight.get(key, 0)
+        if bucket is None or not getattr(bucket, "dirty", True):
+            return 1 - in_flight, None  # Limits unknown: one request at a time until Discord reports them
+        if bucket.expires is not None and now >= bucket.expires:
+            return bucket.limit - in_flight, None
+        # Requests admitted here but not yet counted by discord.py still use up the remaining budget
+        uncounted = max(0, in_flight - bucket.outgoing)
+        return bucket.remaining - uncounted, bucket.expires
+
+    def _refill(self, now):
+        if self._refilled_at is not None:
+            self._tokens = min(self.global_rate, self._tokens + (now - self._refilled_at) * self.global_rate)
+        self._refilled_at = now
+
+    def _admit(self, key):
+        self._tokens -= 1
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    async def acquire(self, key, priority):
+        """
+        Waits until a request may be sent.
+
+        Parameters:
+        - key (str): The request's rate-limit bucket key.
+        - priority (int): The request's priority class.
+
+        Raises:
+        - RequestShed: If the request waited longer than its class allows.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self._refill(now)
+        if not self._waiting and self._tokens >= 1 and self._route_capacity(key, now)[0] > 0:
+            self._admit(key)
+            return
+        future = loop.create_future()
+        heapq.heappush(self._waiting, [priority, next(self._sequence), key, future, now])
+        self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(key)  # Admitted just as the caller was cancelled
+            raise
+
+    def release(self, key):
+        """
+        Marks a request as finished, freeing its place on the route.
+
+        Parameters:
+        - key (str): The request's rate-limit bucket key.
+        """
+        remaining = self._in_flight.get(key, 0) - 1
+        if remaining > 0:
+            self._in_flight[key] = remaining
+        else:
+            self._in_flight.pop(key, None)
+        if self._waiting:
+            self._wakeup.set()
+
+    def pending_counts(self):
+        """
+        Returns:
+        - dict: Priority class name -> number of requests waiting.
+        """
+        counts = dict.fromkeys(PRIORITY_NAMES, 0)
+        for priority, _, _, future, _ in self._waiting:
+            if not future.done():
+                counts[PRIORITY_NAMES[priority]] += 1
+        return counts
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            self._refill(now)
+            wake_at = self._dispatch(now)
+            timeout = None if wake_at is None else max(0.0, wake_at - loop.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, now):
+        # Admit waiting requests most urgent first; returns when something may next become possible
+        kept, blocked, wake_at = [], set(), None
+        while self._waiting:
+            entry = heapq.heappop(self._waiting)
+            priority, _, key, future, queued_at = entry
+            if future.done():
+                continue  # The caller was cancelled
+            shed_after = self.shed_after.get(priority)
+            if shed_after is not None and now - queued_at >= shed_after:
+                future.set_exception(RequestShed(
+                    f"{PRIORITY_NAMES[priority]} request dropped after waiting {now - queued_at:.0f}s"))
+                if self.on_shed is not None:
+                    self.on_shed(PRIORITY_NAMES[priority])
+                continue
+            kept.append(entry)
+            if shed_after is not None:
+                wake_at = min(wake_at or float("inf"), queued_at + shed_after)
+            if self._tokens < 1:
+                # Out of global budget: nothing else is admitted, so lower classes wait behind this one
+                wake_at = min(wake_at or float("inf"), now + (1 - self._tokens) / self.global_rate)
+                continue
+            if key in blocked:
+                continue
+            capacity, reopens_at = self._route_capacity(key, now)
+            if capacity <= 0:
+                blocked.add(key)
+                if reopens_at is not None:
+                    wake_at = min(wake_at or float("inf"), reopens_at)
+                continue
+            kept.pop()
+            self._admit(key)
+            future.set_result(None)
+        for entry in kept:
+            heapq.heappush(self._waiting, entry)
+        return wake_at
+
+    async def close(self):
+        """
+        Stops admitting requests and fails any that are still waiting.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for _, _, _, future, _ in self._waiting:
+            if not future.done():
+                future.set_exception(RequestShed("the bot is shutting down"))
+        self._waiting = []
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+
+
+class SeenSet:
+    """
+    Bounded set of recently seen keys that forgets each key after a time window.
+
+    Used to make actions idempotent, e.g. to award a tick reaction only once per
+    message and moderator even if the reaction is removed and added again. Keys are
+    kept in insertion order, which is also expiry order, so expired keys are dropped
+    from the front in amortised constant time, and the oldest keys are evicted first
+    once `max_size` is reached.
+    """
+
+    def __init__(self, max_size=100000, ttl_seconds=86400):
+        """
+        Parameters:
+        - max_size (int): Maximum number of keys to remember.
+        - ttl_seconds (float): How long a key is remembered.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._expiry = OrderedDict()  # Key -> time it is forgotten
+
+    def add(self, key):
+        """
+        Records a key unless it was already seen within the window.
+
+        Parameters:
+        - key: Any hashable value.
+
+        Returns:
+        - bool: True if the key is new, False if it was seen within the window.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._expiry:
+            return False
+        self._expiry[key] = now + self.ttl_seconds
+        if len(self._expiry) > self.max_size:
+            self._expiry.popitem(last=False)
+        return True
+
+    def __contains__(self, key):
+        self._expire(time.monotonic())
+        return key in self._expiry
+
+    def _expire(self, now):
+        while self._expiry:
+            oldest_key, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            del self._expiry[oldest_key]
+
+    def __len__(self):
+        return len(self._expiry)
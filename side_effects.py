@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+
+
+# What to do when a queue is full
+BLOCK = "block"              # Make the submitting handler wait for room (backpressure)
+DROP_OLDEST = "drop_oldest"  # Discard the longest-waiting effect to make room
+
+
+class SideEffectQueue:
+    """
+    Bounded queue of Discord side effects (replies, deletions) run by background workers.
+
+    Event handlers update state synchronously and submit their side effects here
+    instead of awaiting Discord, so a slow or rate-limited endpoint no longer delays
+    the handler or the commands behind it. Effects submitted with the same merge key
+    while an earlier one is still waiting are merged into a single call, e.g. several
+    reply embeds for one channel become one message. When the queue is full it either
+    applies backpressure or drops the oldest waiting effect, as configured.
+    """
+
+    def __init__(self, name, max_size=1000, workers=2, when_full=BLOCK, on_drop=None):
+        """
+        Parameters:
+        - name (str): Name used in error messages and metrics.
+        - max_size (int): Optional. Maximum number of waiting effects.
+        - workers (int): Optional. Number of effects run concurrently.
+        - when_full (str): Optional. BLOCK or DROP_OLDEST.
+        - on_drop (callable): Optional. Called with the queue name whenever an effect is dropped.
+        """
+        self.name = name
+        self.max_size = max_size
+        self.workers = workers
+        self.when_full = when_full
+        self.on_drop = on_drop
+        self._queue = asyncio.Queue(maxsize=max_size)  # Keys of waiting effects, oldest first
+        self._waiting = {}  # Key -> (run, list of items) for effects not yet picked up by a worker
+        self._keys = itertools.count()  # Keys for effects that are never merged
+        self._tasks = []
+
+    def start(self):
+        """
+        Starts the worker tasks. Must be called from a running event loop.
+        """
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def submit(self, run, *args):
+        """
+        Queues a single side effect.
+
+        Parameters:
+        - run (coroutine function): The effect, e.g. `message.delete`.
+        - args: Arguments passed to `run`.
+        """
+        await self._put(("single", next(self._keys)), lambda items: run(*args), None)
+
+    async def submit_merged(self, key, item, run_batch):
+        """
+        Queues an item whose effect can be merged with others submitted under the same key.
+
+        Parameters:
+        - key: Items with equal keys waiting at the same time are handled by one call.
+        - item: The item to add, e.g. an embed.
+        - run_batch (coroutine function): Called with the list of merged items.
+        """
+        waiting = self._waiting.get(("merged", key))
+        if waiting is not None:
+            waiting[1].append(item)
+            return
+        await self._put(("merged", key), run_batch, item)
+
+    async def _put(self, key, run, item):
+        if self._queue.full() and self.when_full == DROP_OLDEST:
+            self._drop(self._queue.get_nowait())
+        self._waiting[key] = (run, [] if item is None else [item])
+        try:
+            if self.when_full == BLOCK:
+                await self._queue.put(key)
+            else:
+                self._queue.put_nowait(key)
+        except BaseException:
+            del self._waiting[key]
+            raise
+
+    def _drop(self, key):
+        self._waiting.pop(key, None)
+        self._queue.task_done()
+        if self.on_drop is not None:
+            self.on_drop(self.name)
+
+    async def _work(self):
+        while True:
+            key = await self._queue.get()
+            run, items = self._waiting.pop(key)
+            try:
+                await run(items)
+            except Exception as e:
+                print(f"Error: {self.name} side effect failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def pending_count(self):
+        """
+        Returns:
+        - int: Number of effects waiting to run.
+        """
+        return self._queue.qsize()
+
+    async def drain(self):
+        """
+        Waits until every queued effect has run.
+        """
+        if self._tasks:
+            await self._queue.join()
+
+    async def close(self):
+        """
+        Waits for every queued effect to run, then stops the workers.
+        """
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
@@ -0,0 +1,607 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from log_dispatcher import LogRecord
+
+
+# ---------------------------------
+# Tracked Dictionaries
+# ---------------------------------
+
+class TrackedDict(dict):
+    """
+    A dictionary that remembers which keys were changed since the last flush.
+
+    Reads behave exactly like a normal dict so the bot can keep using it as its
+    in-memory hot cache. Writes and deletes record the key in `dirty`, which the
+    store drains when it flushes to disk.
+
+    Values mutated in place (e.g. `member_states[key].points += 1`) do not go
+    through `__setitem__`, so callers mutating them must call `touch`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.dirty = set()  # Keys changed or deleted since the last flush
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.dirty.add(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.dirty.add(key)
+
+    def pop(self, key, *default):
+        self.dirty.add(key)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.dirty.update(self.keys())
+        super().clear()
+
+    def touch(self, key):
+        """
+        Marks a key as changed after its value was mutated in place.
+
+        Parameters:
+        - key: The key whose value was modified.
+        """
+        self.dirty.add(key)
+
+    def forget(self, key):
+        """
+        Drops a key from memory without deleting it from storage.
+
+        Keys with changes not yet flushed are kept, since dropping them would turn
+        the pending write into a delete.
+
+        Parameters:
+        - key: The key to drop.
+
+        Returns:
+        - bool: True if the key was dropped.
+        """
+        if key in self.dirty:
+            return False
+        super().pop(key, None)
+        return True
+
+    def load(self, items):
+        """
+        Fills the dictionary from storage without marking anything dirty.
+
+        Parameters:
+        - items (iterable of tuples): Key/value pairs read from the database.
+        """
+        super().update(items)
+
+
+# ---------------------------------
+# Member State
+# ---------------------------------
+
+class MemberState:
+    """
+    Everything the bot tracks about one member, in a single compact record.
+
+    Uses `__slots__` so each record is a small fixed-size object instead of a
+    per-instance dict, and handlers need one lookup per event instead of one per
+    piece of state.
+    """
+
+    __slots__ = (
+        "points",           # Total points
+        "message_day",      # UTC day number the message count belongs to
+        "message_count",    # Messages sent on `message_day`
+        "vc_channel_id",    # Voice channel the member is in, or None
+        "vc_entry_time",    # Unix time the member entered `vc_channel_id`, or None
+        "vc_join_log",      # LogRecord of the session's join log, or None
+        "vc_transfer_log",  # LogRecord of the session's latest switch log, or None
+        "vc_total_time",    # Seconds spent in earlier channels of the current session
+    )
+
+    def __init__(self, points=0, message_day=0, message_count=0, vc_channel_id=None, vc_entry_time=None,
+                 vc_join_log=None, vc_transfer_log=None, vc_total_time=0):
+        self.points = points
+        self.message_day = message_day
+        self.message_count = message_count
+        self.vc_channel_id = vc_channel_id
+        self.vc_entry_time = vc_entry_time
+        self.vc_join_log = vc_join_log
+        self.vc_transfer_log = vc_transfer_log
+        self.vc_total_time = vc_total_time
+
+    def clear_vc_session(self):
+        """
+        Forgets the member's current voice channel session.
+        """
+        self.vc_channel_id = None
+        self.vc_entry_time = None
+        self.vc_join_log = None
+        self.vc_transfer_log = None
+        self.vc_total_time = 0
+
+    def is_empty(self):
+        """
+        Returns:
+        - bool: True if the record holds nothing worth keeping once its message count is stale.
+        """
+        return self.points == 0 and self.vc_channel_id is None
+
+
+# ---------------------------------
+# Row Encoding
+# ---------------------------------
+
+def _encode_log_record(record):
+    return json.dumps(record) if record else None
+
+
+def _decode_log_record(value):
+    return LogRecord(*json.loads(value)) if value else None
+
+
+def _encode_member(state):
+    return (
+        state.points, state.message_day, state.message_count, state.vc_channel_id, state.vc_entry_time,
+        _encode_log_record(state.vc_join_log), _encode_log_record(state.vc_transfer_log), state.vc_total_time,
+    )
+
+
+def _decode_member(row):
+    points, message_day, message_count, vc_channel_id, vc_entry_time, join_log, transfer_log, vc_total_time = row
+    return MemberState(
+        points, message_day, message_count, vc_channel_id, vc_entry_time,
+        _decode_log_record(join_log), _decode_log_record(transfer_log), vc_total_time,
+    )
+
+
+def _encode_seconds(seconds):
+    return (seconds,)
+
+
+def _decode_seconds(row):
+    return row[0]
+
+
+def _encode_message_ref(message_ref):
+    return tuple(message_ref)
+
+
+def _decode_message_ref(row):
+    return tuple(row)
+
+
+# Table layout for each tracked dictionary: (table name, key columns, value columns, encoder, decoder)
+TABLES = {
+    "members": (
+        "guild_member_state",
+        ("guild_id INTEGER NOT NULL", "user_id INTEGER NOT NULL"),
+        (
+            "points REAL NOT NULL", "message_day INTEGER NOT NULL", "message_count INTEGER NOT NULL",
+            "vc_channel_id INTEGER", "vc_entry_time REAL", "vc_join_log TEXT", "vc_transfer_log TEXT",
+            "vc_total_time INTEGER NOT NULL",
+        ),
+        _encode_member,
+        _decode_member,
+    ),
+    "voice_days": (
+        "voice_time_daily",
+        ("guild_id INTEGER NOT NULL", "user_id INTEGER NOT NULL", "channel_id INTEGER NOT NULL", "day INTEGER NOT NULL"),
+        ("seconds REAL NOT NULL",),
+        _encode_seconds,
+        _decode_seconds,
+    ),
+    "voice_totals": (
+        "voice_time_totals",
+        ("guild_id INTEGER NOT NULL", "user_id INTEGER NOT NULL", "channel_id INTEGER NOT NULL"),
+        ("seconds REAL NOT NULL",),
+        _encode_seconds,
+        _decode_seconds,
+    ),
+    "live_leaderboards": (
+        "live_leaderboard_messages",
+        ("guild_id INTEGER NOT NULL",),
+        ("channel_id INTEGER NOT NULL", "message_id INTEGER NOT NULL"),
+        _encode_message_ref,
+        _decode_message_ref,
+    ),
+}
+
+# Append-only history of each guild's !logsetup overrides; the highest version per guild is current
+GUILD_CONFIG_TABLE = "guild_config_versions"
+
+# Append-only record of every points change, with the balances at the latest snapshot of each guild
+LEDGER_TABLE = "points_ledger"
+SNAPSHOT_TABLE = "points_snapshots"                 # Guild ID -> last ledger entry included in its snapshot
+SNAPSHOT_BALANCES_TABLE = "points_snapshot_balances"
+
+# Why a points change happened; stored in the ledger as the index into this tuple
+LEDGER_REASONS = ("message", "reaction", "foul_language", "add_command", "remove_command")
+
+# One points change; `seq` is None until the entry has been written to the ledger
+LedgerEntry = namedtuple("LedgerEntry", ["seq", "guild_id", "user_id", "delta", "reason", "actor_id", "created_at"])
+
+
+# ---------------------------------
+# Points Store
+# ---------------------------------
+
+class PointsStore:
+    """
+    Durable SQLite-backed storage for the bot's per-member state, voice time and guild configuration.
+
+    The tracked dictionaries stay the source of truth while the bot runs. Changes are
+    written behind: `flush` collects every dirty key and writes them all in a single
+    transaction, so a burst of point changes costs one commit instead of one per event.
+    The database runs in WAL mode with `synchronous=NORMAL`, which keeps commits cheap
+    while remaining safe against application crashes.
+    """
+
+    def __init__(self, path, snapshot_interval=3600, ledger_retention=None, voice_days_loaded=30):
+        """
+        Parameters:
+        - path (str): Path to the SQLite database file.
+        - snapshot_interval (float): Optional. Seconds between points balance snapshots.
+        - ledger_retention (float): Optional. Seconds ledger entries are kept once covered by a snapshot.
+          Entries are kept forever if None.
+        - voice_days_loaded (int): Optional. How many recent days of daily voice time buckets are loaded
+          into memory. Older buckets stay in the database.
+        """
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.ledger_retention = ledger_retention
+        self.voice_days_loaded = voice_days_loaded
+        self._ledger_pending = []  # LedgerEntries recorded since the last flush
+        self._snapshot_guilds = set()  # Guilds this process keeps snapshots for
+        self._next_snapshot = time.monotonic() + snapshot_interval
+        self.members = TrackedDict()  # (guild ID, user ID) -> MemberState
+        self.voice_days = TrackedDict()  # (guild ID, user ID, channel ID, UTC day) -> seconds in voice, recent days only
+        self.voice_totals = TrackedDict()  # (guild ID, user ID, channel ID) -> seconds in voice, all time
+        self.live_leaderboards = TrackedDict()  # (guild ID,) -> (channel ID, message ID) of its pinned leaderboard
+        self.guild_configs = {}  # Guild ID -> (version, overrides) of the latest saved configuration
+        self._connection = None
+        self._lock = threading.Lock()  # Serialises writes coming from worker threads
+
+    def _tracked(self):
+        return {
+            "members": self.members,
+            "voice_days": self.voice_days,
+            "voice_totals": self.voice_totals,
+            "live_leaderboards": self.live_leaderboards,
+        }
+
+    def open(self, guild_filter=None):
+        """
+        Opens the database, enables WAL mode, creates missing tables and loads all state
+        and the latest configuration of every guild.
+
+        Each table is read with a single bulk query so startup cost does not grow with
+        the number of round trips.
+
+        Parameters:
+        - guild_filter (callable): Optional. Only rows whose guild ID it returns True for are loaded,
+          so a shard process keeps just the guilds it serves in memory.
+        """
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            for table, key_columns, columns, _, _ in TABLES.values():
+                key_names = ", ".join(column.split()[0] for column in key_columns)
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"({', '.join(key_columns + columns)}, PRIMARY KEY ({key_names}))"
+                )
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {GUILD_CONFIG_TABLE} (guild_id INTEGER NOT NULL, "
+                f"version INTEGER NOT NULL, overrides TEXT NOT NULL, changed_at REAL NOT NULL, "
+                f"PRIMARY KEY (guild_id, version))"
+            )
+            # AUTOINCREMENT so a new entry never reuses the seq of one deleted by compaction
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (seq INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER NOT NULL, "
+                f"user_id INTEGER NOT NULL, delta REAL NOT NULL, reason INTEGER NOT NULL, actor_id INTEGER, "
+                f"created_at REAL NOT NULL)"
+            )
+            # Per-member index so a member's history is read without scanning the whole ledger
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {LEDGER_TABLE}_member ON {LEDGER_TABLE} (guild_id, user_id, seq)"
+            )
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (guild_id INTEGER PRIMARY KEY, seq INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {SNAPSHOT_BALANCES_TABLE} (guild_id INTEGER NOT NULL, "
+                f"user_id INTEGER NOT NULL, points REAL NOT NULL, PRIMARY KEY (guild_id, user_id))"
+            )
+
+        # Only recent voice time buckets are needed in memory
+        conditions = {"voice_days": ("WHERE day > ?", (datetime.utcnow().toordinal() - self.voice_days_loaded,))}
+
+        for name, tracked in self._tracked().items():
+            table, key_columns, _, _, decode = TABLES[name]
+            key_size = len(key_columns)
+            where, parameters = conditions.get(name, ("", ()))
+            rows = self._connection.execute(f"SELECT * FROM {table} {where}", parameters).fetchall()
+            tracked.load(
+                (row[:key_size], decode(row[key_size:])) for row in rows
+                if guild_filter is None or guild_filter(row[0])
+            )
+
+        self._load_ledger_balances(guild_filter)
+
+        rows = self._connection.execute(
+            f"SELECT guild_id, version, overrides FROM {GUILD_CONFIG_TABLE} "
+            f"WHERE (guild_id, version) IN (SELECT guild_id, MAX(version) FROM {GUILD_CONFIG_TABLE} GROUP BY guild_id)"
+        ).fetchall()
+        self.guild_configs = {
+            guild_id: (version, json.loads(overrides)) for guild_id, version, overrides in rows
+            if guild_filter is None or guild_filter(guild_id)
+        }
+
+    def _load_ledger_balances(self, guild_filter):
+        # Guilds without a snapshot (e.g. whose points predate the ledger) start from the balances already
+        # stored, which are always written in the same transaction as their ledger entries
+        with self._lock, self._connection:
+            seq = self._last_seq()
+            new_guilds = self._connection.execute(
+                f"SELECT DISTINCT guild_id FROM guild_member_state "
+                f"WHERE guild_id NOT IN (SELECT guild_id FROM {SNAPSHOT_TABLE})"
+            ).fetchall()
+            for (guild_id,) in new_guilds:
+                # Another shard process starting at the same time may have added the guild's snapshot already
+                self._connection.execute(f"INSERT OR IGNORE INTO {SNAPSHOT_TABLE} VALUES (?, ?)", (guild_id, seq))
+                self._connection.execute(
+                    f"INSERT INTO {SNAPSHOT_BALANCES_TABLE} SELECT guild_id, user_id, points FROM guild_member_state "
+                    f"WHERE guild_id = ? AND points != 0", (guild_id,)
+                )
+
+        # Balances are each guild's snapshot plus only the ledger entries written after it
+        snapshot_seqs = dict(self._connection.execute(f"SELECT guild_id, seq FROM {SNAPSHOT_TABLE}"))
+        balances = {
+            (guild_id, user_id): points for guild_id, user_id, points
+            in self._connection.execute(f"SELECT * FROM {SNAPSHOT_BALANCES_TABLE}")
+        }
+        oldest_snapshot = min(snapshot_seqs.values(), default=0)
+        tail = self._connection.execute(
+            f"SELECT guild_id, user_id, seq, delta FROM {LEDGER_TABLE} WHERE seq > ?", (oldest_snapshot,)
+        )
+        for guild_id, user_id, seq, delta in tail:
+            if seq > snapshot_seqs.get(guild_id, 0):
+                balances[(guild_id, user_id)] = balances.get((guild_id, user_id), 0) + delta
+
+        self._snapshot_guilds = {guild_id for guild_id in snapshot_seqs if guild_filter is None or guild_filter(guild_id)}
+        for key, points in balances.items():
+            if guild_filter is not None and not guild_filter(key[0]):
+                continue
+            state = self.members.get(key)
+            if state is None:
+                state = MemberState()
+                self.members.load([(key, state)])
+            state.points = points
+
+    def save_guild_config(self, guild_id, version, overrides):
+        """
+        Records a new version of a guild's configuration immediately, keeping earlier versions.
+
+        Configuration changes are rare, so they are written straight away instead of
+        waiting for the next flush.
+
+        Parameters:
+        - guild_id (int): The guild whose configuration changed.
+        - version (int): The new version number.
+        - overrides (dict): The guild's settings that differ from the bot-wide defaults.
+        """
+        if self._connection is None:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {GUILD_CONFIG_TABLE} VALUES (?, ?, ?, ?)",
+                (guild_id, version, json.dumps(overrides), time.time())
+            )
+
+    def record(self, guild_id, user_id, delta, reason, actor_id=None):
+        """
+        Appends a points change to the ledger. It is written with the next flush.
+
+        Parameters:
+        - guild_id (int): The guild the points belong to.
+        - user_id (int): The member whose points changed.
+        - delta (float): The change in points.
+        - reason (str): One of LEDGER_REASONS.
+        - actor_id (int): Optional. The moderator who caused the change.
+        """
+        self._ledger_pending.append(
+            LedgerEntry(None, guild_id, user_id, delta, LEDGER_REASONS.index(reason), actor_id, time.time())
+        )
+        self._snapshot_guilds.add(guild_id)
+
+    def history(self, guild_id, user_id, limit=10):
+        """
+        Reads a member's most recent written ledger entries using the per-member index.
+
+        Entries not written yet are not included; combine with `pending_history` for those.
+
+        Parameters:
+        - guild_id (int): The guild to look in.
+        - user_id (int): The member whose history is read.
+        - limit (int): Optional. Maximum number of entries.
+
+        Returns:
+        - list of LedgerEntry: Newest first, with `reason` as its name from LEDGER_REASONS.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT * FROM {LEDGER_TABLE} WHERE guild_id = ? AND user_id = ? ORDER BY seq DESC LIMIT ?",
+                (guild_id, user_id, limit)
+            ).fetchall()
+        return [LedgerEntry(*row[:4], LEDGER_REASONS[row[4]], *row[5:]) for row in rows]
+
+    def pending_history(self, guild_id, user_id, limit=10):
+        """
+        Returns a member's most recent ledger entries that are not written to the database yet.
+
+        Must be called from the thread that records changes (the event loop).
+
+        Parameters:
+        - guild_id (int): The guild to look in.
+        - user_id (int): The member whose entries are returned.
+        - limit (int): Optional. Maximum number of entries.
+
+        Returns:
+        - list of LedgerEntry: Newest first, with `reason` as its name from LEDGER_REASONS and `seq` None.
+        """
+        entries = []
+        for entry in reversed(self._ledger_pending):
+            if len(entries) == limit:
+                break
+            if entry.guild_id == guild_id and entry.user_id == user_id:
+                entries.append(entry._replace(reason=LEDGER_REASONS[entry.reason]))
+        return entries
+
+    def collect(self, snapshot=None):
+        """
+        Drains the dirty keys from every tracked dictionary and the pending ledger entries into a write batch.
+
+        Must be called from the thread that mutates the dictionaries (the event loop),
+        so the snapshot is consistent. The batch can then be written from any thread.
+
+        Parameters:
+        - snapshot (bool): Optional. Whether to include a snapshot of every balance. By default one
+          is included once `snapshot_interval` has passed since the last.
+
+        Returns:
+        - dict: Maps table names to (upsert rows, deleted keys), plus "ledger" to new ledger rows
+          and "snapshot" to balances by guild if a snapshot is included.
+        """
+        batch = {}
+        if self._ledger_pending:
+            batch["ledger"] = self._ledger_pending
+            self._ledger_pending = []
+        if snapshot or (snapshot is None and time.monotonic() >= self._next_snapshot):
+            balances = {guild_id: [] for guild_id in self._snapshot_guilds}
+            for (guild_id, user_id), state in self.members.items():
+                if state.points:
+                    balances.setdefault(guild_id, []).append((guild_id, user_id, state.points))
+            batch["snapshot"] = balances
+            self._next_snapshot = time.monotonic() + self.snapshot_interval
+        for name, tracked in self._tracked().items():
+            if not tracked.dirty:
+                continue
+            _, _, _, encode, _ = TABLES[name]
+            upserts, deletes = [], []
+            for key in tracked.dirty:
+                if key in tracked:
+                    upserts.append((*key, *encode(tracked[key])))
+                else:
+                    deletes.append(key)
+            tracked.dirty = set()
+            batch[name] = (upserts, deletes)
+        return batch
+
+    def requeue(self, batch):
+        """
+        Puts a batch whose write failed back into the pending changes, so the next flush writes it.
+
+        Must be called from the thread that mutates the dictionaries (the event loop). The
+        keys are marked dirty again, so the next batch carries their current values, and the
+        ledger entries go back in front of any recorded since.
+
+        Parameters:
+        - batch (dict): The batch returned by `collect`.
+        """
+        if "ledger" in batch:
+            self._ledger_pending = batch["ledger"] + self._ledger_pending
+        if "snapshot" in batch:
+            self._next_snapshot = time.monotonic()
+        for name, tracked in self._tracked().items():
+            if name not in batch:
+                continue
+            key_size = len(TABLES[name][1])
+            upserts, deletes = batch[name]
+            tracked.dirty.update(tuple(row[:key_size]) for row in upserts)
+            tracked.dirty.update(deletes)
+
+    def _write_batch(self, batch):
+        ledger = batch.get("ledger")
+        if ledger:
+            self._connection.executemany(
+                f"INSERT INTO {LEDGER_TABLE} (guild_id, user_id, delta, reason, actor_id, created_at) "
+                f"VALUES (?, ?, ?, ?, ?, ?)",
+                (entry[1:] for entry in ledger)
+            )
+        for name, (table, key_columns, columns, _, _) in TABLES.items():
+            if name not in batch:
+                continue
+            upserts, deletes = batch[name]
+            if upserts:
+                placeholders = ", ".join("?" * (len(key_columns) + len(columns)))
+                self._connection.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", upserts)
+            if deletes:
+                key_match = " AND ".join(f"{column.split()[0]} = ?" for column in key_columns)
+                self._connection.executemany(f"DELETE FROM {table} WHERE {key_match}", deletes)
+        if "snapshot" in batch:
+            self._write_snapshot(batch["snapshot"])
+
+    def _last_seq(self):
+        # Highest seq ever handed out; unlike MAX(seq) it does not go back when compaction deletes the newest entries
+        row = self._connection.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (LEDGER_TABLE,)).fetchone()
+        return row[0] if row else 0
+
+    def _write_snapshot(self, balances):
+        # Every ledger entry for these guilds made before the balances were captured is written by now,
+        # and each guild has a single writer, so the latest sequence number marks where the snapshot ends
+        seq = self._last_seq()
+        for guild_id, rows in balances.items():
+            self._connection.execute(f"DELETE FROM {SNAPSHOT_BALANCES_TABLE} WHERE guild_id = ?", (guild_id,))
+            self._connection.executemany(f"INSERT INTO {SNAPSHOT_BALANCES_TABLE} VALUES (?, ?, ?)", rows)
+            self._connection.execute(f"INSERT OR REPLACE INTO {SNAPSHOT_TABLE} VALUES (?, ?)", (guild_id, seq))
+            if self.ledger_retention is not None:
+                # Compact: entries covered by the snapshot are only kept for the retention period
+                self._connection.execute(
+                    f"DELETE FROM {LEDGER_TABLE} WHERE guild_id = ? AND seq <= ? AND created_at < ?",
+                    (guild_id, seq, time.time() - self.ledger_retention)
+                )
+
+    def write(self, batch):
+        """
+        Writes a batch produced by `collect` in one transaction.
+
+        Parameters:
+        - batch (dict): The batch returned by `collect`.
+        """
+        if not batch or self._connection is None:
+            return
+        with self._lock, self._connection:
+            self._write_batch(batch)
+
+    def flush(self):
+        """
+        Collects and writes all pending changes synchronously.
+        """
+        self.write(self.collect())
+
+    def close(self):
+        """
+        Flushes any pending changes with a fresh snapshot, so the next start replays nothing, and closes the database.
+        """
+        if self._connection is None:
+            return
+        self.write(self.collect(snapshot=True))
+        self._connection.close()
+        self._connection = None
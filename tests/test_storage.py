@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import MemberState, PointsStore
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "points.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_store(self):
+        store = PointsStore(self.path, ledger_retention=0)
+        store.open()
+        return store
+
+    def add_points(self, store, guild_id, user_id, delta):
+        state = store.members.setdefault((guild_id, user_id), MemberState())
+        state.points += delta
+        store.members.touch((guild_id, user_id))
+        store.record(guild_id, user_id, delta, "add_command")
+
+    def balances(self, store):
+        return {key: state.points for key, state in store.members.items()}
+
+
+class LedgerCompactionTest(StoreTestCase):
+    def test_entries_after_compaction_survive_a_restart(self):
+        store = self.open_store()
+        self.add_points(store, 1, 10, 7)
+        store.flush()
+
+        # The snapshot covers every entry and compaction deletes them all, including the latest
+        store.write(store.collect(snapshot=True))
+
+        # Written after the snapshot, then the process stops without a final snapshot
+        self.add_points(store, 1, 10, 1)
+        self.add_points(store, 2, 10, 7)
+        self.add_points(store, 2, 10, -7)
+        store.flush()
+        store._connection.close()
+
+        restarted = self.open_store()
+        self.assertEqual(self.balances(restarted), {(1, 10): 8, (2, 10): 0})
+        restarted.close()
+
+
+class HistoryTest(StoreTestCase):
+    def test_pending_entries_come_before_written_ones(self):
+        store = self.open_store()
+        self.add_points(store, 1, 10, 5)
+        store.flush()
+        self.add_points(store, 1, 10, -2)
+        self.add_points(store, 1, 11, 3)
+
+        pending = store.pending_history(1, 10)
+        written = store.history(1, 10)
+        self.assertEqual([entry.delta for entry in pending + written], [-2, 5])
+        self.assertEqual([entry.reason for entry in pending], ["add_command"])
+        self.assertIsNone(pending[0].seq)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,249 @@
+from datetime import date
+
+from leaderboard_index import LeaderboardIndex
+
+
+# Periods accepted by !vctime and !vcleaderboard -> number of UTC days they cover (None for all time)
+VOICE_TIME_PERIODS = {
+    "today": 1,
+    "week": 7,
+    "month": 30,
+    "all": None,
+}
+
+WINDOW_DAYS = max(days for days in VOICE_TIME_PERIODS.values() if days)  # Longest rolling period, kept in memory
+
+EPOCH_DAY = date(1970, 1, 1).toordinal()  # UTC day number of the Unix epoch
+SECONDS_PER_DAY = 86400
+
+
+def utc_day_of(timestamp):
+    """
+    Returns the UTC day number (proleptic Gregorian ordinal) a Unix timestamp falls on.
+
+    Parameters:
+    - timestamp (float): Unix time.
+
+    Returns:
+    - int: The UTC day number, matching `datetime.utcnow().toordinal()`.
+    """
+    return int(timestamp // SECONDS_PER_DAY) + EPOCH_DAY
+
+
+def period_start(period, today):
+    """
+    Returns when a period that ends today started.
+
+    Parameters:
+    - period (str): One of VOICE_TIME_PERIODS.
+    - today (int): The current UTC day number.
+
+    Returns:
+    - float: Unix time of the first midnight in the period, or 0 for all time.
+    """
+    window = VOICE_TIME_PERIODS[period]
+    return (today - window + 1 - EPOCH_DAY) * SECONDS_PER_DAY if window else 0
+
+
+def split_by_day(start, end):
+    """
+    Splits a time span at UTC midnights.
+
+    Parameters:
+    - start (float): Unix time the span starts.
+    - end (float): Unix time the span ends.
+
+    Returns:
+    - list of tuples: (UTC day number, seconds of the span on that day).
+    """
+    parts = []
+    while start < end:
+        day = utc_day_of(start)
+        day_end = min(end, (day - EPOCH_DAY + 1) * SECONDS_PER_DAY)
+        parts.append((day, day_end - start))
+        start = day_end
+    return parts
+
+
+class VoiceTimeRollups:
+    """
+    Voice channel time per member and channel, aggregated into daily buckets.
+
+    Finished voice sessions are added as they end (or switch channel). Each span is
+    split at UTC midnight and added to its (guild, user, channel, day) bucket and to
+    the member's all-time total for that channel; both are tracked dictionaries the
+    store persists. Alongside them every period in VOICE_TIME_PERIODS keeps a running
+    total per member and a ranked index per guild, so looking up a member's time is a
+    dictionary lookup and a voice leaderboard is read without scanning any sessions.
+
+    Rolling periods move forward once per UTC day: `roll_over` recomputes their totals
+    from the daily buckets still inside the window and drops older buckets from memory
+    (they stay in the database).
+    """
+
+    def __init__(self, days, totals):
+        """
+        Parameters:
+        - days (TrackedDict): (guild ID, user ID, channel ID, day) -> seconds, for recent days.
+        - totals (TrackedDict): (guild ID, user ID, channel ID) -> seconds, for all time.
+        """
+        self.days = days
+        self.totals = totals
+        self.today = None  # UTC day the rolling periods currently end on
+        self._sums = {period: {} for period in VOICE_TIME_PERIODS}  # Period -> guild ID -> user ID -> seconds
+        self._indexes = {period: {} for period in VOICE_TIME_PERIODS}  # Period -> guild ID -> LeaderboardIndex
+        self._recent = {}  # (Guild ID, user ID) -> {(channel ID, day): seconds} for days inside the window
+        self._channels = {}  # (Guild ID, user ID) -> IDs of every voice channel the member has time in
+
+    def __len__(self):
+        return len(self.days) + len(self.totals)
+
+    def rebuild(self, today):
+        """
+        Recomputes every rollup from the loaded buckets and totals.
+
+        Parameters:
+        - today (int): The current UTC day number.
+        """
+        all_time = {}
+        self._channels = {}
+        for (guild_id, user_id, channel_id), seconds in self.totals.items():
+            self._channels.setdefault((guild_id, user_id), set()).add(channel_id)
+            users = all_time.setdefault(guild_id, {})
+            users[user_id] = users.get(user_id, 0) + seconds
+        self._sums["all"] = all_time
+        self._indexes["all"] = {}
+        for guild_id, users in all_time.items():
+            self._index("all", guild_id).rebuild(users)
+        self.today = None
+        self.roll_over(today)
+
+    def roll_over(self, today):
+        """
+        Moves the rolling periods so they end on a new UTC day.
+
+        Parameters:
+        - today (int): The current UTC day number.
+        """
+        if today == self.today:
+            return
+        self.today = today
+        oldest_day = today - WINDOW_DAYS + 1
+
+        # Drop buckets that left every window; ones not yet written to disk are kept until they are
+        self._recent = {}
+        for key in list(self.days):
+            if key[3] < oldest_day:
+                self.days.forget(key)
+                continue
+            guild_id, user_id, channel_id, day = key
+            self._recent.setdefault((guild_id, user_id), {})[(channel_id, day)] = self.days[key]
+
+        for period, window in VOICE_TIME_PERIODS.items():
+            if window is None:
+                continue
+            sums = {}
+            for (guild_id, user_id), buckets in self._recent.items():
+                seconds = sum(value for (_, day), value in buckets.items() if day > today - window)
+                if seconds:
+                    sums.setdefault(guild_id, {})[user_id] = seconds
+            self._sums[period] = sums
+            self._indexes[period] = {}
+            for guild_id, users in sums.items():
+                self._index(period, guild_id).rebuild(users)
+
+    def add(self, guild_id, user_id, channel_id, start, end):
+        """
+        Adds a span of time a member spent in a voice channel.
+
+        Parameters:
+        - guild_id (int): The guild of the voice channel.
+        - user_id (int): The member.
+        - channel_id (int): The voice channel.
+        - start (float): Unix time the member entered the channel.
+        - end (float): Unix time the member left the channel.
+        """
+        parts = split_by_day(start, end)
+        if not parts:
+            return
+        self.roll_over(max(self.today or 0, parts[-1][0]))
+        member_key = (guild_id, user_id)
+        self._channels.setdefault(member_key, set()).add(channel_id)
+        for day, seconds in parts:
+            total_key = (guild_id, user_id, channel_id)
+            self.totals[total_key] = self.totals.get(total_key, 0) + seconds
+            self._add_to_period("all", guild_id, user_id, seconds)
+
+            # Days before the window only count towards the all-time totals
+            if day <= self.today - WINDOW_DAYS:
+                continue
+            bucket_key = (guild_id, user_id, channel_id, day)
+            self.days[bucket_key] = self.days.get(bucket_key, 0) + seconds
+            self._recent.setdefault(member_key, {})[(channel_id, day)] = self.days[bucket_key]
+            for period, window in VOICE_TIME_PERIODS.items():
+                if window is not None and day > self.today - window:
+                    self._add_to_period(period, guild_id, user_id, seconds)
+
+    def _add_to_period(self, period, guild_id, user_id, seconds):
+        users = self._sums[period].setdefault(guild_id, {})
+        users[user_id] = users.get(user_id, 0) + seconds
+        self._index(period, guild_id).update(user_id, users[user_id])
+
+    def _index(self, period, guild_id):
+        index = self._indexes[period].get(guild_id)
+        if index is None:
+            index = LeaderboardIndex()
+            self._indexes[period][guild_id] = index
+        return index
+
+    def total(self, guild_id, user_id, period):
+        """
+        Returns a member's voice time over a period.
+
+        Parameters:
+        - guild_id (int): The guild to look in.
+        - user_id (int): The member.
+        - period (str): One of VOICE_TIME_PERIODS.
+
+        Returns:
+        - float: Seconds spent in the guild's voice channels.
+        """
+        return self._sums[period].get(guild_id, {}).get(user_id, 0)
+
+    def channels(self, guild_id, user_id, period):
+        """
+        Returns a member's voice time per channel over a period, longest first.
+
+        Parameters:
+        - guild_id (int): The guild to look in.
+        - user_id (int): The member.
+        - period (str): One of VOICE_TIME_PERIODS.
+
+        Returns:
+        - list of tuples: (channel ID, seconds) for each channel.
+        """
+        window = VOICE_TIME_PERIODS[period]
+        if window is None:
+            per_channel = {
+                channel_id: self.totals[(guild_id, user_id, channel_id)]
+                for channel_id in self._channels.get((guild_id, user_id), ())
+            }
+        else:
+            per_channel = {}
+            for (channel_id, day), seconds in self._recent.get((guild_id, user_id), {}).items():
+                if day > self.today - window:
+                    per_channel[channel_id] = per_channel.get(channel_id, 0) + seconds
+        return sorted(per_channel.items(), key=lambda item: item[1], reverse=True)
+
+    def leaderboard(self, guild_id, period):
+        """
+        Returns the ranked index of a guild's members by voice time over a period.
+
+        Parameters:
+        - guild_id (int): The guild.
+        - period (str): One of VOICE_TIME_PERIODS.
+
+        Returns:
+        - LeaderboardIndex: Members ranked by seconds spent in voice channels.
+        """
+        return self._index(period, guild_id)